@@ -1,43 +1,90 @@
 # app.py
 import os
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
-from db import supabase, TABLE
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from db import get_client, client_state, TABLE
+from config import STREAM_POLL_SEC, DASHBOARD_SNAPSHOT_FILE
+from results_store import read_results, save_snapshot_rows, read_snapshot_rows
+from snapshot_cache import Snapshot, TTLCache
+from signals_query import QueryError, MAX_LIMIT, parse_fields, query_signals
+from broadcaster import Broadcaster
+from instrumentation import REGISTRY, read_run_summary
 import logging
 import json
 from datetime import datetime
 
-app = FastAPI()
+STARTED_AT = time.time()
+
+async def poll_for_changes():
+    """While live clients are connected, keep the dashboard snapshot current so new results get pushed."""
+    while True:
+        await asyncio.sleep(STREAM_POLL_SEC)
+        if broadcaster.subscriber_count:
+            try:
+                await run_in_threadpool(cache.get, "dashboard", build_dashboard_snapshot)
+            except Exception:
+                logging.exception("Live update poll failed")
+
+def warm_db():
+    """Create the Supabase client off the request path; pages built from fallback rows are dropped once it's up."""
+    if get_client() is not None:
+        cache.invalidate()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    broadcaster.bind(asyncio.get_running_loop())
+    threading.Thread(target=warm_db, name="db-warmup", daemon=True).start()
+    poller = asyncio.create_task(poll_for_changes())
+    try:
+        yield
+    finally:
+        poller.cancel()
+
+app = FastAPI(lifespan=lifespan)
+cache = TTLCache()
 
 def get_rows_from_supabase(limit=200):
-    if not supabase:
+    # never wait for the client here: until it exists, requests are served from local rows / the snapshot
+    client = get_client(block=False)
+    if not client:
         return []
     try:
-        res = supabase.table(TABLE).select("*").order("ai_score", {"ascending": False}).limit(limit).execute()
+        res = client.table(TABLE).select("*").order("ai_score", desc=True, nullsfirst=False).limit(limit).execute()
         data = res.data if hasattr(res, "data") else res
-        return data or []
     except Exception:
         logging.exception("Supabase fetch failed")
         return []
+    if data:
+        save_snapshot_rows(data)  # so a cold start can render them before the client exists
+    return data or []
 
-def get_rows_local():
-    path = "tier2_results.json"
-    if os.path.exists(path):
-        with open(path, "r") as f:
-            return json.load(f)
-    return []
+def get_rows_local(limit=None):
+    return read_results(limit=limit)
 
 @app.get("/health")
 def health():
-    return JSONResponse({"status": "running", "time": datetime.utcnow().isoformat()})
+    # "ready" once the DB client has settled (connected, failed or not configured); the app serves either way
+    db = client_state()
+    return JSONResponse({
+        "status": "running",
+        "ready": db != "pending",
+        "db": db,
+        "snapshot": os.path.exists(DASHBOARD_SNAPSHOT_FILE),
+        "uptime_sec": round(time.time() - STARTED_AT, 3),
+        "time": datetime.utcnow().isoformat(),
+    })
 
-@app.get("/", response_class=HTMLResponse)
-def dashboard(request: Request):
-    # prefer Supabase
-    rows = get_rows_from_supabase() or get_rows_local()
+def get_rows():
+    # prefer Supabase; before its client is up, the scanner's local results or the last DB snapshot
+    return get_rows_from_supabase() or get_rows_local(limit=200) or read_snapshot_rows()
 
-    # Build a simple responsive HTML table
-    html = """
+DASHBOARD_HEAD = """
     <!doctype html>
     <html>
     <head>
@@ -58,7 +105,7 @@ def dashboard(request: Request):
     <body>
       <div class="card">
         <h2>Crypto Scanner Dashboard</h2>
-        <p>Showing latest signals. Refresh to update.</p>
+        <p>Showing latest signals. <span id="live">Refresh to update.</span></p>
       </div>
       <div class="card">
         <table>
@@ -77,22 +124,53 @@ def dashboard(request: Request):
           <tbody>
     """
 
-    for r in rows:
-        ticker = (r.get("ticker") or r.get("coin_id") or "").upper()
-        price = r.get("price", "")
-        ai = r.get("ai_score", "")
-        rsi = r.get("rsi", "")
-        ema5 = r.get("ema5", "")
-        ema13 = r.get("ema13", "")
-        ema50 = r.get("ema50", "")
-        rvol = r.get("rvol", "")
-        atr = r.get("atr", "")
-        risk = r.get("risk", {})
-        sl = (risk.get("stop_loss") if isinstance(risk, dict) else "")
-        tp = (risk.get("take_profit") if isinstance(risk, dict) else "")
-
-        html += f"""
-            <tr>
+DASHBOARD_FOOT = """
+          </tbody>
+        </table>
+      </div>
+      <div style="text-align:center;color:#888;font-size:12px">Updated: {time}</div>
+      <script>
+        if (window.EventSource) {{
+          var es = new EventSource("/api/stream");
+          var tbody = document.querySelector("tbody");
+          es.onopen = function () {{ document.getElementById("live").textContent = "Live updates on."; }};
+          es.addEventListener("signals", function (e) {{
+            var d = JSON.parse(e.data);
+            d.remove.forEach(function (id) {{
+              var tr = tbody.querySelector('tr[data-coin-id="' + CSS.escape(id) + '"]');
+              if (tr) tr.remove();
+            }});
+            d.upsert.forEach(function (u) {{
+              var tmp = document.createElement("tbody");
+              tmp.innerHTML = u.html;
+              var row = tmp.querySelector("tr");
+              var tr = tbody.querySelector('tr[data-coin-id="' + CSS.escape(u.coin_id) + '"]');
+              if (tr) tr.replaceWith(row); else tbody.appendChild(row);
+            }});
+          }});
+          es.addEventListener("resync", function () {{ location.reload(); }});
+        }}
+      </script>
+    </body>
+    </html>
+    """
+
+def render_row(r: dict) -> str:
+    ticker = (r.get("ticker") or r.get("coin_id") or "").upper()
+    price = r.get("price", "")
+    ai = r.get("ai_score", "")
+    rsi = r.get("rsi", "")
+    ema5 = r.get("ema5", "")
+    ema13 = r.get("ema13", "")
+    ema50 = r.get("ema50", "")
+    rvol = r.get("rvol", "")
+    atr = r.get("atr", "")
+    risk = r.get("risk", {})
+    sl = (risk.get("stop_loss") if isinstance(risk, dict) else "")
+    tp = (risk.get("take_profit") if isinstance(risk, dict) else "")
+
+    return f"""
+            <tr data-coin-id="{r.get("coin_id") or r.get("ticker") or ""}">
               <td><strong>{ticker}</strong><div style="font-size:11px;color:#666">{r.get("name","")}</div></td>
               <td class="desktop-only">{price}</td>
               <td><span class="badge">{ai}</span></td>
@@ -104,13 +182,91 @@ def dashboard(request: Request):
             </tr>
         """
 
-    html += """
-          </tbody>
-        </table>
-      </div>
-      <div style="text-align:center;color:#888;font-size:12px">Updated: {time}</div>
-    </body>
-    </html>
-    """.format(time=datetime.utcnow().isoformat())
+def render_dashboard(rows) -> str:
+    parts = [DASHBOARD_HEAD]
+    parts.extend(render_row(r) for r in rows)
+    parts.append(DASHBOARD_FOOT.format(time=datetime.utcnow().isoformat()))
+    return "".join(parts)
+
+broadcaster = Broadcaster(render=render_row)
+
+def build_dashboard_snapshot() -> Snapshot:
+    rows = get_rows()
+    broadcaster.publish(rows)
+    return Snapshot(render_dashboard(rows).encode("utf-8"), "text/html; charset=utf-8", data=rows)
+
+def build_json_snapshot() -> Snapshot:
+    rows = cache.get("dashboard", build_dashboard_snapshot).data
+    return Snapshot(json.dumps(rows, default=str).encode("utf-8"), "application/json", data=rows)
+
+def snapshot_response(request: Request, snap: Snapshot) -> Response:
+    headers = {"ETag": snap.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if snap.matches(request.headers.get("if-none-match", "")):
+        return Response(status_code=304, headers=headers)
+    body, encoding = snap.encoded(request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=snap.media_type, headers=headers)
+
+@app.get("/", response_class=HTMLResponse)
+def dashboard(request: Request):
+    return snapshot_response(request, cache.get("dashboard", build_dashboard_snapshot))
+
+@app.get("/snapshot.json")
+def snapshot_json(request: Request):
+    return snapshot_response(request, cache.get("snapshot.json", build_json_snapshot))
+
+@app.get("/api/signals")
+def api_signals(
+    request: Request,
+    tier: Optional[str] = None,
+    min_score: Optional[float] = None,
+    rsi_min: Optional[float] = None,
+    rsi_max: Optional[float] = None,
+    rvol_min: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    fields: Optional[str] = None,
+):
+    """Signals ordered by ai_score desc; pass back next_cursor to get the following page."""
+    try:
+        params = dict(tier=tier, min_score=min_score, rsi_min=rsi_min, rsi_max=rsi_max, rvol_min=rvol_min,
+                      cursor=cursor, limit=limit, fields=parse_fields(fields))
+    except QueryError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    key = ("api/signals",) + tuple(sorted((k, str(v)) for k, v in params.items()))
+
+    def build():
+        local_rows = lambda: cache.get("local_rows", get_rows_local)
+        page = query_signals(get_client(block=False), TABLE, local_rows, **params)
+        return Snapshot(json.dumps(page, default=str).encode("utf-8"), "application/json", data=page)
+
+    try:
+        snap = cache.get(key, build)
+    except QueryError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return snapshot_response(request, snap)
+
+@app.get("/api/stream")
+async def api_stream(request: Request):
+    """Server-Sent Events: one `signals` event per change with only the upserted/removed rows."""
+    sub = broadcaster.subscribe()
+    return StreamingResponse(
+        broadcaster.stream(sub, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    return HTMLResponse(content=html)
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format: this process's counters/histograms plus gauges from the last scan run."""
+    lines = [REGISTRY.render_prometheus()]
+    summary = read_run_summary()
+    if summary:
+        lines.append("# TYPE scanner_last_run_timestamp_seconds gauge")
+        lines.append(f"scanner_last_run_timestamp_seconds {summary.get('written_at', 0):.0f}")
+        for key in ("duration_sec", "tier1", "tier2", "alerts"):
+            name = "scanner_last_run_duration_seconds" if key == "duration_sec" else f"scanner_last_run_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {summary.get(key) or 0}")
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
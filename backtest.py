@@ -0,0 +1,263 @@
+# backtest.py
+"""
+Offline walk-forward backtest of the Tier 2 signal: replays stored candles through the same
+indicators, scoring backend and risk_panel levels the scanner uses and simulates each entry's
+stop-loss / take-profit.
+
+Candles are the PRIMARY_TIMEFRAME bars the scanner scores, with the same METRIC_TIMEFRAMES
+higher-timeframe confirmation. At every candle t the signal sees only candles [0, t]
+(walk_forward_metrics), enters at close[t] and exits on the first later candle whose low reaches
+the stop (checked first, so a candle that spans both counts as a loss) or whose high reaches the
+target, else at the close ``horizon`` candles later. One position per coin at a time.
+
+Indicators and scores are computed once per coin in a process pool (prepare); simulate() only
+replays those arrays, so parameter sweeps don't recompute anything.
+
+    python backtest.py                                  # every coin in the candle store
+    python backtest.py --coins bitcoin,solana --output bt.json
+    python backtest.py --sweep min_score=5,6,7 --sweep sl_atr=1,1.5,2 --sweep tp_atr=2,3
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    CANDLE_STORE_DIR, ALERT_MIN_SCORE, RISK_SL_ATR, RISK_TP_ATR,
+    BACKTEST_HORIZON, BACKTEST_WARMUP, BACKTEST_WORKERS, METRIC_TIMEFRAMES, PRIMARY_TIMEFRAME, INTERVAL_SEC,
+)
+from technical_indicators import indicator_series, htf_series, regular_bars, timeframe_frames
+from scoring import score_batch
+from services.candle_store import CandleStore
+from services.providers import _candles_to_frame
+
+SCORE_BUCKETS = [0, 2, 4, 6, 8, 10.01]
+
+
+class SignalSeries(NamedTuple):
+    """Per-candle inputs the simulator needs for one coin."""
+    coin_id: str
+    ts: np.ndarray
+    close: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    atr: np.ndarray
+    score: np.ndarray
+
+
+def score_series(series: pd.DataFrame) -> np.ndarray:
+    """The configured scoring backend over every row of a walk_forward_metrics frame, in one batch."""
+    return score_batch(series)[0]
+
+
+def walk_forward_metrics(df: pd.DataFrame, timeframes=METRIC_TIMEFRAMES, primary: str = PRIMARY_TIMEFRAME):
+    """
+    (bars, series): the ``primary`` timeframe bars the scanner scores and, per bar, the metrics
+    compute_metrics(df, timeframes, primary) gives at that bar, including the highest timeframe's
+    htf_ema5 / htf_ema13 / htf_rsi (and its name under htf) when there are 2+ timeframes.
+    """
+    if not isinstance(df.index, pd.DatetimeIndex):
+        return df, indicator_series(df)
+    bars, _ = regular_bars(df)
+    frames = timeframe_frames(bars, timeframes)
+    base = frames.get(primary, bars)
+    series = indicator_series(base)
+    if len(frames) > 1:
+        htf = max(frames, key=lambda tf: INTERVAL_SEC[tf])
+        higher = htf_series(base, INTERVAL_SEC[htf])
+        for name in ("ema5", "ema13", "rsi"):
+            series[f"htf_{name}"] = higher[name]
+        series["htf"] = htf
+    return base, series
+
+
+def signal_series(coin_id: str, df: pd.DataFrame) -> SignalSeries:
+    df, series = walk_forward_metrics(df)
+    close = df["close"].to_numpy(dtype=float)
+    return SignalSeries(
+        coin_id=coin_id,
+        ts=df.index.values.astype("datetime64[s]").astype(np.int64) if isinstance(df.index, pd.DatetimeIndex) else np.arange(len(df)),
+        close=close,
+        high=df["high"].to_numpy(dtype=float) if "high" in df else close,
+        low=df["low"].to_numpy(dtype=float) if "low" in df else close,
+        atr=series["atr"].to_numpy(dtype=float),
+        score=score_series(series),
+    )
+
+
+def _prepare_chunk(root: str, coin_ids: List[str]) -> List[SignalSeries]:
+    store = CandleStore(root, max_candles=sys.maxsize)
+    out = []
+    for coin_id in coin_ids:
+        arr = store.load(coin_id)
+        if arr is None or len(arr) < 2:
+            continue
+        try:
+            out.append(signal_series(coin_id, _candles_to_frame(arr)))
+        except Exception:
+            logging.exception("Backtest prep failed for %s", coin_id)
+    return out
+
+
+def stored_coins(root: str = CANDLE_STORE_DIR) -> List[str]:
+    if not os.path.isdir(root):
+        return []
+    return sorted(f[:-4] for f in os.listdir(root) if f.endswith(".npy"))
+
+
+def prepare(coin_ids: Iterable[str], root: str = CANDLE_STORE_DIR, workers: int = BACKTEST_WORKERS,
+            chunk_size: int = 16) -> List[SignalSeries]:
+    """Load each coin from the candle store and precompute its indicators and scores in parallel."""
+    coin_ids = list(coin_ids)
+    chunks = [coin_ids[i:i + chunk_size] for i in range(0, len(coin_ids), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        return [s for chunk in chunks for s in _prepare_chunk(root, chunk)]
+    with ProcessPoolExecutor(max_workers=workers or None) as pool:
+        results = pool.map(_prepare_chunk, itertools.repeat(root), chunks)
+        return [s for chunk in results for s in chunk]
+
+
+def _first_hit(mask: np.ndarray) -> np.ndarray:
+    """Column index of the first True per row, or the row width if there is none."""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), mask.shape[1])
+
+
+def simulate(s: SignalSeries, min_score: float = 0.0, sl_atr: float = RISK_SL_ATR,
+             tp_atr: float = RISK_TP_ATR, horizon: int = BACKTEST_HORIZON,
+             warmup: int = BACKTEST_WARMUP) -> Dict[str, np.ndarray]:
+    """Trades for one coin as parallel arrays: ts, score, ret (fraction of entry), outcome (1 tp, -1 sl, 0 timeout)."""
+    n = len(s.close)
+    t = np.flatnonzero((s.score >= min_score) & np.isfinite(s.atr) & (s.close > 0))
+    t = t[(t >= warmup) & (t < n - 1)]
+    if not len(t):
+        return {"ts": np.empty(0, np.int64), "score": np.empty(0), "ret": np.empty(0), "outcome": np.empty(0, np.int8)}
+
+    # risk_panel's levels, for all candidate entries at once
+    entry = s.close[t]
+    sl = np.maximum(entry - sl_atr * s.atr[t], 0)
+    tp = entry + tp_atr * s.atr[t]
+
+    # forward windows of the next `horizon` candles, NaN past the end of the data
+    pad = np.full(horizon, np.nan)
+    ahead = np.lib.stride_tricks.sliding_window_view
+    high = ahead(np.concatenate([s.high, pad]), horizon)[t + 1]
+    low = ahead(np.concatenate([s.low, pad]), horizon)[t + 1]
+    sl_at = _first_hit(low <= sl[:, None])
+    tp_at = _first_hit(high >= tp[:, None])
+    last = np.minimum(t + horizon, n - 1)
+
+    outcome = np.where(sl_at <= tp_at, -1, 1).astype(np.int8)
+    outcome[(sl_at == horizon) & (tp_at == horizon)] = 0
+    exit_price = np.where(outcome == -1, sl, np.where(outcome == 1, tp, s.close[last]))
+    exit_at = np.where(outcome == 0, last, t + 1 + np.minimum(sl_at, tp_at))
+
+    # one position at a time: skip entries until the previous trade has exited
+    take = np.zeros(len(t), dtype=bool)
+    i = 0
+    while i < len(t):
+        take[i] = True
+        i = np.searchsorted(t, exit_at[i], side="right")
+    return {
+        "ts": s.ts[t][take],
+        "score": s.score[t][take],
+        "ret": (exit_price / entry - 1)[take],
+        "outcome": outcome[take],
+    }
+
+
+def trade_stats(ret: np.ndarray, outcome: np.ndarray) -> dict:
+    """Hit rate, expectancy and max drawdown (of the summed-return curve) for a set of trades in time order."""
+    if not len(ret):
+        return {"trades": 0, "hit_rate": None, "expectancy": None, "avg_win": None, "avg_loss": None, "max_drawdown": None}
+    equity = np.cumsum(ret)
+    drawdown = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity
+    wins, losses = ret[ret > 0], ret[ret <= 0]
+    return {
+        "trades": int(len(ret)),
+        "hit_rate": float((outcome == 1).mean()),
+        "expectancy": float(ret.mean()),
+        "avg_win": float(wins.mean()) if len(wins) else None,
+        "avg_loss": float(losses.mean()) if len(losses) else None,
+        "max_drawdown": float(drawdown.max()),
+    }
+
+
+def run_backtest(series: List[SignalSeries], **params) -> dict:
+    """Simulate every coin with ``params`` (see simulate) and report overall and per score bucket."""
+    trades = [simulate(s, **params) for s in series]
+    ts = np.concatenate([tr["ts"] for tr in trades]) if trades else np.empty(0, np.int64)
+    order = np.argsort(ts, kind="stable")
+    score = np.concatenate([tr["score"] for tr in trades])[order] if trades else np.empty(0)
+    ret = np.concatenate([tr["ret"] for tr in trades])[order] if trades else np.empty(0)
+    outcome = np.concatenate([tr["outcome"] for tr in trades])[order] if trades else np.empty(0)
+
+    buckets = {}
+    which = np.digitize(score, SCORE_BUCKETS) - 1
+    for b, (lo, hi) in enumerate(zip(SCORE_BUCKETS, SCORE_BUCKETS[1:])):
+        sel = which == b
+        buckets[f"{lo:g}-{min(hi, 10):g}"] = trade_stats(ret[sel], outcome[sel])
+    return {"params": params, "coins": len(series), "overall": trade_stats(ret, outcome), "buckets": buckets}
+
+
+def sweep(series: List[SignalSeries], grid: Dict[str, list]) -> List[dict]:
+    """run_backtest for every combination in ``grid`` over the same precomputed series."""
+    names = list(grid)
+    runs = []
+    for values in itertools.product(*(grid[n] for n in names)):
+        result = run_backtest(series, **dict(zip(names, values)))
+        runs.append({"params": result["params"], **result["overall"]})
+    return sorted(runs, key=lambda r: r["expectancy"] if r["expectancy"] is not None else float("-inf"), reverse=True)
+
+
+def _parse_sweep(specs: List[str]) -> Dict[str, list]:
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in ("min_score", "sl_atr", "tp_atr", "horizon", "warmup"):
+            raise SystemExit(f"unknown sweep parameter: {name}")
+        cast = int if name in ("horizon", "warmup") else float
+        grid[name] = [cast(v) for v in values.split(",") if v]
+    return grid
+
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description="Walk-forward backtest of Tier 2 signals over the candle store")
+    ap.add_argument("--store", default=CANDLE_STORE_DIR)
+    ap.add_argument("--coins", default="", help="comma-separated coin ids (default: all stored)")
+    ap.add_argument("--workers", type=int, default=BACKTEST_WORKERS)
+    ap.add_argument("--min-score", type=float, default=0.0,
+                    help=f"only trade signals at or above this score (alerts use {ALERT_MIN_SCORE:g})")
+    ap.add_argument("--horizon", type=int, default=BACKTEST_HORIZON)
+    ap.add_argument("--sweep", action="append", default=[], metavar="PARAM=V1,V2,...")
+    ap.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = ap.parse_args(argv)
+
+    coin_ids = [c for c in args.coins.split(",") if c] or stored_coins(args.store)
+    if not coin_ids:
+        logging.error("No candles under %s; run a scan first or pass --store", args.store)
+        return 1
+    series = prepare(coin_ids, args.store, args.workers)
+    logging.info("Prepared %d coins (%d candles)", len(series), sum(len(s.close) for s in series))
+
+    report = run_backtest(series, min_score=args.min_score, horizon=args.horizon)
+    if args.sweep:
+        report["sweep"] = sweep(series, _parse_sweep(args.sweep))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# benchmarks/bench_app.py
+"""
+Dashboard latency (p50/p99) before and after the snapshot cache, over synthetic results.
+"before" is the original handler: every request json.loads the whole tier2_results.json and
+re-renders the table, with no cache, compression or ETag. "after" is app.py's cached route.
+
+    python -m benchmarks.bench_app [--rows 200] [--requests 500]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.fixtures import signal_rows
+
+
+def percentiles(samples):
+    qs = statistics.quantiles(samples, n=100)
+    return qs[49] * 1000, qs[98] * 1000
+
+
+def measure(client, n_requests, headers):
+    samples = []
+    for _ in range(n_requests):
+        t0 = time.perf_counter()
+        resp = client.get("/", headers=headers)
+        samples.append(time.perf_counter() - t0)
+        assert resp.status_code in (200, 304)
+    return percentiles(samples)
+
+
+def baseline_app(path):
+    """The pre-cache dashboard route: load every row and render the page on each request."""
+    from fastapi import FastAPI
+    from fastapi.responses import HTMLResponse
+    from app import render_dashboard
+
+    app = FastAPI()
+
+    @app.get("/", response_class=HTMLResponse)
+    def dashboard():
+        with open(path) as f:
+            rows = json.load(f)
+        return HTMLResponse(content=render_dashboard(rows))
+
+    return app
+
+
+def run(n_rows, n_requests):
+    from fastapi.testclient import TestClient
+    import app as app_module
+
+    workdir = tempfile.mkdtemp(prefix="bench_app_")
+    os.chdir(workdir)
+    from results_store import write_results
+    rows = signal_rows(n_rows)
+    write_results(rows)
+    legacy = os.path.join(workdir, "tier2_results.json")
+    with open(legacy, "w") as f:
+        json.dump(rows, f)
+
+    before = measure(TestClient(baseline_app(legacy)), n_requests, {})
+    client = TestClient(app_module.app)
+    app_module.cache.invalidate()
+    after = measure(client, n_requests, {"Accept-Encoding": "gzip"})
+    etag = client.get("/").headers["etag"]
+    conditional = measure(client, n_requests, {"If-None-Match": etag})
+
+    print(f"{n_rows} rows, {n_requests} requests")
+    for label, (p50, p99) in (("before", before), ("cached gzip", after), ("cached 304", conditional)):
+        print(f"  {label:12} p50 {p50:7.2f} ms  p99 {p99:7.2f} ms")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200)
+    ap.add_argument("--requests", type=int, default=500)
+    args = ap.parse_args()
+    run(args.rows, args.requests)
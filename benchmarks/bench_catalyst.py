@@ -0,0 +1,62 @@
+# benchmarks/bench_catalyst.py
+"""
+Catalyst index: ingest rate with near-duplicate detection, per-ticker lookup latency vs
+sorting every stored item, and retained size under a long firehose.
+
+    python -m benchmarks.bench_catalyst [--items 100000] [--tickers 2000]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.fixtures import catalyst_items
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=100_000)
+    ap.add_argument("--tickers", type=int, default=2000)
+    ap.add_argument("--per-sec", type=float, default=50.0, help="simulated arrival rate (items/sec of item time)")
+    args = ap.parse_args()
+
+    from catalyst_analysis import CatalystIndex, pick_best_catalyst
+
+    items = catalyst_items(args.items, args.tickers, per_sec=args.per_sec)
+    clock = {"now": items[0]["ts"]}
+    index = CatalystIndex(clock=lambda: clock["now"])
+
+    t0 = time.perf_counter()
+    for item in items:
+        clock["now"] = item["ts"]
+        index.add(item)
+    elapsed = time.perf_counter() - t0
+    print(f"ingest  {args.items} items in {elapsed:.2f}s  ({args.items / elapsed:,.0f} items/s)  "
+          f"stats {index.stats}  retained {len(index)} items / {len(index._fingerprints)} fingerprints")
+
+    tickers = [f"TKR{i}" for i in range(0, args.tickers, max(args.tickers // 500, 1))]
+    samples = []
+    for t in tickers:
+        t0 = time.perf_counter()
+        index.best(t)
+        samples.append(time.perf_counter() - t0)
+    qs = statistics.quantiles(samples, n=100)
+    print(f"lookup  index.best      p50 {qs[49] * 1e6:7.1f} us  p99 {qs[98] * 1e6:7.1f} us")
+
+    # the pre-index path: every stored item for the ticker, sorted to take the first
+    by_ticker = {}
+    for item in items:
+        for t in item["tickers"]:
+            by_ticker.setdefault(t, []).append(item)
+    samples = []
+    for t in tickers:
+        t0 = time.perf_counter()
+        sorted(by_ticker.get(t, []), key=lambda c: (c.get("impact", 0), c.get("engagement", 0), c.get("ts", 0)), reverse=True)[:1]
+        samples.append(time.perf_counter() - t0)
+    qs = statistics.quantiles(samples, n=100)
+    print(f"lookup  full-list sort  p50 {qs[49] * 1e6:7.1f} us  p99 {qs[98] * 1e6:7.1f} us  "
+          f"(avg {args.items / args.tickers:.0f} items/ticker)")
+    pick_best_catalyst(by_ticker.get(tickers[0], []))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/bench_indicators.py
+"""
+Per-coin compute_metrics loop vs compute_metrics_batch on synthetic random-walk candles.
+
+    python -m benchmarks.bench_indicators [--sizes 200,2000,20000] [--candles 168] [--loop-cap 2000]
+
+The per-coin loop is timed on at most --loop-cap coins and extrapolated linearly beyond that.
+Exits non-zero if any batch value is further than --tolerance (relative) from the loop's.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from technical_indicators import compute_metrics, compute_metrics_batch, panel_from_frames
+from benchmarks.fixtures import ohlcv_frames
+
+
+TOLERANCE = 1e-9
+
+
+def run(sizes, n_candles, loop_cap, tolerance=TOLERANCE) -> bool:
+    ok = True
+    for n in sizes:
+        frames = ohlcv_frames(n, n_candles)
+        sample = dict(list(frames.items())[:min(n, loop_cap)])
+
+        t0 = time.perf_counter()
+        loop = {k: compute_metrics(df) for k, df in sample.items()}
+        loop_sec = (time.perf_counter() - t0) * n / len(sample)
+
+        t0 = time.perf_counter()
+        ids, close, high, low, volume = panel_from_frames(frames)
+        batch = compute_metrics_batch(close, high, low, volume, index=ids)
+        batch_sec = time.perf_counter() - t0
+
+        expected = pd.DataFrame.from_dict(loop, orient="index").astype(float)
+        got = batch.loc[expected.index, expected.columns]
+        err = float(np.nanmax(np.abs(got.to_numpy() - expected.to_numpy()) / (np.abs(expected.to_numpy()) + 1e-9)))
+        est = " (est)" if len(sample) < n else ""
+        print(f"{n:>7} coins  loop {loop_sec:8.3f}s{est:6}  batch {batch_sec:7.3f}s  "
+              f"speedup {loop_sec / batch_sec:6.1f}x  max rel err {err:.2e}")
+        if not err <= tolerance:
+            print(f"  batch results differ from compute_metrics by more than {tolerance:.0e}", file=sys.stderr)
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="200,2000,20000")
+    ap.add_argument("--candles", type=int, default=168)
+    ap.add_argument("--loop-cap", type=int, default=2000)
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = ap.parse_args()
+    sys.exit(0 if run([int(s) for s in args.sizes.split(",")], args.candles, args.loop_cap, args.tolerance) else 1)
@@ -0,0 +1,61 @@
+# benchmarks/bench_scoring.py
+"""
+Scoring throughput: compute_ai_score per coin vs scoring.score_batch, from metrics dicts
+(including the column conversion) and from prebuilt columns, for the heuristic and a
+logistic model. Checks the batch heuristic matches compute_ai_score on every row.
+
+    python -m benchmarks.bench_scoring [--coins 10000,100000] [--repeat 5]
+"""
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from benchmarks.fixtures import metrics_dicts
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(sizes, repeat):
+    from scoring import (compute_ai_score, score_batch, metrics_columns, HeuristicBackend,
+                         LogisticBackend, save_logistic)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_scoring_"), "model.npz")
+    save_logistic(path, ["rvol", "rsi", "ema5_13", "ema13_50", "htf_ema5_13", "htf_rsi"],
+                  [0.8, 0.3, 0.5, 0.4, 0.3, 0.2], -1.0, mean=[1.5, 50, 0, 0, 0, 50], std=[1, 15, 0.05, 0.03, 0.05, 15])
+    heuristic, model = HeuristicBackend(), LogisticBackend.load(path)
+
+    for n in sizes:
+        metrics = metrics_dicts(n, timeframes=["15m", "1h", "4h"])
+        cols = metrics_columns(metrics)
+        ref = [compute_ai_score(m) for m in metrics]
+        scores, reasons = score_batch(cols, heuristic)
+        assert np.array_equal(scores, [s for s, _ in ref]) and list(reasons) == [r for _, r in ref]
+
+        timings = {
+            "compute_ai_score loop": best_of(lambda: [compute_ai_score(m) for m in metrics], repeat),
+            "score_batch(dicts)": best_of(lambda: score_batch(metrics, heuristic), repeat),
+            "score_batch(columns)": best_of(lambda: score_batch(cols, heuristic), repeat),
+            "logistic(columns)": best_of(lambda: score_batch(cols, model), repeat),
+        }
+        base = timings["compute_ai_score loop"]
+        print(f"{n} coins (batch heuristic == compute_ai_score on every row)")
+        for label, sec in timings.items():
+            print(f"  {label:24} {sec * 1000:9.2f} ms  {n / sec / 1e6:7.2f} M coins/s  x{base / sec:5.1f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--coins", default="10000,100000")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    run([int(n) for n in args.coins.split(",")], args.repeat)
@@ -0,0 +1,119 @@
+# benchmarks/bench_startup.py
+"""
+Web cold start: `python -X importtime -c "import app"` in a fresh interpreter (total import
+time, slowest top-level imports, and whether heavy modules got pulled in), plus wall time from
+spawning `uvicorn app:app` to the first 200 on / and on /health. Runs from an empty working
+directory with a row snapshot on disk and Supabase pointed at an unreachable address, so the
+first page is the pre-connection snapshot dashboard. Prints a JSON result line.
+
+    python -m benchmarks.bench_startup [--runs 3] [--top 10]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+from benchmarks.fixtures import signal_rows
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("supabase", "pandas", "numpy", "requests")
+
+
+def _env(workdir: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT, DATA_DIR=os.path.join(workdir, "data"),
+               SUPABASE_URL="http://127.0.0.1:9", SUPABASE_ANON_KEY="bench")
+    return env
+
+
+def _workdir() -> str:
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    os.makedirs(os.path.join(workdir, "data"))
+    with open(os.path.join(workdir, "data", "dashboard_rows.json"), "w") as f:
+        json.dump(signal_rows(200), f)
+    return workdir
+
+
+def import_profile(workdir: str, top: int = 10) -> dict:
+    """Parse -X importtime output for `import app`: total, its slowest direct imports, heavy modules loaded."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                         cwd=workdir, env=_env(workdir), capture_output=True, text=True, check=True)
+    cumulative, children, toplevel = {}, [], []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = line.split("|")
+        module, depth = name.strip(), (len(name) - len(name.lstrip()) - 1) // 2
+        cumulative[module] = int(cum)
+        # children are printed before their parent: collect depth-1 lines until app's own line
+        if depth == 1:
+            children.append((module, int(cum)))
+        elif depth == 0:
+            toplevel = children if module == "app" else toplevel
+            children = []
+    toplevel.sort(key=lambda item: item[1], reverse=True)
+    return {
+        "import_app_sec": cumulative.get("app", 0) / 1e6,
+        "top": [(name, round(us / 1e3, 1)) for name, us in toplevel[:top]],
+        "heavy": sorted(m for m in HEAVY if m in cumulative),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(url: str, deadline: float) -> float:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return time.perf_counter()
+        except OSError:
+            time.sleep(0.005)
+    raise TimeoutError(url)
+
+
+def first_response(workdir: str, timeout: float = 30.0) -> dict:
+    """Seconds from spawning uvicorn to the first 200 from /health and from /."""
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+                            cwd=workdir, env=_env(workdir), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        health = _wait_for(f"http://127.0.0.1:{port}/health", started + timeout) - started
+        t0 = time.perf_counter()
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=timeout) as resp:
+            assert resp.status == 200 and b"<tr" in resp.read()
+        dashboard = health + time.perf_counter() - t0
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return {"health_sec": health, "dashboard_sec": dashboard}
+
+
+def run(runs: int = 3, top: int = 10) -> dict:
+    workdir = _workdir()
+    profile = min((import_profile(workdir, top) for _ in range(runs)), key=lambda p: p["import_app_sec"])
+    responses = [first_response(workdir) for _ in range(runs)]
+    return {
+        "import_app_sec": profile["import_app_sec"],
+        "first_health_sec": min(r["health_sec"] for r in responses),
+        "first_dashboard_sec": min(r["dashboard_sec"] for r in responses),
+        "heavy_imports": profile["heavy"],
+        "top_imports_ms": profile["top"],
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=3, help="report the best of this many cold starts")
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+    print(json.dumps(run(args.runs, args.top)))
@@ -0,0 +1,45 @@
+# benchmarks/bench_tier1.py
+"""
+Per-dict passes_tier1 loop vs the columnar Tier 1 filter on synthetic CoinGecko markets:
+from a list of dicts, from list columns (universe snapshot) and from float ndarrays.
+
+    python -m benchmarks.bench_tier1 [--sizes 10000,100000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from scanner_tier1 import filter_markets, passes_tier1, tier1_mask, TIER1_COLUMNS
+from benchmarks.fixtures import markets_payload
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def run(sizes):
+    for n in sizes:
+        markets = markets_payload(n)
+        columns = {f: [m.get(f) for m in markets] for f in TIER1_COLUMNS}
+        loop_sec, loop = timed(lambda: [m for m in markets if passes_tier1(m)])
+        dict_sec, (survivors, rejections) = timed(lambda: filter_markets(markets))
+        col_sec, (mask, _) = timed(lambda: tier1_mask(columns))
+        arrays = {f: np.array([v or 0 for v in vals], dtype=float) for f, vals in columns.items()}
+        arr_sec, _ = timed(lambda: tier1_mask(arrays))
+        assert [m["id"] for m in loop] == [m["id"] for m in survivors] and int(mask.sum()) == len(loop)
+        print(f"{n:>7} markets  loop {loop_sec * 1000:8.1f} ms  dicts->columnar {dict_sec * 1000:7.1f} ms "
+              f"({loop_sec / dict_sec:4.1f}x)  columnar {col_sec * 1000:6.1f} ms ({loop_sec / col_sec:5.1f}x)  "
+              f"ndarray {arr_sec * 1000:5.2f} ms ({loop_sec / arr_sec:5.0f}x)\n         "
+              f"survivors {len(survivors)}  rejections {rejections}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000")
+    run([int(s) for s in ap.parse_args().sizes.split(",")])
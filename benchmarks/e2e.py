@@ -0,0 +1,60 @@
+# benchmarks/e2e.py
+"""
+End-to-end offline scan: starts the stub server, points the scanner at it through the
+environment (before any project module is imported) and times one run_pipeline() cycle.
+Prints a JSON result line. Normally invoked by benchmarks.run in a fresh interpreter.
+
+    python -m benchmarks.e2e --markets 2000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--markets", type=int, default=1000)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds of stub latency per request")
+    ap.add_argument("--warm", action="store_true", help="time a second run against the warm candle store")
+    args = ap.parse_args(argv)
+
+    from benchmarks.stub_server import start_stub
+
+    server, state, url = start_stub(n_markets=args.markets, latency=args.latency)
+    workdir = tempfile.mkdtemp(prefix="scanner_e2e_")
+    os.environ.update({
+        "COINGECKO_API": url,
+        "TELEGRAM_API": url,
+        "COINGECKO_CALLS_PER_MIN": "0",
+        "DATA_DIR": os.path.join(workdir, "data"),
+        "MAX_MARKETS_TO_SCAN": str(args.markets),
+        "UNIVERSE_TTL_SEC": "0",
+    })
+    for key in ("SUPABASE_URL", "TELEGRAM_BOT_TOKEN"):
+        os.environ.pop(key, None)
+    os.chdir(workdir)
+
+    import logging
+    logging.disable(logging.WARNING)
+    from services.scanner import run_pipeline
+
+    t0 = time.perf_counter()
+    summary = run_pipeline()
+    elapsed = time.perf_counter() - t0
+    result = {"markets": args.markets, "tier1": summary["tier1"], "tier2": summary["tier2"],
+              "requests": len(state.requests), "pipeline_sec": round(elapsed, 4)}
+    if args.warm:
+        before = len(state.requests)
+        t0 = time.perf_counter()
+        run_pipeline()
+        result["warm_pipeline_sec"] = round(time.perf_counter() - t0, 4)
+        result["warm_requests"] = len(state.requests) - before
+    server.shutdown()
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# benchmarks/fixtures.py
+"""
+Deterministic synthetic CoinGecko payloads and derived fixtures. The same (n, seed) always
+produces the same data, from 100 to 100k coins.
+"""
+import zlib
+import random
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+HOUR_MS = 3_600_000
+FIVE_MIN_MS = 300_000
+
+
+def coin_seed(coin_id: str, seed: int = 0) -> int:
+    return zlib.crc32(coin_id.encode()) ^ seed
+
+
+def markets_payload(n: int, seed: int = 11, page: int = 1, per_page: int = None) -> List[dict]:
+    """/coins/markets rows ranked by market cap. With ``per_page`` returns just that page."""
+    start, stop = 0, n
+    if per_page:
+        start, stop = (page - 1) * per_page, min(page * per_page, n)
+    rows = []
+    for i in range(start, stop):
+        rng = random.Random(seed * 1_000_003 + i)
+        price = 10 ** rng.uniform(-4, 3)
+        mcap = 5e11 / (1 + i) ** 1.3 * rng.uniform(0.9, 1.1)
+        rows.append({
+            "id": f"coin-{i}", "symbol": f"c{i}", "name": f"Coin {i}",
+            "current_price": price,
+            "market_cap": mcap,
+            "market_cap_rank": i + 1,
+            "total_volume": mcap * 10 ** rng.uniform(-2.5, -0.3) if i % 50 else None,
+            "high_24h": price * 1.05, "low_24h": price * 0.95,
+            "price_change_percentage_24h": rng.uniform(-30, 30),
+            "circulating_supply": mcap / price,
+            "last_updated": "2024-01-01T00:00:00.000Z",
+        })
+    return rows
+
+
+def market_chart_payload(coin_id: str, days: int = 7, seed: int = 0, end_ms: int = 1_704_067_200_000,
+                         step_ms: int = HOUR_MS) -> Dict[str, list]:
+    """/coins/{id}/market_chart for ``days`` of points ending at ``end_ms`` (5-minutely for a day or less, like CoinGecko)."""
+    step_ms = FIVE_MIN_MS if days <= 1 else step_ms
+    n = max(int(days * 86_400_000 // step_ms), 1)
+    return market_chart_range_payload(coin_id, end_ms - n * step_ms, end_ms, seed, step_ms)
+
+
+def market_chart_range_payload(coin_id: str, start_ms: int, end_ms: int, seed: int = 0,
+                               step_ms: int = HOUR_MS) -> Dict[str, list]:
+    """/market_chart/range: a noisy cyclical series that is a pure function of (coin_id, timestamp)."""
+    first = (start_ms // step_ms + 1) * step_ms
+    ts = np.arange(first, end_ms + 1, step_ms, dtype=np.int64)
+    base = coin_seed(coin_id, seed)
+    # per-timestamp noise keyed on the timestamp keeps overlapping windows and granularities consistent
+    noise = np.sin((ts // FIVE_MIN_MS).astype(float) * 12.9898 + base % 1000) * 43758.5453
+    noise = (noise - np.floor(noise)) - 0.5
+    level = 1 + (base % 997) / 10
+    hours = ts / HOUR_MS + base % 168
+    prices = level * np.exp(noise * 0.02 + np.sin(hours / 24.0) * 0.03 + np.sin(hours / 168.0) * 0.1)
+    volumes = level * 1e6 * (1.5 + noise)
+    return {
+        "prices": [[int(t), float(p)] for t, p in zip(ts, prices)],
+        "total_volumes": [[int(t), float(v)] for t, v in zip(ts, volumes)],
+    }
+
+
+def ohlc_payload(coin_id: str, days: int = 1, seed: int = 0, end_ms: int = 1_704_067_200_000) -> List[list]:
+    """/coins/{id}/ohlc: [close_ms, o, h, l, c] from the 5-minute series; 30-minute candles up to 2 days, 4-hourly beyond."""
+    candle_ms = 1_800_000 if days <= 2 else 4 * HOUR_MS
+    end_ms = end_ms // candle_ms * candle_ms
+    prices = market_chart_range_payload(coin_id, end_ms - int(days * 86_400_000), end_ms, seed, FIVE_MIN_MS)["prices"]
+    ts = np.array([p[0] for p in prices], dtype=np.int64)
+    px = np.array([p[1] for p in prices])
+    close_at = -(-ts // candle_ms) * candle_ms  # a candle covers (close - candle_ms, close]
+    rows = []
+    for t in np.unique(close_at):
+        sel = px[close_at == t]
+        rows.append([int(t), float(sel[0]), float(sel.max()), float(sel.min()), float(sel[-1])])
+    return rows
+
+
+def ohlcv_frames(n_coins: int, n_candles: int = 168, seed: int = 7, ragged: bool = True,
+                 freq: str = "h") -> Dict[str, pd.DataFrame]:
+    """Per-coin close/high/low/volume frames; every 5th coin has a shorter history when ``ragged``."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01", periods=n_candles, freq=freq)
+    frames = {}
+    for i in range(n_coins):
+        length = int(rng.integers(20, n_candles + 1)) if ragged and i % 5 == 0 else n_candles
+        close = 1 + np.cumsum(rng.normal(0, 0.01, length)) * 0.1 + i * 1e-3
+        spread = np.abs(rng.normal(0, 0.005, length)) * close
+        frames[f"coin{i}"] = pd.DataFrame(
+            {"close": close, "high": close + spread, "low": close - spread, "volume": rng.lognormal(13, 1, length)},
+            index=index[-length:],
+        )
+    return frames
+
+
+_HEADLINE_PARTS = (
+    ["Exchange lists", "Whales accumulate", "Mainnet launch for", "Partnership announced with", "Hack hits", "ETF filing mentions",
+     "Token unlock ahead for", "Developers ship upgrade to", "Airdrop confirmed for", "Regulator reviews"],
+    ["amid market rally", "as volume surges", "after weekend slump", "ahead of Fed decision", "in record session",
+     "despite bearish sentiment", "following community vote", "as traders rotate into alts"],
+    ["CoinDesk", "The Block", "Decrypt", "Twitter", "Reddit", "Cointelegraph"],
+)
+
+
+def catalyst_items(n: int, n_tickers: int = 2000, dup_rate: float = 0.2, start_ts: float = 1_704_067_200.0,
+                   per_sec: float = 50.0, seed: int = 13) -> List[dict]:
+    """News items over ``n_tickers`` symbols arriving at ``per_sec``; ``dup_rate`` of them re-word an earlier headline."""
+    rng = random.Random(seed)
+    actions, tails, sources = _HEADLINE_PARTS
+    items = []
+    for i in range(n):
+        if items and rng.random() < dup_rate:
+            base = rng.choice(items[-500:])
+            title = base["title"].replace(" amid ", " amidst ") if rng.random() < 0.5 else base["title"] + "!"
+            tickers = base["tickers"]
+        else:
+            tickers = [f"TKR{rng.randrange(n_tickers)}"]
+            title = f"{rng.choice(actions)} {tickers[0]} {rng.choice(tails)} (#{i})"
+        items.append({
+            "title": title,
+            "source": rng.choice(sources),
+            "url": f"https://news.example/{i}",
+            "impact": rng.randint(1, 5),
+            "engagement": int(rng.lognormvariate(4, 1.5)),
+            "ts": start_ts + i / per_sec,
+            "tickers": tickers,
+        })
+    return items
+
+
+def signal_rows(n: int, seed: int = 3) -> List[dict]:
+    """Tier 2 result rows as written by the scanner."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        price = rng.uniform(0.01, 50)
+        atr = price * rng.uniform(0.005, 0.05)
+        rows.append({
+            "ticker": f"COIN{i}", "coin_id": f"coin{i}", "name": f"Coin {i}", "price": price,
+            "rsi": rng.uniform(20, 80), "ema5": price, "ema13": price * 0.99, "ema50": price * 0.97,
+            "vwap": price, "atr": atr, "rvol": rng.uniform(0.5, 4), "volume": rng.uniform(1e6, 1e8),
+            "ai_score": round(rng.uniform(0, 10), 2), "ai_reason": "synthetic",
+            "risk": {"entry": price, "stop_loss": price - 1.5 * atr, "take_profit": price + 3 * atr},
+            "tier": "tier2",
+        })
+    return rows
+
+
+def metrics_dicts(n: int, seed: int = 5, timeframes: Optional[List[str]] = None) -> List[dict]:
+    """compute_metrics-shaped dicts for scoring benchmarks, with per-timeframe metrics under "tf" if given."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        ema50 = rng.uniform(0.5, 2)
+        m = {
+            "rsi": rng.uniform(10, 90), "rvol": rng.uniform(0, 5),
+            "ema5": ema50 * rng.uniform(0.9, 1.1), "ema13": ema50 * rng.uniform(0.95, 1.05), "ema50": ema50,
+            "atr": ema50 * 0.02, "vwap": ema50, "volume": rng.uniform(1e5, 1e7),
+        }
+        if timeframes:
+            m["tf"] = {tf: {"rsi": rng.uniform(10, 90), "ema5": ema50 * rng.uniform(0.9, 1.1), "ema13": ema50}
+                       for tf in timeframes}
+        out.append(m)
+    return out
@@ -0,0 +1,203 @@
+# benchmarks/run.py
+"""
+Reproducible benchmark suite: per-function micro-benchmarks on deterministic fixtures, an
+end-to-end offline pipeline run against the local stub server and the web app's cold start
+(import time and time to first response).
+
+    python -m benchmarks.run                          # run and print
+    python -m benchmarks.run --save-baseline          # write benchmarks/baseline.json
+    python -m benchmarks.run --compare                # exit 1 if anything is >25% slower than baseline
+    python -m benchmarks.run --scale 10 --only tier1  # bigger fixtures, subset by name prefix
+
+Each micro-benchmark reports the best of --repeat timings in seconds. Baselines are machine
+specific: save one on the machine (or CI runner class) you compare on.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from typing import Callable, Dict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+BENCHMARKS: Dict[str, Callable] = {}
+
+
+def bench(name: str):
+    """Register ``setup(scale) -> fn``; only ``fn()`` is timed."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@bench("indicators.compute_metrics_x200")
+def _(scale):
+    from technical_indicators import compute_metrics
+    from benchmarks.fixtures import ohlcv_frames
+    frames = list(ohlcv_frames(200 * scale).values())
+    return lambda: [compute_metrics(df) for df in frames]
+
+
+@bench("indicators.compute_metrics_3tf_x200")
+def _(scale):
+    from technical_indicators import compute_metrics
+    from benchmarks.fixtures import ohlcv_frames
+    frames = list(ohlcv_frames(200 * scale, 1000, freq="15min").values())
+    return lambda: [compute_metrics(df, ["15m", "1h", "4h"], primary="1h") for df in frames]
+
+
+@bench("indicators.compute_metrics_batch_x2000")
+def _(scale):
+    from technical_indicators import compute_metrics_batch, panel_from_frames
+    from benchmarks.fixtures import ohlcv_frames
+    ids, close, high, low, volume = panel_from_frames(ohlcv_frames(2000 * scale))
+    return lambda: compute_metrics_batch(close, high, low, volume, index=ids)
+
+
+@bench("tier1.passes_tier1_x10000")
+def _(scale):
+    from scanner_tier1 import passes_tier1
+    from benchmarks.fixtures import markets_payload
+    markets = markets_payload(10_000 * scale)
+    return lambda: [m for m in markets if passes_tier1(m)]
+
+
+@bench("tier1.tier1_mask_x10000")
+def _(scale):
+    from scanner_tier1 import tier1_mask, TIER1_COLUMNS
+    from benchmarks.fixtures import markets_payload
+    markets = markets_payload(10_000 * scale)
+    columns = {f: [m.get(f) for m in markets] for f in TIER1_COLUMNS}
+    return lambda: tier1_mask(columns)
+
+
+@bench("scoring.compute_ai_score_x10000")
+def _(scale):
+    from scoring import compute_ai_score
+    from benchmarks.fixtures import metrics_dicts
+    metrics = metrics_dicts(10_000 * scale)
+    return lambda: [compute_ai_score(m) for m in metrics]
+
+
+@bench("scoring.score_batch_x10000")
+def _(scale):
+    from scoring import score_batch, metrics_columns, HeuristicBackend
+    from benchmarks.fixtures import metrics_dicts
+    cols = metrics_columns(metrics_dicts(10_000 * scale, timeframes=["15m", "1h", "4h"]))
+    backend = HeuristicBackend()
+    return lambda: score_batch(cols, backend)
+
+
+@bench("app.render_dashboard_x200")
+def _(scale):
+    from app import render_dashboard
+    from benchmarks.fixtures import signal_rows
+    rows = signal_rows(200 * scale)
+    return lambda: render_dashboard(rows)
+
+
+def run_micro(names, scale: int, repeat: int) -> Dict[str, float]:
+    results = {}
+    for name in names:
+        fn = BENCHMARKS[name](scale)
+        fn()  # warm-up
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        results[name] = best
+        print(f"  {name:45} {best * 1000:10.2f} ms")
+    return results
+
+
+def run_e2e(scale: int) -> Dict[str, float]:
+    markets = 1000 * scale
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.e2e", "--markets", str(markets), "--warm"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    data = json.loads(out.stdout.strip().splitlines()[-1])
+    print(f"  e2e: {data}")
+    return {
+        f"e2e.pipeline_cold_x{markets}": data["pipeline_sec"],
+        f"e2e.pipeline_warm_x{markets}": data["warm_pipeline_sec"],
+    }
+
+
+def run_startup() -> Dict[str, float]:
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup"], cwd=ROOT, capture_output=True, text=True, check=True)
+    data = json.loads(out.stdout.strip().splitlines()[-1])
+    print(f"  startup: {data}")
+    return {
+        "startup.import_app": data["import_app_sec"],
+        "startup.first_health": data["first_health_sec"],
+        "startup.first_dashboard": data["first_dashboard_sec"],
+    }
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> bool:
+    ok = True
+    for name, value in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            print(f"  {name:45} (no baseline)")
+            continue
+        change = value / base - 1
+        flag = "REGRESSION" if change > threshold else ""
+        ok &= not flag
+        print(f"  {name:45} {change * 100:+7.1f}% {flag}")
+    return ok
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scale", type=int, default=1, help="multiply fixture sizes (1 -> 100..10k coins)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", default="", help="comma-separated name prefixes")
+    ap.add_argument("--no-e2e", action="store_true")
+    ap.add_argument("--output", help="write results JSON here")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--compare", action="store_true")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    args = ap.parse_args(argv)
+
+    prefixes = [p for p in args.only.split(",") if p]
+    names = [n for n in BENCHMARKS if not prefixes or any(n.startswith(p) for p in prefixes)]
+    print(f"Micro-benchmarks (scale={args.scale}, best of {args.repeat}):")
+    results = run_micro(names, args.scale, args.repeat)
+    if not args.no_e2e and (not prefixes or any("e2e".startswith(p) for p in prefixes)):
+        results.update(run_e2e(args.scale))
+    if not args.no_e2e and (not prefixes or any("startup".startswith(p) for p in prefixes)):
+        results.update(run_startup())
+
+    doc = {"python": platform.python_version(), "machine": platform.machine(), "scale": args.scale, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(doc, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(doc, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; run with --save-baseline first")
+            return 2
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != args.scale:
+            print(f"Baseline was recorded at scale {baseline.get('scale')}; comparing anyway")
+        print(f"Against baseline (threshold {args.threshold:.0%}):")
+        return 0 if compare(results, baseline["results"], args.threshold) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
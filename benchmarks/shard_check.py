@@ -0,0 +1,122 @@
+# benchmarks/shard_check.py
+"""
+Local check that sharded scanning matches a single worker. The script:
+
+1. Starts the stub provider with a pinned clock.
+2. Runs `scheduler.py` once into one data dir.
+3. Runs `scheduler.py --list-universe` once into a second data dir, as the workflow does.
+4. Runs `scheduler.py --shard i/N` as N concurrent processes into that second dir.
+5. Runs `scheduler.py --merge N` in that second dir.
+
+It then compares the merged results (every column but the row timestamp), the Tier 1 counts
+and rejections, the shard partition, the number of rows alerted, and the number of
+/coins/markets requests (the sharded run must list the universe only once). It prints a JSON result
+line and exits 1 on any difference. The timings are only informational: every process shares
+one local stub and this machine's CPUs, whereas matrix jobs each get their own runner and IP.
+
+    python -m benchmarks.shard_check [--shards 4] [--markets 2000]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.stub_server import start_stub
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env(url: str, data_dir: str, markets: int, universe_ttl: int = 0) -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT, COINGECKO_API=url, TELEGRAM_API=url, TELEGRAM_BOT_TOKEN="stub",
+               TELEGRAM_CHANNEL_ID="stub", COINGECKO_CALLS_PER_MIN="0", DATA_DIR=data_dir,
+               MAX_MARKETS_TO_SCAN=str(markets), UNIVERSE_TTL_SEC=str(universe_ttl), SENTIMENT_SOURCES="",
+               ALERT_MIN_SCORE="4")  # low enough that the fixtures produce alerts
+    for key in ("SUPABASE_URL", "RESULTS_FILE", "RUN_SUMMARY_FILE", "SCAN_LOCK_FILE"):
+        env.pop(key, None)
+    return env
+
+
+def _scan(args, env, cwd) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, os.path.join(ROOT, "scheduler.py")] + args, env=env, cwd=cwd,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+
+def _wait(procs):
+    for p in procs:
+        _, err = p.communicate()
+        if p.returncode:
+            raise SystemExit(f"scan failed ({p.args[2:]}):\n{err[-2000:]}")
+
+
+def _listing_requests(state) -> int:
+    return sum(1 for path in state.requests if path.endswith("/coins/markets"))
+
+
+def _outputs(data_dir: str):
+    from results_store import read_results
+    rows = {r["coin_id"]: {k: v for k, v in r.items() if k != "time"}
+            for r in read_results(os.path.join(data_dir, "tier2_results.ndjson"))}
+    with open(os.path.join(data_dir, "run_summary.json")) as f:
+        summary = json.load(f)
+    return rows, summary
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--shards", type=int, default=4)
+    ap.add_argument("--markets", type=int, default=2000)
+    args = ap.parse_args(argv)
+
+    server, state, url = start_stub(n_markets=args.markets, now_ms=int(time.time() * 1000))
+    workdir = tempfile.mkdtemp(prefix="shard_check_")
+    single_dir, sharded_dir = os.path.join(workdir, "single"), os.path.join(workdir, "sharded")
+
+    t0 = time.perf_counter()
+    _wait([_scan([], _env(url, single_dir, args.markets), workdir)])
+    single_sec = time.perf_counter() - t0
+    single_listing = _listing_requests(state)
+
+    env = _env(url, sharded_dir, args.markets, universe_ttl=600)
+    t0 = time.perf_counter()
+    _wait([_scan(["--list-universe"], env, workdir)])
+    _wait([_scan(["--shard", f"{i}/{args.shards}"], env, workdir) for i in range(1, args.shards + 1)])
+    sharded_sec = time.perf_counter() - t0
+    _wait([_scan(["--merge", str(args.shards)], env, workdir)])
+    sharded_listing = _listing_requests(state) - single_listing
+    server.shutdown()
+    server.server_close()
+
+    from results_store import read_results
+    from services.sharding import Shard, shard_path
+    single_rows, single_summary = _outputs(single_dir)
+    merged_rows, merged_summary = _outputs(sharded_dir)
+    per_shard = [{r["coin_id"] for r in read_results(shard_path(os.path.join(sharded_dir, "tier2_results.ndjson"),
+                                                                  Shard(i, args.shards)))}
+                 for i in range(1, args.shards + 1)]
+
+    checks = {
+        "rows_equal": single_rows == merged_rows,
+        "tier1_equal": single_summary["tier1"] == merged_summary["tier1"],
+        "rejections_equal": single_summary["tier1_rejections"] == merged_summary["tier1_rejections"],
+        "shards_disjoint": sum(len(s) for s in per_shard) == len(set().union(*per_shard)),
+        "alerts_equal": single_summary["alerts"] == merged_summary["alerts"],
+        "universe_listed_once": sharded_listing == single_listing,
+    }
+    result = {
+        "markets": args.markets, "shards": args.shards, "rows": len(single_rows),
+        "rows_per_shard": [len(s) for s in per_shard], "alerts": single_summary["alerts"],
+        "single_sec": round(single_sec, 3), "sharded_sec": round(sharded_sec, 3), **checks,
+    }
+    if not checks["rows_equal"]:
+        diff = sorted(set(single_rows) ^ set(merged_rows)) or sorted(
+            c for c in single_rows if single_rows[c] != merged_rows.get(c))
+        result["differing_coins"] = diff[:10]
+    print(json.dumps(result))
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
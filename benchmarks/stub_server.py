@@ -0,0 +1,104 @@
+# benchmarks/stub_server.py
+"""
+Local stand-in for the CoinGecko and Telegram endpoints the scanner uses, serving the
+deterministic payloads from benchmarks.fixtures. Point the scanner at it with
+COINGECKO_API=<base_url> and TELEGRAM_API=<base_url>.
+
+    python -m benchmarks.stub_server --port 8765 --markets 5000
+"""
+import re
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from benchmarks import fixtures
+
+
+class StubState:
+    def __init__(self, n_markets: int = 1000, seed: int = 11, latency: float = 0.0, now_ms: int = None):
+        self.n_markets = n_markets
+        self.seed = seed
+        self.latency = latency
+        self.now_ms = now_ms
+        self.requests = []
+        self.messages = []
+        self.lock = threading.Lock()
+
+    def now(self) -> int:
+        return self.now_ms or int(time.time() * 1000)
+
+
+def _handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, body, status=200):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            with state.lock:
+                state.requests.append(url.path)
+            if state.latency:
+                time.sleep(state.latency)
+            path = url.path.rstrip("/")
+            if path.endswith("/coins/markets"):
+                per_page = int(q.get("per_page", 100))
+                page = int(q.get("page", 1))
+                return self._send(fixtures.markets_payload(state.n_markets, state.seed, page, per_page))
+            m = re.search(r"/coins/([^/]+)/ohlc$", path)
+            if m:
+                return self._send(fixtures.ohlc_payload(m.group(1), float(q.get("days", 1)), end_ms=state.now()))
+            m = re.search(r"/coins/([^/]+)/market_chart(/range)?$", path)
+            if m and m.group(2):
+                start, end = int(float(q["from"])) * 1000, min(int(float(q["to"])) * 1000, state.now())
+                step = fixtures.FIVE_MIN_MS if end - start <= 86_400_000 else fixtures.HOUR_MS
+                return self._send(fixtures.market_chart_range_payload(m.group(1), start, end, step_ms=step))
+            if m:
+                end = state.now()
+                return self._send(fixtures.market_chart_payload(m.group(1), float(q.get("days", 7)), end_ms=end))
+            return self._send({"error": "not found"}, 404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path.endswith("/sendMessage"):
+                with state.lock:
+                    state.messages.append(body)
+                return self._send({"ok": True, "result": {"message_id": len(state.messages)}})
+            return self._send({"ok": False}, 404)
+
+    return Handler
+
+
+def start_stub(port: int = 0, **kwargs):
+    """Start the stub on a background thread. Returns (server, state, base_url)."""
+    state = StubState(**kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--markets", type=int, default=1000)
+    ap.add_argument("--latency", type=float, default=0.0)
+    args = ap.parse_args()
+    server, _, url = start_stub(args.port, n_markets=args.markets, latency=args.latency)
+    print(f"Stub listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,115 @@
+# broadcaster.py
+import json
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, Iterable, Optional, Set
+
+RESYNC = "event: resync\ndata: {}\n\n"
+
+
+class Subscriber:
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+
+class Broadcaster:
+    """
+    In-process fan-out of signal changes to Server-Sent Events subscribers.
+
+    publish(rows) diffs the rows against the last published set (keyed by coin_id) and sends
+    one pre-encoded event with only the changed/removed rows to every subscriber. Each
+    subscriber has a bounded queue; a client that falls behind has its backlog dropped and
+    gets a single ``resync`` event instead, so one slow reader never blocks the others.
+    publish() may be called from any thread.
+    """
+
+    def __init__(self, queue_size: int = 16, render: Optional[Callable[[dict], str]] = None):
+        self.queue_size = queue_size
+        self.render = render
+        self._subscribers: Set[Subscriber] = set()
+        self._rows: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.events_sent = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscriber:
+        sub = Subscriber(self.queue_size)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        self._subscribers.discard(sub)
+
+    def diff(self, rows: Iterable[dict]) -> dict:
+        """Update the published state and return {"upsert": [...], "remove": [...]}."""
+        latest = {}
+        for r in rows:
+            key = r.get("coin_id") or r.get("ticker")
+            if key:
+                latest[str(key)] = r
+        with self._lock:
+            changed = [r for k, r in latest.items() if self._rows.get(k) != r]
+            removed = [k for k in self._rows if k not in latest]
+            self._rows = latest
+        upserts = []
+        for r in changed:
+            item = {"coin_id": str(r.get("coin_id") or r.get("ticker")), "row": r}
+            if self.render:
+                item["html"] = self.render(r)
+            upserts.append(item)
+        return {"upsert": upserts, "remove": removed}
+
+    def publish(self, rows: Iterable[dict]) -> dict:
+        changes = self.diff(rows)
+        if not (changes["upsert"] or changes["remove"]):
+            return changes
+        event = "event: signals\ndata: %s\n\n" % json.dumps(changes, default=str)
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return changes
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(event)
+        else:
+            loop.call_soon_threadsafe(self._fanout, event)
+        return changes
+
+    def _fanout(self, event: str):
+        self.events_sent += 1
+        for sub in list(self._subscribers):
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                sub.dropped += sub.queue.qsize()
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                sub.queue.put_nowait(RESYNC)
+                logging.debug("SSE subscriber fell behind; sent resync")
+
+    async def stream(self, sub: Subscriber, is_disconnected: Callable, heartbeat: float = 15.0):
+        """Yield SSE frames for ``sub`` until the client disconnects."""
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(sub.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        break
+                    yield ": ping\n\n"
+        finally:
+            self.unsubscribe(sub)
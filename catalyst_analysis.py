@@ -1,5 +1,22 @@
 # catalyst_analysis.py
-from typing import Dict, Any, List
+import os
+import re
+import json
+import math
+import time
+import logging
+import heapq
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Optional
+
+import numpy as np
+
+from config import CATALYST_TOP_K, CATALYST_HALF_LIFE_SEC, CATALYST_MAX_AGE_SEC, CATALYST_MAX_TICKERS, CATALYST_FEED_FILE
+
+def _rank(c: Dict[str, Any]):
+    return (c.get("impact", 0), c.get("engagement", 0), c.get("ts", 0))
 
 def pick_best_catalyst(candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
@@ -7,12 +24,7 @@ def pick_best_catalyst(candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     if not candidates:
         return {}
-    ranked = sorted(
-        candidates,
-        key=lambda c: (c.get("impact", 0), c.get("engagement", 0), c.get("ts", 0)),
-        reverse=True
-    )
-    return ranked[0]
+    return max(candidates, key=_rank)
 
 def catalyst_summary(best: Dict[str, Any]) -> str:
     if not best:
@@ -20,3 +32,227 @@ def catalyst_summary(best: Dict[str, Any]) -> str:
     source = best.get("source", "News")
     title = best.get("title") or best.get("summary") or "Update"
     return f'{source}: "{title}"'
+
+
+_WORD = re.compile(r"[a-z0-9$]+")
+_BITS = np.arange(64, dtype=np.uint64)
+
+def simhash(text: str, n: int = 3) -> int:
+    """64-bit SimHash over word ``n``-gram shingles; near-duplicate headlines differ in few bits."""
+    words = _WORD.findall(text.lower())
+    shingles = [" ".join(words[i:i + n]) for i in range(max(len(words) - n + 1, 1))]
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in shingles],
+        dtype=np.uint64,
+    )
+    votes = ((hashes[:, None] >> _BITS) & np.uint64(1)).sum(axis=0)
+    return int(np.packbits(votes * 2 > len(hashes), bitorder="little").view("<u8")[0])
+
+
+class CatalystIndex:
+    """
+    Streaming index of news/social catalysts by ticker. Each item lists the symbols and/or coin
+    ids it concerns under "tickers"; every key keeps a min-heap of its best ``k`` items, so a
+    lookup costs O(k) no matter how many items have arrived.
+
+    Ranking decays with age: an item's strength (impact + log10(1 + engagement)) halves every
+    ``half_life`` seconds. Because every item decays at the same rate, log2(strength) + ts/half_life
+    orders items exactly as their decayed strengths do at any instant, so heap keys never need
+    rescoring. Items older than ``max_age`` are evicted, and the least recently updated tickers
+    are dropped beyond ``max_tickers``, which bounds memory under any ingest rate.
+
+    Near-duplicate headlines (SimHash within ``max_distance`` bits) seen within ``max_age`` are
+    dropped on ingest; fingerprints are bucketed into four 16-bit bands so the check is a few
+    dict lookups rather than a scan. At most ``max_fingerprints`` are remembered, oldest out first.
+    Items with neither title nor summary have nothing to compare and are never treated as duplicates.
+
+    Items arrive through add()/add_many() or, from any collector process, as lines appended to an
+    NDJSON feed file that ingest_feed() tails.
+    """
+
+    def __init__(self, k: int = CATALYST_TOP_K, half_life: float = CATALYST_HALF_LIFE_SEC,
+                 max_age: float = CATALYST_MAX_AGE_SEC, max_tickers: int = CATALYST_MAX_TICKERS,
+                 max_distance: int = 3, max_fingerprints: int = 200_000, clock=time.time):
+        self.k = k
+        self.half_life = half_life
+        self.max_age = max_age
+        self.max_tickers = max_tickers
+        self.max_distance = max_distance
+        self.max_fingerprints = max_fingerprints
+        self._clock = clock
+        self._heaps: "OrderedDict[str, list]" = OrderedDict()
+        self._fingerprints: "OrderedDict[int, float]" = OrderedDict()  # fp -> ts, oldest first
+        self._bands: Dict[tuple, set] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._feeds: Dict[str, tuple] = {}  # path -> (inode, byte offset read so far)
+        self.stats = {"added": 0, "duplicates": 0, "expired": 0}
+
+    def _key(self, item: Dict[str, Any]) -> float:
+        strength = max(item.get("impact", 0) or 0, 0) + math.log10(1 + max(item.get("engagement", 0) or 0, 0))
+        return math.log2(max(strength, 1e-9)) + item.get("ts", 0) / self.half_life
+
+    @staticmethod
+    def _band_keys(fp: int):
+        return [(i, (fp >> (16 * i)) & 0xFFFF) for i in range(4)]
+
+    def _is_duplicate(self, fp: int) -> bool:
+        for band in self._band_keys(fp):
+            for other in self._bands.get(band, ()):
+                if bin(fp ^ other).count("1") <= self.max_distance:
+                    return True
+        return False
+
+    def _remember(self, fp: int, ts: float):
+        self._fingerprints[fp] = ts
+        self._fingerprints.move_to_end(fp)
+        for band in self._band_keys(fp):
+            self._bands.setdefault(band, set()).add(fp)
+        while len(self._fingerprints) > self.max_fingerprints:
+            self._forget_oldest()
+
+    def _forget_oldest(self):
+        fp, _ = self._fingerprints.popitem(last=False)
+        for band in self._band_keys(fp):
+            members = self._bands.get(band)
+            if members is not None:
+                members.discard(fp)
+                if not members:
+                    del self._bands[band]
+
+    def _expire_fingerprints(self, cutoff: float):
+        # arrival order, which is close enough to ts order for a dedupe window
+        while self._fingerprints and next(iter(self._fingerprints.values())) < cutoff:
+            self._forget_oldest()
+
+    def add(self, item: Dict[str, Any]) -> bool:
+        """Ingest one item ({title, source, url, impact, engagement, ts, tickers}); False if dropped."""
+        now = self._clock()
+        item = dict(item)  # the index keeps its own copy; the caller's dict is left alone
+        ts = item.setdefault("ts", now)
+        tickers = {str(t).upper() for t in item.get("tickers") or () if t}
+        if not tickers or ts < now - self.max_age:
+            return False
+        text = item.get("title") or item.get("summary") or ""
+        fp = simhash(text) if text.strip() else None
+        key = self._key(item)
+        with self._lock:
+            self._expire_fingerprints(now - self.max_age)
+            if fp is not None:
+                if self._is_duplicate(fp):
+                    self.stats["duplicates"] += 1
+                    return False
+                self._remember(fp, ts)
+            self._seq += 1
+            entry = (key, self._seq, item)
+            for ticker in tickers:
+                heap = self._heaps.get(ticker)
+                if heap is None:
+                    heap = self._heaps[ticker] = []
+                    if len(self._heaps) > self.max_tickers:
+                        self._heaps.popitem(last=False)
+                self._heaps.move_to_end(ticker)
+                if len(heap) < self.k:
+                    heapq.heappush(heap, entry)
+                elif entry[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, entry)
+            self.stats["added"] += 1
+        return True
+
+    def add_many(self, items: Iterable[Dict[str, Any]]) -> int:
+        return sum(self.add(item) for item in items)
+
+    def ingest_feed(self, path: str) -> int:
+        """
+        add() every item appended to the NDJSON feed at ``path`` since the last call; returns how
+        many were added. A trailing line without its newline is left for the next call, and a
+        replaced or truncated file is read again from the start. Bad lines are logged and skipped.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return 0
+        inode, offset = self._feeds.get(path, (st.st_ino, 0))
+        if inode != st.st_ino or st.st_size < offset:
+            offset = 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read(st.st_size - offset)
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        self._feeds[path] = (st.st_ino, offset + len(complete))
+        added = 0
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                added += self.add(item)
+            except (ValueError, TypeError, AttributeError) as e:
+                logging.warning("Skipping bad catalyst line in %s: %s", path, e)
+        return added
+
+    def top(self, ticker: str, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Best unexpired items for ``ticker`` (symbol or coin id), strongest first."""
+        cutoff = self._clock() - self.max_age
+        with self._lock:
+            heap = self._heaps.get(ticker.upper())
+            if not heap:
+                return []
+            live = [e for e in heap if e[2]["ts"] >= cutoff]
+            if len(live) < len(heap):
+                self.stats["expired"] += len(heap) - len(live)
+                heapq.heapify(live)
+                self._heaps[ticker.upper()] = live
+        return [e[2] for e in sorted(live, key=lambda e: e[:2], reverse=True)[:n]]
+
+    def best(self, *tickers: str) -> Dict[str, Any]:
+        """Strongest current catalyst across ``tickers`` (e.g. symbol and coin id), or {}."""
+        found = [item for t in tickers if t for item in self.top(t, 1)]
+        return max(found, key=self._key) if found else {}
+
+    def evict(self) -> int:
+        """Drop expired items and fingerprints everywhere; returns how many items went."""
+        now = self._clock()
+        cutoff = now - self.max_age
+        removed = 0
+        with self._lock:
+            self._expire_fingerprints(cutoff)
+            for ticker in list(self._heaps):
+                heap = self._heaps[ticker]
+                live = [e for e in heap if e[2]["ts"] >= cutoff]
+                removed += len(heap) - len(live)
+                if live:
+                    heapq.heapify(live)
+                    self._heaps[ticker] = live
+                else:
+                    del self._heaps[ticker]
+            self.stats["expired"] += removed
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(h) for h in self._heaps.values())
+
+
+_index: Optional[CatalystIndex] = None
+_index_lock = threading.Lock()
+_feed_lock = threading.Lock()
+
+def get_index() -> CatalystIndex:
+    """Process-wide index that ingestion feeds and the scanner reads."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CatalystIndex()
+    return _index
+
+def ingest_feed(path: str = CATALYST_FEED_FILE) -> int:
+    """Pull new CATALYST_FEED_FILE items into the process-wide index (called before each scan pass)."""
+    if not path:
+        return 0
+    index = get_index()
+    with _feed_lock:  # one reader per feed at a time, so offsets advance once per line
+        added = index.ingest_feed(path)
+    if added:
+        logging.info("Ingested %d catalyst items from %s", added, path)
+    return added
@@ -1,9 +1,31 @@
 import os
 
 MAX_MARKETS_TO_SCAN = int(os.getenv("MAX_MARKETS_TO_SCAN", "200"))
-MAX_TIER2_DEEP_CANDLES = int(os.getenv("MAX_TIER2_DEEP_CANDLES", "250"))
+MAX_TIER2_DEEP_CANDLES = int(os.getenv("MAX_TIER2_DEEP_CANDLES", "1000"))  # ~6 weeks of 1h bars
 QUOTE_CCY = os.getenv("EXCHANGE_STABLE", "USD").upper()
 
+# Local state (caches, candle store). /app/data in the Docker image.
+DATA_DIR = os.getenv("DATA_DIR", "data")
+CANDLE_STORE_DIR = os.getenv("CANDLE_STORE_DIR", os.path.join(DATA_DIR, "candles"))  # "" disables the store
+CANDLE_STORE_FRESH_SEC = int(os.getenv("CANDLE_STORE_FRESH_SEC", "300"))  # serve from disk without fetching
+INTERVAL_SEC = {"5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "4h": 14400, "1d": 86400}
+CANDLE_INTERVAL = os.getenv("CANDLE_INTERVAL", "1h")  # bar size the price ticks are resampled into; CoinGecko
+# serves hourly ticks for any window over a day, so finer bars only fill in once the store is warm
+CANDLE_INTERVAL_SEC = INTERVAL_SEC[CANDLE_INTERVAL]
+CANDLE_USE_OHLC = os.getenv("CANDLE_USE_OHLC", "0") == "1"  # pull /coins/{id}/ohlc on every fetch, not only cold starts
+DEDUPE_DB = os.getenv("DEDUPE_DB", os.path.join(DATA_DIR, "dedupe.sqlite3"))  # "" keeps dedupe in memory
+RUN_SUMMARY_FILE = os.getenv("RUN_SUMMARY_FILE", os.path.join(DATA_DIR, "run_summary.json"))
+RESULTS_VERSION_FILE = os.getenv("RESULTS_VERSION_FILE", os.path.join(DATA_DIR, "results.version"))  # touched by scanners
+RESULTS_FILE = os.getenv("RESULTS_FILE", os.path.join(DATA_DIR, "tier2_results.ndjson"))  # latest Tier 2 rows (results_store)
+INDICATOR_STATE_FILE = os.getenv("INDICATOR_STATE_FILE", os.path.join(DATA_DIR, "indicator_state.json"))  # warm per-coin indicators; "" recomputes each run
+
+# Dashboard response cache
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+DASHBOARD_STALE_TTL = float(os.getenv("DASHBOARD_STALE_TTL", "300"))  # serve stale while refreshing
+DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "512"))  # LRU cap; one entry per distinct /api/signals query
+STREAM_POLL_SEC = float(os.getenv("STREAM_POLL_SEC", "15"))  # how often live clients get checked for new results
+DASHBOARD_SNAPSHOT_FILE = os.getenv("DASHBOARD_SNAPSHOT_FILE", os.path.join(DATA_DIR, "dashboard_rows.json"))  # last DB rows, served while the client starts
+
 # Tier 1 / coarse filters (applied via CMC metadata only)
 PRICE_MIN = 0.001
 PRICE_MAX = 100.0
@@ -21,4 +43,56 @@ VWAP_PROX_PCT = 2.0           # within ±2%
 SOCIAL_MENTIONS_MIN = 10
 ENGAGEMENT_MIN = 100
 SENTIMENT_MIN = 0.6
+SENTIMENT_SOURCES = [s for s in os.getenv("SENTIMENT_SOURCES", "").split(",") if s]  # lunarcrush,santiment,reddit,twitter or fake
+SENTIMENT_DEADLINE_SEC = float(os.getenv("SENTIMENT_DEADLINE_SEC", "5"))  # per batch; slower sources are left out
+
+# Catalyst index
+CATALYST_TOP_K = int(os.getenv("CATALYST_TOP_K", "5"))  # items kept per ticker
+CATALYST_HALF_LIFE_SEC = float(os.getenv("CATALYST_HALF_LIFE_SEC", str(6 * 3600)))
+CATALYST_MAX_AGE_SEC = float(os.getenv("CATALYST_MAX_AGE_SEC", str(48 * 3600)))
+CATALYST_MAX_TICKERS = int(os.getenv("CATALYST_MAX_TICKERS", "20000"))
+CATALYST_FEED_FILE = os.getenv("CATALYST_FEED_FILE", os.path.join(DATA_DIR, "catalysts.ndjson"))  # NDJSON items appended by collectors; "" disables
 REJECT_PUMP_PCT = 50.0        # reject >50% spike in <1h
+METRIC_TIMEFRAMES = [tf for tf in os.getenv("METRIC_TIMEFRAMES", "1h,4h").split(",") if tf]  # downsampled from the stored bars; finer ones are skipped
+PRIMARY_TIMEFRAME = os.getenv("PRIMARY_TIMEFRAME", "1h")  # timeframe behind the top-level rsi/ema/... fields
+
+# Risk panel: stop-loss / take-profit distance in ATRs
+RISK_SL_ATR = float(os.getenv("RISK_SL_ATR", "1.5"))
+RISK_TP_ATR = float(os.getenv("RISK_TP_ATR", "3.0"))
+SCORING_MODEL = os.getenv("SCORING_MODEL", "")  # .npz from scoring.save_logistic; "" scores with the heuristic
+
+# Backtester
+BACKTEST_HORIZON = int(os.getenv("BACKTEST_HORIZON", "24"))  # PRIMARY_TIMEFRAME bars before an open trade times out
+BACKTEST_WARMUP = int(os.getenv("BACKTEST_WARMUP", "50"))    # PRIMARY_TIMEFRAME bars of history before the first signal
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", "0"))   # 0 = one process per CPU
+
+# Market universe (CoinGecko /coins/markets caps per_page at 250)
+MARKETS_PER_PAGE = int(os.getenv("MARKETS_PER_PAGE", "250"))
+UNIVERSE_TTL_SEC = float(os.getenv("UNIVERSE_TTL_SEC", "120"))
+UNIVERSE_CACHE_DIR = os.getenv("UNIVERSE_CACHE_DIR", DATA_DIR)  # "" keeps the snapshot in memory only
+
+# HTTP fetch engine (CoinGecko free tier allows roughly 30 calls/min)
+COINGECKO_CALLS_PER_MIN = float(os.getenv("COINGECKO_CALLS_PER_MIN", "30"))
+COINGECKO_BURST = int(os.getenv("COINGECKO_BURST", "1"))
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", "5"))
+
+# Supabase buffered writes
+DB_BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "100"))
+DB_FLUSH_SEC = float(os.getenv("DB_FLUSH_SEC", "10"))
+DB_MAX_RETRIES = int(os.getenv("DB_MAX_RETRIES", "3"))
+DB_SPILL_FILE = os.getenv("DB_SPILL_FILE", os.path.join(DATA_DIR, "pending_signals.ndjson"))
+
+# Unified scan pipeline
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))
+ALERT_MIN_SCORE = float(os.getenv("ALERT_MIN_SCORE", "7.0"))
+
+# Scan daemon (scheduler.py --daemon)
+DAEMON_TICK_SEC = float(os.getenv("DAEMON_TICK_SEC", "15"))        # longest sleep between scheduling passes
+DAEMON_HOT_SEC = float(os.getenv("DAEMON_HOT_SEC", "60"))          # rescan interval for hot coins
+DAEMON_COLD_SEC = float(os.getenv("DAEMON_COLD_SEC", "1800"))      # rescan interval for everything else
+DAEMON_HOT_SCORE = float(os.getenv("DAEMON_HOT_SCORE", "6.0"))     # ai_score (or RVOL >= RVOL_MIN) that makes a coin hot
+DAEMON_UNIVERSE_SEC = float(os.getenv("DAEMON_UNIVERSE_SEC", "300"))  # Tier 1 universe refresh
+DAEMON_CALLS_PER_MIN = float(os.getenv("DAEMON_CALLS_PER_MIN", str(COINGECKO_CALLS_PER_MIN)))  # global API budget
+DAEMON_STATE_FILE = os.getenv("DAEMON_STATE_FILE", os.path.join(DATA_DIR, "daemon_state.json"))
+SCAN_LOCK_FILE = os.getenv("SCAN_LOCK_FILE", os.path.join(DATA_DIR, "scanner.lock"))
@@ -1,18 +1,31 @@
 from flask import Flask, render_template
-import supabase
-from config import SUPABASE_URL, SUPABASE_ANON_KEY
+from db import get_client, TABLE
+from signals_query import KEY_FIELDS, query_signals
+from results_store import read_results
 
 app = Flask(__name__)
 
-# Initialize Supabase client
-from supabase import create_client
-sb = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+# Only the columns templates/dashboard.html renders
+DASHBOARD_FIELDS = [
+    "ticker", "name", "price", "price_change_pct_24h", "rsi", "ema5", "ema13", "ema50",
+    "vwap", "atr", "rvol", "ai_score", "risk",
+]
+DASHBOARD_LIMIT = 200
 
 @app.route("/")
 def home():
-    # Fetch all scanned tickers
-    data = sb.table("crypto_signals").select("*").execute()
-    tickers = data.data if data.data else []
+    # Fetch the top-scored tickers, projected to the rendered columns
+    local_rows = lambda: read_results(fields=DASHBOARD_FIELDS + list(KEY_FIELDS), limit=DASHBOARD_LIMIT + 1)
+    page = query_signals(get_client(), TABLE, local_rows, limit=DASHBOARD_LIMIT, fields=DASHBOARD_FIELDS)
+    tickers = []
+    for row in page["data"]:
+        row = dict(row)
+        row.setdefault("symbol", (row.get("ticker") or "").upper())
+        row.setdefault("change_pct", row.get("price_change_pct_24h"))
+        row["risk"] = row.get("risk") or {}
+        # Links aren't stored with the signal; build the one every row has, as the alerts do
+        row["links"] = {"tradingview": f"https://www.tradingview.com/symbols/{row['symbol']}USD/"}
+        tickers.append(row)
     return render_template("dashboard.html", tickers=tickers)
 
 if __name__ == "__main__":
@@ -1,35 +1,77 @@
 # db.py
 import os
+import json
+import time
 import logging
-from typing import Optional
+import threading
+from typing import Dict, List, Optional
 
-try:
-    from supabase import create_client, Client
-except Exception:
-    create_client = None
-    Client = None
+from instrumentation import inc, timer
+from config import DB_BATCH_SIZE, DB_FLUSH_SEC, DB_MAX_RETRIES, DB_SPILL_FILE
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 TABLE = os.getenv("SUPABASE_TABLE", "signals")  # default table name
 
-supabase: Optional[Client] = None
+# The supabase package takes a few hundred ms to import, so the client is created on first use
+# (get_client) rather than at import time; web cold starts can answer before it exists.
+_client = None
+_client_state = "pending" if SUPABASE_URL and (SUPABASE_SERVICE_ROLE_KEY or SUPABASE_ANON_KEY) else "unconfigured"
+_client_lock = threading.Lock()
+_warned_unconfigured = False
 
-if SUPABASE_URL and (SUPABASE_SERVICE_ROLE_KEY or SUPABASE_ANON_KEY) and create_client:
-    key = SUPABASE_SERVICE_ROLE_KEY or SUPABASE_ANON_KEY
+def _create_client():
+    global _client, _client_state
     try:
-        supabase = create_client(SUPABASE_URL, key)
+        from supabase import create_client
+        _client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY or SUPABASE_ANON_KEY)
+        _client_state = "ready"
     except Exception as e:
         logging.exception("Failed to create supabase client: %s", e)
-        supabase = None
-else:
-    logging.warning(
-        "Supabase not configured (SUPABASE_URL or keys missing). App will run but DB features disabled."
-    )
+        _client_state = "failed"
+
+def get_client(block: bool = True):
+    """
+    The shared Supabase client, or None if unconfigured or unavailable. With block=False a
+    client that doesn't exist yet is started on a background thread and None is returned now.
+    """
+    global _warned_unconfigured
+    if _client_state == "unconfigured" and not _warned_unconfigured:
+        logging.warning(
+            "Supabase not configured (SUPABASE_URL or keys missing). App will run but DB features disabled."
+        )
+        _warned_unconfigured = True
+    if _client_state != "pending":
+        return _client
+    if not block:
+        if _client_lock.acquire(blocking=False):
+            def create():
+                try:
+                    if _client_state == "pending":
+                        _create_client()
+                finally:
+                    _client_lock.release()
+            threading.Thread(target=create, name="supabase-init", daemon=True).start()
+        return None
+    with _client_lock:
+        if _client_state == "pending":
+            _create_client()
+    return _client
+
+def client_state() -> str:
+    """pending (client not created yet), ready, failed or unconfigured."""
+    return _client_state
+
+def __getattr__(name):
+    # keeps `db.supabase` working for callers that read it as a module attribute
+    if name == "supabase":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def insert_signal(payload: dict):
     """Insert a single row into supabase table (if configured)."""
+    supabase = get_client()
     if not supabase:
         logging.debug("Supabase not available; skipping insert.")
         return None
@@ -40,6 +82,7 @@ def insert_signal(payload: dict):
         return None
 
 def upsert_signal(payload: dict, on_conflict="ticker"):
+    supabase = get_client()
     if not supabase:
         return None
     try:
@@ -47,3 +90,171 @@ def upsert_signal(payload: dict, on_conflict="ticker"):
     except Exception as e:
         logging.exception("Supabase upsert failed: %s", e)
         return None
+
+
+class SignalWriter:
+    """
+    Buffers signal payloads and upserts them as multi-row requests of ``batch_size`` rows.
+    Flushes when the buffer is full, ``flush_sec`` after the first row is buffered (a timer, so
+    rows don't wait out an idle stretch), and on close(). Safe to share between threads. Failed
+    chunks are retried with exponential backoff; rows that still fail are appended to
+    ``spill_file`` and replayed by the next writer.
+
+    A multi-row upsert writes the union of its rows' keys and NULLs the ones a row lacks, so rows
+    for one conflict key are merged first and each request only carries rows of the same shape:
+    a Tier 1 row (market fields) and a Tier 2 row (indicators) for one coin never blank each other.
+
+        with SignalWriter() as writer:
+            writer.add(payload, on_conflict="coin_id")
+    """
+
+    def __init__(self, client=None, table: str = TABLE, batch_size: int = DB_BATCH_SIZE,
+                 flush_sec: float = DB_FLUSH_SEC, max_retries: int = DB_MAX_RETRIES,
+                 spill_file: Optional[str] = DB_SPILL_FILE, sleep=time.sleep):
+        self.client = client if client is not None else get_client()
+        self.table = table
+        self.batch_size = max(batch_size, 1)
+        self.flush_sec = flush_sec
+        self.max_retries = max_retries
+        self.spill_file = spill_file
+        self._sleep = sleep
+        self._buffer: Dict[str, List[dict]] = {}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self.round_trips = 0
+        self.rows_written = 0
+        self.rows_spilled = 0
+        self._replay_file: Optional[str] = None
+        self._timer: Optional[threading.Timer] = None
+        self._replay_spill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, payload: dict, on_conflict: str = "ticker"):
+        with self._lock:
+            self._buffer.setdefault(on_conflict, []).append(payload)
+            self._pending += 1
+            if self._pending >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_sec:
+                self.flush()
+            elif self._timer is None and 0 < self.flush_sec < float("inf"):
+                self._timer = threading.Timer(self.flush_sec, self._flush_due)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_due(self):
+        try:
+            self.flush()
+        except Exception:
+            logging.exception("Timed flush of buffered signal rows failed")
+
+    def flush(self):
+        with self._lock:
+            # the replay file goes with the replayed rows: only the flush that sends them may delete it
+            buffered, self._buffer, self._pending = self._buffer, {}, 0
+            replay_file, self._replay_file = self._replay_file, None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._last_flush = time.monotonic()
+        for on_conflict, rows in buffered.items():
+            for shaped in _group_by_shape(_merge_rows(rows, on_conflict)):
+                for i in range(0, len(shaped), self.batch_size):
+                    self._send(shaped[i:i + self.batch_size], on_conflict)
+        if replay_file:
+            try:
+                os.remove(replay_file)
+            except OSError:
+                pass
+
+    def close(self):
+        self.flush()
+
+    def _send(self, rows: List[dict], on_conflict: str):
+        if not self.client:
+            logging.debug("Supabase not available; skipping %d rows.", len(rows))
+            return
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.round_trips += 1
+                with timer("scanner_stage_seconds", stage="db_write"):
+                    self.client.table(self.table).upsert(rows, on_conflict=on_conflict).execute()
+                self.rows_written += len(rows)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logging.error("Supabase upsert of %d rows failed after %d attempts: %s", len(rows), attempt + 1, e)
+                    break
+                delay = min(2 ** attempt, 30)
+                inc("scanner_http_retries_total", endpoint="supabase/upsert", reason="error")
+                logging.warning("Supabase upsert of %d rows failed (%s); retrying in %ss", len(rows), e, delay)
+                self._sleep(delay)
+        self._spill(rows, on_conflict)
+
+    def _spill(self, rows: List[dict], on_conflict: str):
+        if not self.spill_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.spill_file) or ".", exist_ok=True)
+            with open(self.spill_file, "a") as f:
+                for row in rows:
+                    f.write(json.dumps({"on_conflict": on_conflict, "row": row}, default=str) + "\n")
+            self.rows_spilled += len(rows)
+        except OSError:
+            logging.exception("Could not spill %d rows to %s", len(rows), self.spill_file)
+
+    def _replay_spill(self):
+        """
+        Queue rows left over by a previous run. The spill file is moved aside to ``.replay`` and
+        only deleted after the first flush has sent (or re-spilled) them, so a crash loses nothing.
+        """
+        if not (self.client and self.spill_file):
+            return
+        replay = self.spill_file + ".replay"
+        try:
+            if os.path.exists(self.spill_file):
+                if os.path.exists(replay):
+                    with open(replay, "a") as out, open(self.spill_file, "r") as f:
+                        out.write(f.read())
+                    os.remove(self.spill_file)
+                else:
+                    os.replace(self.spill_file, replay)
+            if not os.path.exists(replay):
+                return
+            with open(replay, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    self._buffer.setdefault(entry["on_conflict"], []).append(entry["row"])
+                    self._pending += 1
+            self._replay_file = replay
+        except OSError:
+            logging.exception("Could not replay spilled rows from %s", self.spill_file)
+        if self._pending:
+            logging.info("Replaying %d spilled signal rows", self._pending)
+
+
+def _merge_rows(rows: List[dict], key: str) -> List[dict]:
+    """
+    One row per conflict key, later values winning, which is what upserting them in order would
+    leave behind; Postgres rejects an upsert touching a row twice.
+    """
+    merged: Dict[object, dict] = {}
+    for row in rows:
+        k = row.get(key, id(row))
+        merged[k] = {**merged[k], **row} if k in merged else row
+    return list(merged.values())
+
+
+def _group_by_shape(rows: List[dict]) -> List[List[dict]]:
+    """Split rows into lists that share one set of columns, in first-seen order."""
+    groups: Dict[frozenset, List[dict]] = {}
+    for row in rows:
+        groups.setdefault(frozenset(row), []).append(row)
+    return list(groups.values())
@@ -1,14 +1,187 @@
+import os
+import abc
 import time
-from typing import Dict
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from config import DEDUPE_DB
 
-# In-memory cache during a single run (GA job). For multi-run dedupe, back it with Supabase later.
-_seen: Dict[str, float] = {}
 WINDOW_SEC = 6 * 60 * 60  # 6 hours
 
+
+class DedupeStore(abc.ABC):
+    """
+    Backend interface for "alerted recently?" checks. Backends implement _fetch (symbol -> last
+    seen ts for the given symbols), _store and _purge; the batch API lets a scan check every
+    candidate in one round trip. A Supabase-backed store only needs those three methods.
+    Expired entries are purged on write, at most once every PURGE_EVERY_SEC.
+    """
+
+    PURGE_EVERY_SEC = 60
+
+    def __init__(self, window_sec: float = WINDOW_SEC, clock=time.time):
+        self.window_sec = window_sec
+        self._clock = clock
+        self._last_purge = 0.0
+
+    @abc.abstractmethod
+    def _fetch(self, symbols: List[str], since: float) -> Dict[str, float]:
+        """Last-seen timestamps newer than ``since`` for those of ``symbols`` that have one."""
+
+    @abc.abstractmethod
+    def _store(self, stamps: Dict[str, float]):
+        """Upsert symbol -> timestamp."""
+
+    def _purge(self, before: float):
+        pass
+
+    def seen_recent_many(self, symbols: Iterable[str]) -> Dict[str, bool]:
+        keys = list(dict.fromkeys(s.upper() for s in symbols))
+        since = self._clock() - self.window_sec
+        found = self._fetch(keys, since) if keys else {}
+        return {k: found.get(k, 0) > since for k in keys}
+
+    def mark_seen_many(self, symbols: Iterable[str]):
+        now = self._clock()
+        stamps = {s.upper(): now for s in symbols}
+        if stamps:
+            self._store(stamps)
+        if now - self._last_purge > self.PURGE_EVERY_SEC:
+            self.purge()
+
+    def seen_recent(self, symbol: str) -> bool:
+        return self.seen_recent_many([symbol])[symbol.upper()]
+
+    def mark_seen(self, symbol: str):
+        self.mark_seen_many([symbol])
+
+    def purge(self):
+        self._last_purge = self._clock()
+        self._purge(self._last_purge - self.window_sec)
+
+
+class MemoryDedupeStore(DedupeStore):
+    """Process-local store; forgets everything when the process exits."""
+
+    def __init__(self, window_sec: float = WINDOW_SEC, clock=time.time):
+        super().__init__(window_sec, clock)
+        self._seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _fetch(self, symbols, since):
+        with self._lock:
+            return {s: self._seen[s] for s in symbols if s in self._seen}
+
+    def _store(self, stamps):
+        with self._lock:
+            self._seen.update(stamps)
+
+    def _purge(self, before):
+        with self._lock:
+            self._seen = {s: t for s, t in self._seen.items() if t >= before}
+
+
+class SQLiteDedupeStore(DedupeStore):
+    """
+    Durable store in a WAL-mode SQLite file, so dedupe survives across runs. An index on ts
+    makes expiry a range delete; a bounded LRU of recent hits answers repeat lookups without
+    touching the database.
+    """
+
+    def __init__(self, path: str = DEDUPE_DB, window_sec: float = WINDOW_SEC, lru_size: int = 4096, clock=time.time):
+        super().__init__(window_sec, clock)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen (symbol TEXT PRIMARY KEY, ts REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS seen_ts ON seen (ts)")
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[str, float]" = OrderedDict()
+        self._lru_size = lru_size
+
+    def _remember(self, symbol: str, ts: float):
+        self._lru[symbol] = ts
+        self._lru.move_to_end(symbol)
+        if len(self._lru) > self._lru_size:
+            self._lru.popitem(last=False)
+
+    def _fetch(self, symbols, since):
+        found, misses = {}, []
+        with self._lock:
+            for s in symbols:
+                ts = self._lru.get(s)
+                if ts is not None and ts > since:
+                    found[s] = ts
+                    self._lru.move_to_end(s)
+                else:
+                    misses.append(s)
+            for i in range(0, len(misses), 500):
+                chunk = misses[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT symbol, ts FROM seen WHERE symbol IN ({marks}) AND ts > ?", (*chunk, since)
+                ).fetchall()
+                for s, ts in rows:
+                    found[s] = ts
+                    self._remember(s, ts)
+        return found
+
+    def _store(self, stamps):
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO seen (symbol, ts) VALUES (?, ?) ON CONFLICT(symbol) DO UPDATE SET ts = excluded.ts",
+                list(stamps.items()),
+            )
+            for s, ts in stamps.items():
+                self._remember(s, ts)
+
+    def _purge(self, before):
+        with self._lock:
+            self._db.execute("DELETE FROM seen WHERE ts < ?", (before,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_store: Optional[DedupeStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> DedupeStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = SQLiteDedupeStore() if DEDUPE_DB else MemoryDedupeStore()
+                except (sqlite3.Error, OSError) as e:
+                    logging.warning("Dedupe store %s unavailable (%s); using in-memory dedupe", DEDUPE_DB, e)
+                    _store = MemoryDedupeStore()
+    return _store
+
+
+def set_store(store: DedupeStore):
+    global _store
+    with _store_lock:
+        _store = store
+
+
 def seen_recent(symbol: str) -> bool:
-    now = time.time()
-    t = _seen.get(symbol.upper())
-    return (t is not None) and (now - t < WINDOW_SEC)
+    return get_store().seen_recent(symbol)
+
 
 def mark_seen(symbol: str):
-    _seen[symbol.upper()] = time.time()
+    get_store().mark_seen(symbol)
+
+
+def seen_recent_many(symbols: Iterable[str]) -> Dict[str, bool]:
+    return get_store().seen_recent_many(symbols)
+
+
+def mark_seen_many(symbols: Iterable[str]):
+    get_store().mark_seen_many(symbols)
@@ -0,0 +1,158 @@
+# instrumentation.py
+"""
+In-process counters and latency histograms for the scan hot paths, rendered in Prometheus text
+format (app.py /metrics) and dumped as a JSON run summary at the end of each scan.
+
+Profiling a single run: set SCAN_PROFILE=/path/run.prof and the scan is wrapped in cProfile
+(open with snakeviz or pstats). For sampling, py-spy works unchanged: py-spy record -- python scheduler.py
+"""
+import os
+import json
+import time
+import cProfile
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from config import RUN_SUMMARY_FILE
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "scanner_http_request_seconds": "Provider HTTP request latency by endpoint",
+    "scanner_stage_seconds": "Time spent per pipeline stage",
+    "scanner_http_retries_total": "HTTP retries by endpoint and reason",
+    "scanner_http_429_total": "HTTP 429 responses by endpoint",
+    "scanner_cache_requests_total": "Cache lookups by cache and result",
+    "scanner_candidates_total": "Coins reaching each tier",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Registry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], list] = {}  # [bucket counts..., +Inf], sum, count
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            h[0][bisect_left(self.buckets, seconds)] += 1
+            h[1] += seconds
+            h[2] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    @staticmethod
+    def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(labels) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        return "{" + ",".join('%s="%s"' % (k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs) + "}"
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: [list(v[0]), v[1], v[2]] for k, v in self._histograms.items()}
+        lines = []
+        for name in sorted({n for n, _ in counters}):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{self._fmt_labels(labels)} {value:g}")
+        for name in sorted({n for n, _ in histograms}):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for (n, labels), (counts, total, count) in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, c in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += c
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{name}_bucket{self._fmt_labels(labels, ('le', le))} {cumulative}")
+                lines.append(f"{name}_sum{self._fmt_labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{self._fmt_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """JSON-friendly view: counters plus count/total/mean per histogram series."""
+        with self._lock:
+            counters = {self._series(n, l): v for (n, l), v in self._counters.items()}
+            histograms = {
+                self._series(n, l): {"count": h[2], "total_sec": round(h[1], 6), "mean_sec": round(h[1] / h[2], 6) if h[2] else None}
+                for (n, l), h in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    @classmethod
+    def _series(cls, name: str, labels: Labels) -> str:
+        return name + cls._fmt_labels(labels)
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+
+
+def write_run_summary(summary: dict, path: str = RUN_SUMMARY_FILE):
+    """Write the run's own numbers plus a snapshot of every metric, atomically."""
+    data = dict(summary, metrics=REGISTRY.snapshot(), written_at=time.time())
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f, indent=2, default=str)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        logging.warning("Could not write run summary %s", path)
+
+
+def read_run_summary(path: str = RUN_SUMMARY_FILE) -> Optional[dict]:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def profile_run(path: Optional[str] = None):
+    """cProfile the enclosed block when ``path`` (or SCAN_PROFILE) is set; no-op otherwise."""
+    path = path or os.getenv("SCAN_PROFILE")
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logging.info("Wrote profile to %s", path)
@@ -0,0 +1,256 @@
+# results_store.py
+"""
+Local Tier 2 results as newline-delimited JSON. The first line is a header naming the columns;
+every following line is one row as a compact JSON array in that column order, ai_score first:
+
+    {"format": "tier2-results", "version": 1, "columns": ["ai_score", "coin_id", ...]}
+    [7.5,"solana","SOL",...]
+
+ResultsWriter streams rows to ``<path>.partial`` as they are produced (nothing is held in
+memory) and renames it over ``path`` on close, so readers only ever see a complete file. If a
+run dies before that, the next writer publishes the leftover partial file before starting,
+so completed rows are not lost.
+
+read_results() memory-maps the file. Because the score leads each line it can pick the top
+rows by score from the raw bytes and decode only those lines. When ``fields`` only needs the
+first half of the columns or less (e.g. ids and scores), each line is decoded only up to
+the last column needed, and the bulky risk and ai_reason columns are never decoded because they
+are written last. Wider projections decode whole lines in one bulk call, which is faster there.
+"""
+import os
+import json
+import mmap
+import logging
+from typing import Iterable, List, Optional
+
+from config import RESULTS_FILE, DASHBOARD_SNAPSHOT_FILE
+from signals_query import SIGNAL_FIELDS, KEY_FIELDS
+from snapshot_cache import mark_results_updated
+
+FORMAT = "tier2-results"
+VERSION = 1
+_TRAILING = ("risk", "ai_reason")
+RESULT_COLUMNS = KEY_FIELDS + tuple(f for f in SIGNAL_FIELDS if f not in KEY_FIELDS + _TRAILING) + _TRAILING
+LEGACY_FILE = "tier2_results.json"  # indent=2 JSON list written by older scanners
+
+
+class ResultRecord:
+    """One result row with a slot per known column; any other keys are kept in ``extra``."""
+
+    __slots__ = RESULT_COLUMNS + ("extra",)
+    _known = frozenset(RESULT_COLUMNS)
+
+    def __init__(self, row: dict):
+        for name in RESULT_COLUMNS:
+            setattr(self, name, row.get(name))
+        self.extra = {k: v for k, v in row.items() if k not in self._known} or None
+
+    def values(self) -> list:
+        """Column values in RESULT_COLUMNS order, with ``extra`` appended when present."""
+        out = [getattr(self, name) for name in RESULT_COLUMNS]
+        if self.extra:
+            out.append(self.extra)
+        return out
+
+    def to_dict(self) -> dict:
+        row = {name: getattr(self, name) for name in RESULT_COLUMNS}
+        if self.extra:
+            row.update(self.extra)
+        return row
+
+
+def _has_rows(path: str) -> bool:
+    """True if ``path`` holds a header and at least one complete row."""
+    try:
+        with open(path, "rb") as f:
+            f.readline()
+            return f.readline().endswith(b"\n")
+    except OSError:
+        return False
+
+
+def _encode(row) -> bytes:
+    record = row if isinstance(row, ResultRecord) else ResultRecord(row)
+    return json.dumps(record.values(), separators=(",", ":"), default=str).encode() + b"\n"
+
+
+class ResultsWriter:
+    """Streams rows to ``<path>.partial``; close() renames it to ``path`` and marks results updated."""
+
+    def __init__(self, path: str = RESULTS_FILE):
+        self.path = path
+        self.partial = f"{path}.partial"
+        self.count = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if _has_rows(self.partial):
+            logging.warning("Publishing results left by an interrupted run: %s", self.partial)
+            self._publish()
+        self._f = open(self.partial, "wb")
+        header = {"format": FORMAT, "version": VERSION, "columns": list(RESULT_COLUMNS)}
+        self._f.write(json.dumps(header).encode() + b"\n")
+
+    def add(self, row):
+        self._f.write(_encode(row))
+        self._f.flush()  # a crash loses at most the row being written
+        self.count += 1
+
+    def add_many(self, rows: Iterable):
+        for row in rows:
+            self.add(row)
+
+    def _publish(self):
+        os.replace(self.partial, self.path)
+        mark_results_updated()
+
+    def close(self):
+        if self._f.closed:
+            return
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        self._publish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # publish on errors too: the rows written so far are complete results
+        self.close()
+
+
+def write_results(rows: Iterable, path: str = RESULTS_FILE) -> int:
+    """Write ``rows`` as the current results in one go. Returns the row count."""
+    with ResultsWriter(path) as writer:
+        writer.add_many(rows)
+    return writer.count
+
+
+def save_snapshot_rows(rows: List[dict], path: str = DASHBOARD_SNAPSHOT_FILE):
+    """Rows for the web app to render before it can reach Supabase (last DB read, or merged shard results)."""
+    tmp = f"{path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp, "w") as f:
+            json.dump(rows, f, default=str)
+        os.replace(tmp, path)
+    except OSError as e:
+        logging.warning("Could not write dashboard snapshot %s: %s", path, e)
+
+
+def read_snapshot_rows(path: str = DASHBOARD_SNAPSHOT_FILE) -> List[dict]:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _lead_score(buf, start: int, end: int) -> Optional[float]:
+    """ai_score from the front of a row line without decoding the rest of it."""
+    comma = buf.find(b",", start, end)
+    try:
+        score = float(buf[start + 1:comma if comma != -1 else end - 1])
+    except ValueError:  # null
+        return None
+    return None if score != score else score
+
+
+def read_results(path: str = RESULTS_FILE, fields: Optional[List[str]] = None,
+                 limit: Optional[int] = None, min_score: Optional[float] = None) -> List[dict]:
+    """
+    Rows from a results file. ``min_score`` and ``limit`` (top rows by ai_score, ties at the
+    cutoff kept) are applied to the raw lines before any JSON is decoded; ``fields`` limits the
+    columns each returned dict carries. Falls back to the legacy tier2_results.json.
+    """
+    if not os.path.exists(path):
+        return _read_legacy(fields, limit, min_score) if path == RESULTS_FILE else []
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            header_end = buf.find(b"\n")
+            if header_end == -1:
+                return []
+            header = json.loads(buf[:header_end])
+            if header.get("format") != FORMAT:
+                raise ValueError(f"{path} is not a {FORMAT} file")
+            columns = header["columns"]
+
+            spans = []
+            start = header_end + 1
+            size = len(buf)
+            while start < size:
+                end = buf.find(b"\n", start)
+                if end == -1:
+                    break  # torn last line of an interrupted write
+                score = _lead_score(buf, start, end)
+                if min_score is None or (score is not None and score >= min_score):
+                    spans.append((score, start, end))
+                start = end + 1
+            if limit is not None and len(spans) > limit:
+                spans.sort(key=_score_key, reverse=True)
+                cutoff = _score_key(spans[limit - 1]) if limit else None
+                spans = [s for s in spans if _score_key(s) >= cutoff] if limit else []
+            needed = _columns_needed(columns, fields)
+            if needed <= len(columns) // 2:  # past that, one bulk decode of whole lines is faster
+                values = [_decode_prefix(buf[s:e].decode(), needed) for _, s, e in spans]
+            else:
+                # one decode call for all selected lines is much cheaper than one per line
+                values = json.loads(b"[" + b",".join(buf[s:e] for _, s, e in spans) + b"]")
+    return _rows(values, columns, fields)
+
+
+_scan_value = json.JSONDecoder().scan_once
+
+
+def _columns_needed(columns: List[str], fields: Optional[List[str]]) -> int:
+    """How many leading values of each line ``fields`` needs; more than len(columns) means extras too."""
+    if fields is None:
+        return len(columns) + 1
+    index = {name: i for i, name in enumerate(columns)}
+    return max((index.get(f, len(columns)) + 1 for f in fields), default=0)
+
+
+def _decode_prefix(line: str, count: int) -> list:
+    """The first ``count`` values of a compact JSON array line; the rest is never decoded."""
+    values, idx = [], 1
+    if line[idx:idx + 1] == "]":
+        return values
+    while len(values) < count:
+        value, idx = _scan_value(line, idx)
+        values.append(value)
+        if line[idx] != ",":
+            break
+        idx += 1
+    return values
+
+
+def _score_key(span) -> tuple:
+    return span[0] is not None, span[0] or 0.0
+
+
+def _rows(values: List[list], columns: List[str], fields: Optional[List[str]]) -> List[dict]:
+    width = len(columns)
+    if fields is None:
+        rows = [dict(zip(columns, v)) for v in values]
+        for row, v in zip(rows, values):
+            if len(v) > width:
+                row.update(v[width])
+        return rows
+    index = {name: i for i, name in enumerate(columns)}
+    picks = [(f, index.get(f)) for f in fields]
+    return [{f: (v[i] if i < len(v) else None) if i is not None else (v[width].get(f) if len(v) > width else None)
+             for f, i in picks}
+            for v in values]
+
+
+def _read_legacy(fields, limit, min_score) -> List[dict]:
+    if not os.path.exists(LEGACY_FILE):
+        return []
+    with open(LEGACY_FILE, "r") as f:
+        rows = json.load(f)
+    if min_score is not None:
+        rows = [r for r in rows if r.get("ai_score") is not None and r["ai_score"] >= min_score]
+    if limit is not None:
+        rows = sorted(rows, key=lambda r: _score_key((r.get("ai_score"),)), reverse=True)[:limit]
+    return [{f: r.get(f) for f in fields} for r in rows] if fields else rows
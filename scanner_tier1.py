@@ -1,60 +1,204 @@
 # scanner_tier1.py
 import os
+import ast
+import math
 import logging
+import operator
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from config import (
+    MAX_MARKETS_TO_SCAN, PRICE_MIN, PRICE_MAX, VOL_MIN, MCAP_MIN, MCAP_MAX, CHANGE_MIN_PCT, CHANGE_MAX_PCT,
+)
 from services.providers import get_top_markets
-from db import upsert_signal, supabase
+from db import SignalWriter
+from snapshot_cache import mark_results_updated
+
+MAX_MARKETS = MAX_MARKETS_TO_SCAN
+
+# market field -> short column name used by rules and extra rule expressions
+TIER1_COLUMNS = {
+    "current_price": "price",
+    "total_volume": "volume",
+    "market_cap": "mcap",
+    "price_change_percentage_24h": "change24",
+}
+
+# Tier1 lightweight criteria; thresholds live in config.py. Evaluated in this order.
+TIER1_RULES = (
+    ("price", lambda c: (c["price"] >= PRICE_MIN) & (c["price"] <= PRICE_MAX)),
+    ("volume", lambda c: c["volume"] >= VOL_MIN),
+    ("market_cap", lambda c: (c["mcap"] >= MCAP_MIN) & (c["mcap"] <= MCAP_MAX)),
+    ("change_24h", lambda c: (c["change24"] >= CHANGE_MIN_PCT) & (c["change24"] <= CHANGE_MAX_PCT)),
+)
+
+_BINOPS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+_CMPOPS = {ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+           ast.Eq: operator.eq, ast.NotEq: operator.ne}
+
+
+def compile_rule(expr: str):
+    """
+    Compile an extra Tier 1 rule such as ``"volume / mcap >= 0.05 and change24 < 15"`` into a
+    function of the column dict. Only column names, numbers, arithmetic, comparisons,
+    and/or/not are allowed; nothing is passed to eval().
+    """
+    tree = ast.parse(expr, mode="eval").body
+    names = set(TIER1_COLUMNS.values())
+
+    def build(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return lambda c: node.value
+        if isinstance(node, ast.Name) and node.id in names:
+            return lambda c: c[node.id]
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+            op, left, right = _BINOPS[type(node.op)], build(node.left), build(node.right)
+            return lambda c: op(left(c), right(c))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            inner = build(node.operand)
+            return lambda c: -inner(c)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            inner = build(node.operand)
+            return lambda c: ~np.asarray(inner(c), dtype=bool)
+        if isinstance(node, ast.BoolOp):
+            parts = [build(v) for v in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return lambda c: combine.reduce([np.asarray(p(c), dtype=bool) for p in parts])
+        if isinstance(node, ast.Compare) and all(type(o) in _CMPOPS for o in node.ops):
+            terms = [build(node.left)] + [build(v) for v in node.comparators]
+            ops = [_CMPOPS[type(o)] for o in node.ops]
+
+            def compare(c):
+                values = [t(c) for t in terms]
+                result = np.ones_like(c["price"], dtype=bool)
+                for op, lhs, rhs in zip(ops, values, values[1:]):
+                    result &= op(lhs, rhs)
+                return result
+            return compare
+        raise ValueError(f"unsupported expression in Tier 1 rule {expr!r}: {ast.dump(node)[:60]}")
+
+    return build(tree)
+
+
+def _extra_rules_from_env() -> Tuple[Tuple[str, object], ...]:
+    """TIER1_EXTRA_RULES (";"-separated); a rule that doesn't compile is logged and left out."""
+    rules = []
+    for expr in os.getenv("TIER1_EXTRA_RULES", "").split(";"):
+        expr = expr.strip()
+        if not expr:
+            continue
+        try:
+            rules.append((expr, compile_rule(expr)))
+        except (SyntaxError, ValueError) as e:
+            logging.error("Ignoring Tier 1 rule %r: %s", expr, e)
+    return tuple(rules)
+
+
+TIER1_EXTRA_RULES = _extra_rules_from_env()
+
 
-MAX_MARKETS = int(os.getenv("MAX_MARKETS_TO_SCAN", "200"))
+def _to_float_array(values: Sequence) -> np.ndarray:
+    try:
+        arr = np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        arr = np.array([_coerce(v) for v in values], dtype=float)
+    return np.nan_to_num(arr, nan=0.0, posinf=0.0, neginf=0.0)  # missing or non-finite values count as 0
+
+
+def _coerce(v) -> float:
+    try:
+        return float(v or 0)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _finite(v) -> float:
+    """float(v or 0), with inf and nan also counting as 0 as they do in tier1_columns."""
+    f = float(v or 0)
+    return f if math.isfinite(f) else 0.0
+
+
+def tier1_columns(columns: Dict[str, Sequence]) -> Dict[str, np.ndarray]:
+    """Market-field columns (e.g. a universe snapshot) -> float arrays keyed by rule column names."""
+    return {short: _to_float_array(columns.get(field, ())) for field, short in TIER1_COLUMNS.items()}
 
-# Tier1 lightweight criteria (matches your spec)
-MIN_PRICE = 0.001
-MAX_PRICE = 100
-MIN_VOLUME_24H = 10_000_000  # 10M
-MIN_MARKETCAP = 10_000_000
-MAX_MARKETCAP = 5_000_000_000
-MIN_PRICE_CHANGE_PCT = 2.0
-MAX_PRICE_CHANGE_PCT = 20.0
 
-def passes_tier1(market: dict) -> bool:
+def tier1_mask(columns: Dict[str, Sequence], extra_rules=None) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Evaluate every Tier 1 rule (plus ``extra_rules``, default TIER1_EXTRA_RULES) as a boolean mask
+    over whole columns. Returns (mask, rejections), with each rejected row counted against the
+    first rule it fails.
+    """
+    cols = tier1_columns(columns)
+    n = len(cols["price"])
+    alive = np.ones(n, dtype=bool)
+    rejections: Dict[str, int] = {}
+    rules = TIER1_RULES + tuple(TIER1_EXTRA_RULES if extra_rules is None else extra_rules)
+    for name, rule in rules:
+        passed = np.broadcast_to(np.asarray(rule(cols), dtype=bool), (n,))
+        rejections[name] = int(np.count_nonzero(alive & ~passed))
+        alive &= passed
+    return alive, rejections
+
+
+def _market_columns(markets: List[dict]) -> Dict[str, list]:
+    columns = {field: [m.get(field) for m in markets] for field in TIER1_COLUMNS}
+    columns["current_price"] = [m.get("current_price") or m.get("price") for m in markets]
+    return columns
+
+
+def filter_markets(markets: List[dict], extra_rules=None) -> Tuple[List[dict], Dict[str, int]]:
+    """Columnar Tier 1 over a list of market dicts. Returns (survivors, per-rule rejection counts)."""
+    mask, rejections = tier1_mask(_market_columns(markets), extra_rules)
+    return [markets[i] for i in np.flatnonzero(mask)], rejections
+
+
+def passes_tier1(market: dict, extra_rules=None) -> bool:
+    """Single-market check against the same config thresholds and extra rules as tier1_mask."""
     try:
-        price = float(market.get("current_price") or market.get("price") or 0)
-        volume = float(market.get("total_volume") or 0)
-        marketcap = float(market.get("market_cap") or 0)
-        change24 = float(market.get("price_change_percentage_24h") or 0)
-        if not (MIN_PRICE <= price <= MAX_PRICE):
+        price = _finite(market.get("current_price") or market.get("price"))
+        volume = _finite(market.get("total_volume"))
+        marketcap = _finite(market.get("market_cap"))
+        change24 = _finite(market.get("price_change_percentage_24h"))
+        if not (PRICE_MIN <= price <= PRICE_MAX):
             return False
-        if volume < MIN_VOLUME_24H:
+        if volume < VOL_MIN:
             return False
-        if not (MIN_MARKETCAP <= marketcap <= MAX_MARKETCAP):
+        if not (MCAP_MIN <= marketcap <= MCAP_MAX):
             return False
-        if not (MIN_PRICE_CHANGE_PCT <= change24 <= MAX_PRICE_CHANGE_PCT):
+        if not (CHANGE_MIN_PCT <= change24 <= CHANGE_MAX_PCT):
             return False
+        extra = TIER1_EXTRA_RULES if extra_rules is None else extra_rules
+        if extra:
+            cols = tier1_columns(_market_columns([market]))
+            return all(bool(np.asarray(rule(cols), dtype=bool).all()) for _, rule in extra)
         return True
     except Exception:
         return False
 
+def tier1_payload(m: dict) -> dict:
+    return {
+        "ticker": m.get("symbol", "").upper(),
+        "coin_id": m.get("id"),
+        "name": m.get("name"),
+        "price": m.get("current_price"),
+        "market_cap": m.get("market_cap"),
+        "volume_24h": m.get("total_volume"),
+        "price_change_pct_24h": m.get("price_change_percentage_24h"),
+        "tier": "tier1"
+    }
+
 def main():
     logging.info("Running Tier1 scan for up to %d markets", MAX_MARKETS)
     markets = get_top_markets(limit=MAX_MARKETS)
-    matches = []
-    for m in markets:
-        if passes_tier1(m):
-            matches.append(m)
-            # upsert light summary to supabase for the dashboard/watchlist
-            try:
-                payload = {
-                    "ticker": m.get("symbol", "").upper(),
-                    "coin_id": m.get("id"),
-                    "name": m.get("name"),
-                    "price": m.get("current_price"),
-                    "market_cap": m.get("market_cap"),
-                    "volume_24h": m.get("total_volume"),
-                    "price_change_pct_24h": m.get("price_change_percentage_24h"),
-                    "tier": "tier1"
-                }
-                upsert_signal(payload, on_conflict="coin_id")
-            except Exception:
-                logging.exception("Failed to upsert tier1 signal")
+    matches, rejections = filter_markets(markets)
+    logging.info("Tier1 rejections by rule: %s", rejections)
+    with SignalWriter() as writer:
+        for m in matches:
+            # queue light summary for the dashboard/watchlist; written in multi-row batches
+            writer.add(tier1_payload(m), on_conflict="coin_id")
+    mark_results_updated()
     # write matches to local file for Tier2 to consume in CI
     with open("tier1_symbols.txt", "w") as f:
         for m in matches:
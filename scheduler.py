@@ -1,6 +1,45 @@
 # scheduler.py
+import sys
+import logging
+import argparse
+from config import SCAN_LOCK_FILE
 from services.scanner import scan_and_alert
+from services.daemon import ScanDaemon, ScanLocked, scan_lock
+from services.sharding import Shard, merge_shards, shard_path
+from services.providers import prefetch_universe
+from instrumentation import profile_run
 
 if __name__ == "__main__":
-    res = scan_and_alert()
-    print(f"Alerts sent (if any): {len(res)}")
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run one scan (default) or the long-running scan daemon")
+    parser.add_argument("--daemon", action="store_true", help="keep running with per-coin hot/cold cadence")
+    parser.add_argument("--shard", metavar="I/N", help="scan only shard I of N (1-based) and write shard outputs")
+    parser.add_argument("--merge", type=int, metavar="N", help="combine the outputs of shards 1..N, then exit")
+    parser.add_argument("--list-universe", action="store_true",
+                        help="list the market universe into the universe snapshot for shards to reuse, then exit")
+    args = parser.parse_args()
+    if args.list_universe:
+        path = prefetch_universe()
+        if not path:
+            logging.error("Universe listing incomplete or UNIVERSE_CACHE_DIR unset; shards will list it themselves")
+            sys.exit(1)
+        print(f"Universe snapshot: {path}")
+        sys.exit(0)
+    if args.merge:
+        merge_shards(args.merge)
+        sys.exit(0)
+    try:
+        shard = Shard.parse(args.shard) if args.shard else None
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        with scan_lock(shard_path(SCAN_LOCK_FILE, shard)):  # shards of one run may share a data dir
+            if args.daemon:
+                ScanDaemon(shard=shard).run_forever()
+            else:
+                with profile_run():  # SCAN_PROFILE=path.prof to cProfile this run
+                    res = scan_and_alert(shard=shard)
+                print(f"Alerts sent (if any): {len(res)}")
+    except ScanLocked as e:
+        logging.warning("Skipping: %s", e)
+        sys.exit(0)
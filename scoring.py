@@ -0,0 +1,280 @@
+# scoring.py
+"""
+AI score for Tier 2 metrics, per coin or for a whole batch at once.
+
+compute_ai_score is the reference heuristic for one metrics dict. score_batch scores many rows
+in one set of NumPy operations: the heuristic backend reproduces compute_ai_score exactly,
+and a model exported to arrays (logistic regression in an .npz, see save_logistic) can be
+configured with SCORING_MODEL. The model is loaded once per process. Either way the reason
+text comes from the heuristic's rule masks. Each combination of rules that fire is turned into
+text once per batch, not once per coin.
+
+Batches are column dicts of equal-length float arrays (NaN = missing):
+    rvol, rsi, ema5, ema13, ema50         primary timeframe
+    htf_ema5, htf_ema13, htf_rsi          highest timeframe, rows with 2+ timeframes only
+    htf                                   object array of that timeframe's name ("" if none)
+metrics_columns() builds one from compute_metrics dicts; a compute_metrics_batch or
+indicator_series frame (plus any htf_* / htf columns, as backtest.walk_forward_metrics adds) can be
+passed as is.
+"""
+import logging
+import zipfile
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import INTERVAL_SEC, SCORING_MODEL
+
+Columns = Dict[str, np.ndarray]
+PRIMARY = ("rvol", "rsi", "ema5", "ema13", "ema50")
+HTF = ("ema5", "ema13", "rsi")
+
+# rule bits, in the order their reasons are listed
+RSI_BULLISH, RSI_HIGH, EMA_ALIGNED, HTF_CONFIRMS = 1, 2, 4, 8
+DEFAULT_REASON = "Metrics indicate cautious interest"
+
+
+def compute_ai_score(metrics: dict) -> (float, str):
+    """Return (score 0-10, short_reason). Deterministic heuristic: favors rvol>2, RSI between 50-70, EMA align,
+    and (given multi-timeframe metrics under "tf") an uptrend on the highest timeframe."""
+    score = 0.0
+    reasons = []
+    rvol = metrics.get("rvol") or 0
+    rsi = metrics.get("rsi") or 0
+    ema5 = metrics.get("ema5")
+    ema13 = metrics.get("ema13")
+    ema50 = metrics.get("ema50")
+
+    # RVOL
+    score += min(max((rvol - 1) * 3, 0), 4)  # up to 4 points
+
+    # RSI preference
+    if 50 <= rsi <= 70:
+        score += 2.0
+        reasons.append("RSI in bullish range")
+    elif rsi > 70:
+        score += 0.5
+        reasons.append("RSI high")
+
+    # EMA alignment
+    if ema5 and ema13 and ema50:
+        if ema5 > ema13 > ema50:
+            score += 2.0
+            reasons.append("Bullish EMA alignment")
+
+    # Higher-timeframe confirmation
+    tf = metrics.get("tf") or {}
+    if len(tf) > 1:
+        htf = max(tf, key=lambda name: INTERVAL_SEC.get(name, 0))
+        h = tf[htf]
+        if h.get("ema5") and h.get("ema13") and h["ema5"] > h["ema13"] and (h.get("rsi") or 0) >= 50:
+            score += 1.0
+            reasons.append(f"{htf} trend confirms")
+
+    # Cap
+    score = min(score, 10.0)
+    reason_text = " + ".join(reasons) if reasons else DEFAULT_REASON
+    return round(score, 2), reason_text
+
+
+# --- batch inputs ---------------------------------------------------------------------------
+
+def metrics_columns(metrics: Sequence[dict]) -> Columns:
+    """Column batch from compute_metrics dicts (including their "tf" sub-dicts)."""
+    # dtype=float turns None into NaN
+    cols = {name: np.array([m.get(name) for m in metrics], dtype=float) for name in PRIMARY}
+    highest: Dict[tuple, str] = {}  # timeframe set -> its highest timeframe
+    names, subs = [], []
+    for m in metrics:
+        tf = m.get("tf") or {}
+        if len(tf) > 1:
+            key = tuple(tf)
+            name = highest.get(key)
+            if name is None:
+                name = highest[key] = max(tf, key=lambda n: INTERVAL_SEC.get(n, 0))
+            names.append(name)
+            subs.append(tf[name])
+        else:
+            names.append("")
+            subs.append({})
+    for name in HTF:
+        cols[f"htf_{name}"] = np.array([h.get(name) for h in subs], dtype=float)
+    cols["htf"] = np.array(names, dtype=object)
+    return cols
+
+
+def _columns(batch) -> Columns:
+    if isinstance(batch, dict):
+        return batch
+    if hasattr(batch, "columns"):  # DataFrame from compute_metrics_batch / indicator_series
+        cols = {name: batch[name].to_numpy(dtype=float) for name in PRIMARY if name in batch.columns}
+        cols.update({f"htf_{name}": batch[f"htf_{name}"].to_numpy(dtype=float)
+                     for name in HTF if f"htf_{name}" in batch.columns})
+        if "htf" in batch.columns:
+            cols["htf"] = batch["htf"].to_numpy(dtype=object)
+        return cols
+    return metrics_columns(batch)
+
+
+def _col(cols: Columns, name: str, n: int) -> np.ndarray:
+    values = cols.get(name)
+    return np.full(n, np.nan) if values is None else np.asarray(values, dtype=float)
+
+
+def _batch_len(cols: Columns) -> int:
+    return len(next(iter(cols.values()))) if cols else 0
+
+
+# --- rules and reasons ----------------------------------------------------------------------
+
+def rule_masks(cols: Columns) -> Tuple[np.ndarray, np.ndarray]:
+    """(rule bits per row, RVOL points per row) with compute_ai_score's semantics for missing values."""
+    n = _batch_len(cols)
+    with np.errstate(invalid="ignore"):
+        rvol = np.nan_to_num(_col(cols, "rvol", n), nan=0.0)   # `or 0`
+        rsi = np.nan_to_num(_col(cols, "rsi", n), nan=0.0)
+        ema5, ema13, ema50 = (_col(cols, name, n) for name in ("ema5", "ema13", "ema50"))
+        present = lambda x: np.isfinite(x) & (x != 0)         # truthy
+        bits = np.where((rsi >= 50) & (rsi <= 70), RSI_BULLISH, np.where(rsi > 70, RSI_HIGH, 0))
+        aligned = present(ema5) & present(ema13) & present(ema50) & (ema5 > ema13) & (ema13 > ema50)
+        bits |= np.where(aligned, EMA_ALIGNED, 0)
+        h5, h13 = _col(cols, "htf_ema5", n), _col(cols, "htf_ema13", n)
+        hrsi = np.nan_to_num(_col(cols, "htf_rsi", n), nan=0.0)
+        bits |= np.where(present(h5) & present(h13) & (h5 > h13) & (hrsi >= 50), HTF_CONFIRMS, 0)
+    return bits.astype(np.int8), np.clip((rvol - 1) * 3, 0, 4)
+
+
+def _reason_text(bits: int, htf: str) -> str:
+    parts = []
+    if bits & RSI_BULLISH:
+        parts.append("RSI in bullish range")
+    if bits & RSI_HIGH:
+        parts.append("RSI high")
+    if bits & EMA_ALIGNED:
+        parts.append("Bullish EMA alignment")
+    if bits & HTF_CONFIRMS:
+        parts.append(f"{htf} trend confirms")
+    return " + ".join(parts) if parts else DEFAULT_REASON
+
+
+def reasons(bits: np.ndarray, htf: Optional[np.ndarray] = None) -> np.ndarray:
+    """Reason text per row, built once per distinct (rules, timeframe) combination."""
+    if htf is None:
+        htf = np.full(len(bits), "", dtype=object)
+    names, name_idx = np.unique(htf.astype(str), return_inverse=True)
+    combos, inverse = np.unique(name_idx.astype(np.int64) * 16 + bits, return_inverse=True)
+    texts = np.array([_reason_text(int(c % 16), names[c // 16]) for c in combos], dtype=object)
+    return texts[inverse.reshape(-1)]
+
+
+def _round2(score: np.ndarray) -> np.ndarray:
+    """round(x, 2) as Python does it; np.round can differ where x * 100 lands on a half."""
+    out = np.round(score, 2)
+    scaled = score * 100
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        out[i] = round(float(score[i]), 2)
+    return out
+
+
+# --- backends -------------------------------------------------------------------------------
+
+class HeuristicBackend:
+    """compute_ai_score, vectorized."""
+
+    name = "heuristic"
+
+    def score(self, cols: Columns, bits: np.ndarray, rvol_points: np.ndarray) -> np.ndarray:
+        score = (rvol_points
+                 + np.where(bits & RSI_BULLISH, 2.0, 0.0) + np.where(bits & RSI_HIGH, 0.5, 0.0)
+                 + np.where(bits & EMA_ALIGNED, 2.0, 0.0) + np.where(bits & HTF_CONFIRMS, 1.0, 0.0))
+        return _round2(np.minimum(score, 10.0))
+
+
+# Model inputs, derived from the column batch. Missing values contribute 0 after scaling.
+FEATURES = {
+    "rvol": lambda c, n: _col(c, "rvol", n),
+    "rsi": lambda c, n: _col(c, "rsi", n),
+    "ema5_13": lambda c, n: _col(c, "ema5", n) / _col(c, "ema13", n) - 1,
+    "ema13_50": lambda c, n: _col(c, "ema13", n) / _col(c, "ema50", n) - 1,
+    "htf_ema5_13": lambda c, n: _col(c, "htf_ema5", n) / _col(c, "htf_ema13", n) - 1,
+    "htf_rsi": lambda c, n: _col(c, "htf_rsi", n),
+}
+
+
+class LogisticBackend:
+    """10 * sigmoid(w . standardized features + b), from arrays saved by save_logistic."""
+
+    name = "logistic"
+
+    def __init__(self, features: Sequence[str], weights, bias: float, mean=None, std=None):
+        unknown = [f for f in features if f not in FEATURES]
+        if unknown:
+            raise ValueError(f"unknown model features: {', '.join(unknown)}")
+        self.features = list(features)
+        self.weights = np.asarray(weights, dtype=float)
+        self.bias = float(bias)
+        self.mean = np.zeros(len(features)) if mean is None else np.asarray(mean, dtype=float)
+        self.std = np.ones(len(features)) if std is None else np.where(np.asarray(std, dtype=float) > 0, std, 1.0)
+
+    @classmethod
+    def load(cls, path: str) -> "LogisticBackend":
+        with np.load(path, allow_pickle=False) as z:
+            if str(z["kind"]) != cls.name:
+                raise ValueError(f"{path}: unsupported model kind {z['kind']}")
+            return cls([str(f) for f in z["features"]], z["weights"], float(z["bias"]), z["mean"], z["std"])
+
+    def score(self, cols: Columns, bits: np.ndarray, rvol_points: np.ndarray) -> np.ndarray:
+        n = len(bits)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = np.column_stack([FEATURES[f](cols, n) for f in self.features]) if self.features else np.zeros((n, 0))
+            z = np.nan_to_num((x - self.mean) / self.std, nan=0.0, posinf=0.0, neginf=0.0)
+        return np.round(10.0 / (1.0 + np.exp(-(z @ self.weights + self.bias))), 2)
+
+
+def save_logistic(path: str, features: Sequence[str], weights, bias: float, mean=None, std=None):
+    """Export a fitted logistic regression for SCORING_MODEL."""
+    model = LogisticBackend(features, weights, bias, mean, std)  # validates the feature names
+    np.savez(path, kind=model.name, features=np.array(model.features), weights=model.weights,
+             bias=model.bias, mean=model.mean, std=model.std)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The process-wide backend: the SCORING_MODEL file if set and loadable, else the heuristic."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = HeuristicBackend()
+                if SCORING_MODEL:
+                    try:
+                        backend = LogisticBackend.load(SCORING_MODEL)
+                        logging.info("Scoring with %s model %s (%d features)", backend.name, SCORING_MODEL, len(backend.features))
+                    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+                        logging.error("Could not load scoring model %s (%s); using the heuristic", SCORING_MODEL, e)
+                _backend = backend
+    return _backend
+
+
+# --- entry points ---------------------------------------------------------------------------
+
+def score_batch(batch, backend=None) -> Tuple[np.ndarray, np.ndarray]:
+    """(scores, reasons) for a column batch, a metrics frame or a list of compute_metrics dicts."""
+    cols = _columns(batch)
+    backend = backend or get_backend()
+    bits, rvol_points = rule_masks(cols)
+    return backend.score(cols, bits, rvol_points), reasons(bits, cols.get("htf"))
+
+
+def score_metrics(metrics: dict, backend=None) -> Tuple[float, str]:
+    """One coin's (score, reason) from the configured backend."""
+    backend = backend or get_backend()
+    if isinstance(backend, HeuristicBackend):
+        return compute_ai_score(metrics)  # same result, without the batch setup cost
+    scores, texts = score_batch([metrics], backend)
+    return float(scores[0]), str(texts[0])
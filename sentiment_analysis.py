@@ -1,7 +1,9 @@
 # sentiment_analysis.py
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import math
 
+from config import SOCIAL_MENTIONS_MIN, ENGAGEMENT_MIN, SENTIMENT_MIN
+
 def aggregate_sentiment(lunar: Dict[str, Any], santiment: Dict[str, Any], reddit: Dict[str, Any], twitter: Dict[str, Any]) -> Dict[str, Any]:
     """
     Normalize each to 0..1 and average with simple weights.
@@ -39,3 +41,37 @@ def aggregate_sentiment(lunar: Dict[str, Any], santiment: Dict[str, Any], reddit
 
 def influencer_flag(twitter: Dict[str, Any]) -> bool:
     return bool(twitter and twitter.get("influencer_hit", False))
+
+def passes_sentiment(result: Dict[str, Any]) -> bool:
+    """Social confirmation: enough mentions and engagement, and a score at or above SENTIMENT_MIN."""
+    return (
+        result.get("score") is not None
+        and result["score"] >= SENTIMENT_MIN
+        and result.get("mentions", 0) >= SOCIAL_MENTIONS_MIN
+        and result.get("engagement", 0) >= ENGAGEMENT_MIN
+    )
+
+def collect_sentiment(coins: Dict[str, str], collector=None) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch all configured sources for a batch of {coin_id: symbol} concurrently (see
+    services.sentiment) and aggregate per coin. A source that missed the batch deadline is
+    simply absent from that coin's detail. Returns {} when no sources are configured.
+    """
+    if collector is None:
+        from services.sentiment import get_collector
+        collector = get_collector()
+    if collector is None or not coins:
+        return {}
+    raw = collector.collect(coins)
+    out = {}
+    for coin_id in coins:
+        stats = {name: per_coin.get(coin_id) for name, per_coin in raw.items()}
+        result = aggregate_sentiment(stats.get("lunarcrush"), stats.get("santiment"), stats.get("reddit"), stats.get("twitter"))
+        present = [s for s in stats.values() if s]
+        result["mentions"] = sum(s.get("mentions") or 0 for s in present)
+        result["engagement"] = sum(s.get("engagement") or 0 for s in present)
+        result["influencer"] = influencer_flag(stats.get("twitter"))
+        result["links"] = (stats.get("reddit") or {}).get("links", [])
+        result["passes"] = passes_sentiment(result)
+        out[coin_id] = result
+    return out
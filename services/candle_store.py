@@ -0,0 +1,133 @@
+# services/candle_store.py
+import os
+import time
+import logging
+import threading
+from typing import Optional
+
+import numpy as np
+
+from config import CANDLE_STORE_DIR, CANDLE_INTERVAL_SEC, MAX_TIER2_DEEP_CANDLES
+
+CANDLE_DTYPE = np.dtype([
+    ("ts", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8"),
+])
+LEGACY_DTYPE = np.dtype([("ts", "<i8"), ("close", "<f8"), ("volume", "<f8")])  # close-only files from older runs
+
+
+def to_candles(ts, close, volume, open_=None, high=None, low=None) -> np.ndarray:
+    """Rows in CANDLE_DTYPE; a bare price tick is a candle with open = high = low = close."""
+    arr = np.empty(len(ts), dtype=CANDLE_DTYPE)
+    arr["ts"] = ts
+    arr["close"] = close
+    arr["volume"] = volume
+    arr["open"] = close if open_ is None else open_
+    arr["high"] = close if high is None else high
+    arr["low"] = close if low is None else low
+    return arr
+
+
+def resample(rows: np.ndarray, step: int = CANDLE_INTERVAL_SEC) -> np.ndarray:
+    """
+    Bucket ticks or finer candles into ``step``-second bars stamped with the bar's open time:
+    first open, max high, min low, last close, last known volume (CoinGecko volumes are rolling
+    24h totals, so the latest sample is the one to keep). Rows are sorted by ts first; ties keep
+    their input order.
+    """
+    if not len(rows):
+        return np.empty(0, dtype=CANDLE_DTYPE)
+    rows = rows[np.argsort(rows["ts"], kind="stable")]
+    bucket = rows["ts"] // step
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(rows)] - 1
+
+    volume = rows["volume"]
+    known = np.where(np.isfinite(volume), np.arange(len(rows)), -1)
+    last_known = np.maximum.reduceat(known, starts)
+
+    out = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    out["ts"] = bucket[starts] * step
+    out["open"] = rows["open"][starts]
+    out["high"] = np.fmax.reduceat(rows["high"], starts)
+    out["low"] = np.fmin.reduceat(rows["low"], starts)
+    out["close"] = rows["close"][ends]
+    out["volume"] = np.where(last_known >= 0, volume[np.maximum(last_known, 0)], 0.0)
+    return out
+
+
+class CandleStore:
+    """
+    One memory-mapped .npy file of OHLCV bars (CANDLE_DTYPE) per coin_id under ``root``, already
+    resampled to ``step`` seconds so readers never resample again.
+    Writes go to a temp file and are renamed into place, so readers never see a partial file.
+    Files that fail to load or validate are dropped and the coin is treated as a cold start.
+    """
+
+    def __init__(self, root: str = CANDLE_STORE_DIR, max_candles: int = MAX_TIER2_DEEP_CANDLES,
+                 step: int = CANDLE_INTERVAL_SEC):
+        self.root = root
+        self.max_candles = max_candles
+        self.step = step
+
+    def path(self, coin_id: str) -> str:
+        safe = coin_id.replace(os.sep, "_").replace("..", "_")
+        return os.path.join(self.root, f"{safe}.npy")
+
+    def age(self, coin_id: str) -> Optional[float]:
+        """Seconds since the coin's file was last written, or None if there is none."""
+        try:
+            return time.time() - os.path.getmtime(self.path(coin_id))
+        except OSError:
+            return None
+
+    def load(self, coin_id: str) -> Optional[np.ndarray]:
+        path = self.path(coin_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            arr = np.load(path, mmap_mode="r", allow_pickle=False)
+            if arr.ndim != 1 or arr.dtype not in (CANDLE_DTYPE, LEGACY_DTYPE):
+                raise ValueError(f"unexpected layout {arr.dtype}/{arr.ndim}d")
+            if arr.dtype == LEGACY_DTYPE:
+                arr = to_candles(arr["ts"], arr["close"], arr["volume"])
+            arr = np.array(arr)
+            if len(arr) > 1 and not np.all(np.diff(arr["ts"]) > 0):
+                raise ValueError("timestamps not strictly increasing")
+            return arr
+        except Exception as e:
+            logging.warning("Discarding corrupt candle file %s: %s", path, e)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def save(self, coin_id: str, arr: np.ndarray):
+        path = self.path(coin_id)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(arr, dtype=CANDLE_DTYPE), allow_pickle=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            logging.warning("Could not write candle file %s: %s", path, e)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def merge(self, existing: Optional[np.ndarray], fresh: np.ndarray) -> np.ndarray:
+        """
+        Fold ``fresh`` ticks/candles into the stored bars and trim to ``max_candles``. Rows older
+        than the last stored bar are ignored; rows inside it extend that (partial) bar.
+        """
+        if existing is not None and len(existing):
+            fresh = fresh[fresh["ts"] >= existing["ts"][-1]]
+            combined = np.concatenate([existing, fresh])
+        else:
+            combined = fresh
+        return resample(combined, self.step)[-self.max_candles:]
+
+
+store: Optional[CandleStore] = CandleStore() if CANDLE_STORE_DIR else None
@@ -0,0 +1,288 @@
+# services/daemon.py
+"""
+Long-running scanner (scheduler.py --daemon). Unlike the one-shot cron run it keeps the HTTP
+session, universe snapshot, candle store and dedupe LRU warm between cycles, and rescans each
+Tier 1 coin on its own cadence: hot coins (ai_score >= DAEMON_HOT_SCORE or RVOL >= RVOL_MIN)
+every DAEMON_HOT_SEC, the rest every DAEMON_COLD_SEC. Each pass spends at most the API budget
+accrued since the last one (DAEMON_CALLS_PER_MIN), hot and overdue coins first: coins are
+picked by their estimated cost (none while the candle store is fresh) and charged what their
+fetches actually took.
+
+Per-coin indicator state stays warm too (TimeframeStates), so a rescan only folds in the bars
+that closed since the coin's last one. The schedule, latest rows and indicator states are
+checkpointed after every pass and restored on start, SIGTERM / SIGINT finish the current pass
+before exiting, and scan_lock() keeps a daemon and a cron run (or two of either) from scanning
+at the same time.
+"""
+import os
+import json
+import math
+import time
+import signal
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; runs unlocked there
+    fcntl = None
+
+from config import (
+    MAX_MARKETS_TO_SCAN, MARKETS_PER_PAGE, RVOL_MIN, CANDLE_STORE_FRESH_SEC,
+    DAEMON_TICK_SEC, DAEMON_HOT_SEC, DAEMON_COLD_SEC, DAEMON_HOT_SCORE, DAEMON_UNIVERSE_SEC,
+    DAEMON_CALLS_PER_MIN, DAEMON_STATE_FILE, SCAN_LOCK_FILE, RESULTS_FILE, RUN_SUMMARY_FILE,
+)
+from db import SignalWriter
+from services.providers import iter_market_universe, fetch_ohlcv_many, estimated_calls
+from services.scanner import AlertStage, current_states, process_coin, tier1_page_filter
+from services.sharding import Shard, shard_path
+from scanner_tier1 import tier1_payload
+from catalyst_analysis import ingest_feed
+from results_store import write_results
+from technical_indicators import TimeframeStates
+from instrumentation import inc, observe, write_run_summary
+
+
+class ScanLocked(RuntimeError):
+    """Another scanner process holds the scan lock."""
+
+
+@contextmanager
+def scan_lock(path: str = SCAN_LOCK_FILE):
+    """Exclusive, non-blocking advisory lock for the duration of a scan (or a daemon's lifetime)."""
+    if fcntl is None or not path:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    f = open(path, "a+")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        raise ScanLocked(f"another scanner holds {path}")
+    try:
+        f.truncate(0)
+        f.write(f"{os.getpid()}\n")
+        f.flush()
+        yield
+    finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+        f.close()
+
+
+class ScanDaemon:
+    def __init__(self, limit: int = MAX_MARKETS_TO_SCAN, alerts: bool = True, dispatcher=None,
+                 hot_sec: float = DAEMON_HOT_SEC, cold_sec: float = DAEMON_COLD_SEC,
+                 universe_sec: float = DAEMON_UNIVERSE_SEC, calls_per_min: float = DAEMON_CALLS_PER_MIN,
+                 tick_sec: float = DAEMON_TICK_SEC, state_file: Optional[str] = DAEMON_STATE_FILE,
+                 clock: Callable[[], float] = time.time, sleep: Optional[Callable[[float], None]] = None,
+                 shard: Optional[Shard] = None):
+        self.limit = limit
+        self.shard = shard
+        self.hot_sec = hot_sec
+        self.cold_sec = cold_sec
+        self.universe_sec = universe_sec
+        self.calls_per_min = calls_per_min
+        self.tick_sec = tick_sec
+        self.state_file = shard_path(state_file, shard)
+        self._clock = clock
+        self._stop = threading.Event()
+        self._sleep = sleep or self._stop.wait  # a stop request cuts the sleep short
+        if alerts and dispatcher is None:
+            from telegram_alerts import get_dispatcher
+            dispatcher = get_dispatcher()
+        self.dispatcher = dispatcher
+
+        self.markets: Dict[str, dict] = {}   # current Tier 1 matches
+        self.schedule: Dict[str, float] = {}  # coin_id -> next scan due (clock time)
+        self.hot: set = set()
+        self.rows: Dict[str, dict] = {}      # latest Tier 2 row per coin, for results/dashboard
+        self.states: Dict[str, TimeframeStates] = {}  # warm indicators per coin
+        self.universe_at: Optional[float] = None
+        self._allowance = calls_per_min
+        self._budget_at = clock()
+
+    # --- budget -------------------------------------------------------------------------------
+
+    def _accrue(self, now: float) -> float:
+        """API calls that may be spent now: accrued at calls_per_min, capped at one minute's worth."""
+        if self.calls_per_min <= 0:
+            return math.inf
+        self._allowance = min(self.calls_per_min, self._allowance + (now - self._budget_at) * self.calls_per_min / 60)
+        self._budget_at = now
+        return self._allowance
+
+    def _spend(self, calls: int):
+        if self.calls_per_min > 0:
+            self._allowance -= calls
+
+    # --- scheduling ---------------------------------------------------------------------------
+
+    def interval_for(self, row: dict) -> float:
+        hot = (row.get("ai_score") or 0) >= DAEMON_HOT_SCORE or (row.get("rvol") or 0) >= RVOL_MIN
+        (self.hot.add if hot else self.hot.discard)(row["coin_id"])
+        return self.hot_sec if hot else self.cold_sec
+
+    def due(self, now: float, budget: float, cost: Callable[[str], int] = lambda coin_id: 1) -> List[str]:
+        """
+        Coins due by ``now``, hot then most overdue first, while their ``cost`` in API calls fits
+        ``budget``. A coin that doesn't fit is passed over for cheaper ones (e.g. fresh on disk).
+        """
+        ready = [c for c, at in self.schedule.items() if at <= now]
+        ready.sort(key=lambda c: (c not in self.hot, self.schedule[c]))
+        if budget == math.inf:
+            return ready
+        chosen = []
+        for coin_id in ready:
+            calls = cost(coin_id)
+            if calls <= budget:
+                chosen.append(coin_id)
+                budget -= calls
+        return chosen
+
+    def next_wake(self, now: float) -> float:
+        """Seconds until something is due, at most tick_sec."""
+        upcoming = list(self.schedule.values())
+        if self.universe_at is not None:
+            upcoming.append(self.universe_at + self.universe_sec)
+        return max(min([self.tick_sec] + [at - now for at in upcoming]), 0.0)
+
+    # --- passes -------------------------------------------------------------------------------
+
+    def refresh_universe(self, now: float, writer: SignalWriter):
+        """Re-run Tier 1 over the market universe; new matches are due immediately, dropouts leave the schedule."""
+        rejections: dict = {}
+        matches = {m["id"]: m for m in iter_market_universe(self.limit, page_filter=tier1_page_filter(rejections, self.shard))}
+        for coin_id, m in matches.items():
+            writer.add(tier1_payload(m), on_conflict="coin_id")
+            self.schedule.setdefault(coin_id, now)
+        for coin_id in set(self.schedule) - set(matches):
+            self.schedule.pop(coin_id, None)
+            self.hot.discard(coin_id)
+            self.rows.pop(coin_id, None)
+            self.states.pop(coin_id, None)
+        self.markets = matches
+        self.universe_at = now
+        inc("scanner_candidates_total", value=len(matches), tier="tier1")
+        logging.info("Universe refreshed: %d Tier 1 matches; rejections %s", len(matches), rejections)
+
+    def run_cycle(self) -> dict:
+        """One scheduling pass: refresh the universe if stale, then scan the coins that are due."""
+        started = self._clock()
+        budget = self._accrue(started)
+        pages = max(math.ceil(self.limit / MARKETS_PER_PAGE), 1)
+        stats = {"universe": False, "scanned": 0, "alerts": 0, "due": 0, "calls": 0}
+        alert_stage = AlertStage(self.dispatcher)
+        ingest_feed()
+
+        with SignalWriter() as writer:
+            stale = self.universe_at is None or started - self.universe_at >= self.universe_sec
+            if stale and (budget >= pages or self.universe_at is None):
+                try:
+                    self.refresh_universe(started, writer)
+                    stats["universe"] = True
+                except Exception:
+                    logging.exception("Universe refresh failed; keeping the previous schedule")
+                self._spend(pages)
+                budget = self._accrue(self._clock())
+
+            # hot coins must see new data every hot_sec; anything fetched within half that is current enough
+            fresh_sec = min(CANDLE_STORE_FRESH_SEC, self.hot_sec / 2)
+            chosen = self.due(started, max(budget, 0), lambda c: estimated_calls(c, fresh_sec=fresh_sec))
+            stats["due"] = sum(1 for at in self.schedule.values() if at <= started)
+            for coin_id, df in fetch_ohlcv_many(chosen, fresh_sec=fresh_sec):
+                self._spend(df.attrs.get("api_calls", 0))  # what the fetch actually cost, retries included
+                stats["calls"] += df.attrs.get("api_calls", 0)
+                row = process_coin(coin_id, df, self.markets.get(coin_id), writer, self.states)
+                now = self._clock()
+                if row is None:
+                    self.schedule[coin_id] = now + self.cold_sec
+                    continue
+                self.rows[coin_id] = row
+                self.schedule[coin_id] = now + self.interval_for(row)
+                alert_stage.offer(row)
+                stats["scanned"] += 1
+        stats["alerts"] = len(alert_stage.finish())
+
+        if stats["scanned"]:
+            write_results(sorted(self.rows.values(), key=lambda r: r.get("ai_score") or 0, reverse=True),
+                          shard_path(RESULTS_FILE, self.shard))
+        duration = self._clock() - started
+        observe("scanner_stage_seconds", duration, stage="daemon_cycle")
+        stats.update(hot=len(self.hot), tracked=len(self.schedule))
+        write_run_summary({"started_at": started, "duration_sec": round(duration, 3), "mode": "daemon",
+                           "tier1": len(self.markets), "tier2": stats["scanned"], "alerts": stats["alerts"],
+                           "shard": str(self.shard) if self.shard else None},
+                          shard_path(RUN_SUMMARY_FILE, self.shard))
+        self.checkpoint()
+        return stats
+
+    # --- state --------------------------------------------------------------------------------
+
+    def checkpoint(self):
+        if not self.state_file:
+            return
+        state = {"saved_at": self._clock(), "universe_at": self.universe_at, "schedule": self.schedule,
+                 "hot": sorted(self.hot), "markets": self.markets, "rows": self.rows,
+                 "indicators": {c: s.to_dict() for c, s in self.states.items()}}
+        tmp = f"{self.state_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(state, f, default=str)
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            logging.warning("Could not checkpoint daemon state to %s: %s", self.state_file, e)
+
+    def restore(self) -> bool:
+        if not self.state_file or not os.path.exists(self.state_file):
+            return False
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+            self.schedule = {c: float(at) for c, at in state.get("schedule", {}).items()}
+            self.hot = set(state.get("hot", []))
+            self.markets = state.get("markets", {})
+            self.rows = state.get("rows", {})
+            self.universe_at = state.get("universe_at")
+            self.states = current_states({c: TimeframeStates.from_dict(d) for c, d in (state.get("indicators") or {}).items()})
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logging.warning("Ignoring unreadable daemon state %s: %s", self.state_file, e)
+            return False
+        logging.info("Restored daemon state: %d coins scheduled, %d hot", len(self.schedule), len(self.hot))
+        return True
+
+    # --- lifecycle ----------------------------------------------------------------------------
+
+    def stop(self, *_):
+        if not self._stop.is_set():
+            logging.info("Stop requested; finishing the current pass")
+        self._stop.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def run_forever(self, max_cycles: Optional[int] = None):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+        self.restore()
+        cycles = 0
+        while not self.stopping:
+            try:
+                stats = self.run_cycle()
+                logging.info("Daemon pass: %s", stats)
+            except Exception:
+                logging.exception("Daemon pass failed")
+            cycles += 1
+            if max_cycles is not None and cycles >= max_cycles:
+                break
+            if not self.stopping:
+                self._sleep(self.next_wake(self._clock()))
+        self.checkpoint()
+        if self.dispatcher is not None:
+            self.dispatcher.flush()
+        logging.info("Daemon stopped after %d passes", cycles)
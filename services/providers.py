@@ -1,51 +1,404 @@
 # services/providers.py
-import requests
+import os
+import re
+import json
+import time
+import random
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
-from typing import List
 
-COINGECKO_API = "https://api.coingecko.com/api/v3"
+from config import (
+    COINGECKO_CALLS_PER_MIN, COINGECKO_BURST, FETCH_CONCURRENCY, FETCH_MAX_RETRIES, CANDLE_STORE_FRESH_SEC,
+    CANDLE_INTERVAL_SEC, CANDLE_USE_OHLC,
+    MAX_MARKETS_TO_SCAN, MARKETS_PER_PAGE, UNIVERSE_TTL_SEC, UNIVERSE_CACHE_DIR,
+)
+from services import candle_store
+from services.candle_store import CandleStore, resample, to_candles
+from services.ratelimit import TokenBucket
+from instrumentation import inc, observe
 
-def get_top_markets(limit: int = 200, vs_currency: str = "usd") -> List[dict]:
-    """Return coin market objects from CoinGecko (id, symbol, name, current_price, market_cap, total_volume, price_change_percentage_24h)."""
+COINGECKO_API = os.getenv("COINGECKO_API", "https://api.coingecko.com/api/v3")
+MAX_BACKOFF_SEC = 60.0
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_calls = threading.local()  # API requests made by the current thread, see _fetch_counted
+limiter = TokenBucket(COINGECKO_CALLS_PER_MIN / 60.0, capacity=COINGECKO_BURST)
+
+
+def get_session() -> requests.Session:
+    """Shared pooled session so concurrent fetches reuse keep-alive connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(FETCH_CONCURRENCY, 1))
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session = s
+    return _session
+
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    try:
+        return float(resp.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int) -> float:
+    return min(MAX_BACKOFF_SEC, (2 ** attempt) + random.uniform(0, 1))
+
+
+def _endpoint(url: str) -> str:
+    """Metric label for a provider URL, e.g. coins/{id}/market_chart."""
+    path = url[len(COINGECKO_API):].strip("/") if url.startswith(COINGECKO_API) else url
+    return re.sub(r"^coins/(?!markets$)[^/]+", "coins/{id}", path)
+
+
+def _get_json(url: str, params: Optional[dict] = None, timeout: float = 30):
+    """GET through the shared session and rate limiter; retries 429/5xx/connection errors with backoff."""
+    session = get_session()
+    endpoint = _endpoint(url)
+    for attempt in range(FETCH_MAX_RETRIES + 1):
+        limiter.acquire()
+        _calls.n = getattr(_calls, "n", 0) + 1
+        last = attempt == FETCH_MAX_RETRIES
+        t0 = time.perf_counter()
+        try:
+            resp = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if last:
+                raise
+            delay = _backoff(attempt)
+            logging.warning("GET %s failed; retrying in %.1fs", url, delay)
+            inc("scanner_http_retries_total", endpoint=endpoint, reason="connection")
+            time.sleep(delay)
+            continue
+        finally:
+            observe("scanner_http_request_seconds", time.perf_counter() - t0, endpoint=endpoint)
+        if resp.status_code == 429:
+            inc("scanner_http_429_total", endpoint=endpoint)
+        if resp.status_code == 429 and not last:
+            delay = _retry_after(resp) or _backoff(attempt)
+            logging.warning("429 from %s; pausing fetches for %.1fs", url, delay)
+            inc("scanner_http_retries_total", endpoint=endpoint, reason="429")
+            limiter.pause(delay)
+            continue
+        if resp.status_code >= 500 and not last:
+            delay = _backoff(attempt)
+            logging.warning("%s from %s; retrying in %.1fs", resp.status_code, url, delay)
+            inc("scanner_http_retries_total", endpoint=endpoint, reason="5xx")
+            time.sleep(delay)
+            continue
+        resp.raise_for_status()
+        return resp.json()
+
+
+MARKET_FIELDS = (
+    "id", "symbol", "name", "current_price", "market_cap", "total_volume", "price_change_percentage_24h",
+)
+_universe_cache: dict = {}
+_universe_lock = threading.Lock()
+
+
+def get_markets_page(page: int, per_page: int = MARKETS_PER_PAGE, vs_currency: str = "usd") -> List[dict]:
     url = f"{COINGECKO_API}/coins/markets"
     params = {
         "vs_currency": vs_currency,
         "order": "market_cap_desc",
-        "per_page": limit,
-        "page": 1,
+        "per_page": per_page,
+        "page": page,
         "sparkline": False,
     }
-    resp = requests.get(url, params=params, timeout=20)
-    resp.raise_for_status()
-    return resp.json()
-
-def get_ohlcv_coin_gecko(coin_id: str, days: int = 7) -> pd.DataFrame:
-    """
-    Return a DataFrame with columns: close, volume, high, low indexed by timestamp.
-    Uses /coins/{id}/market_chart endpoint (prices + volumes).
-    """
-    url = f"{COINGECKO_API}/coins/{coin_id}/market_chart"
-    params = {"vs_currency": "usd", "days": days}
-    resp = requests.get(url, params=params, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
-    prices = data.get("prices", [])
-    volumes = data.get("total_volumes", [])
-    if not prices:
+    return _get_json(url, params=params, timeout=20) or []
+
+
+def _universe_path(vs_currency: str) -> Optional[str]:
+    return os.path.join(UNIVERSE_CACHE_DIR, f"universe_{vs_currency}.json") if UNIVERSE_CACHE_DIR else None
+
+
+def _cached_universe(total: int, vs_currency: str) -> Optional[dict]:
+    """A fresh snapshot covering at least ``total`` markets, from memory or disk."""
+    snap = _universe_cache.get(vs_currency)
+    path = _universe_path(vs_currency)
+    if snap is None and path and os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                snap = json.load(f)
+            _universe_cache[vs_currency] = snap
+        except (OSError, ValueError):
+            logging.warning("Ignoring unreadable universe snapshot %s", path)
+            snap = None
+    if snap and time.time() - snap["fetched_at"] < UNIVERSE_TTL_SEC and snap["requested"] >= total:
+        return snap
+    return None
+
+
+def _store_universe(snap: dict, vs_currency: str):
+    _universe_cache[vs_currency] = snap
+    path = _universe_path(vs_currency)
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"  # shard processes may share the cache dir
+        with open(tmp, "w") as f:
+            json.dump(snap, f)
+        os.replace(tmp, path)
+    except OSError:
+        logging.warning("Could not write universe snapshot %s", path)
+
+
+def _select(rows: List[tuple], predicate, page_filter) -> Iterator[dict]:
+    if page_filter is not None and rows:
+        columns = {f: [row[i] for row in rows] for i, f in enumerate(MARKET_FIELDS)}
+        rows = [row for row, keep in zip(rows, page_filter(columns)) if keep]
+    for row in rows:
+        market = dict(zip(MARKET_FIELDS, row))
+        if predicate is None or predicate(market):
+            yield market
+
+
+def iter_market_universe(total: int = MAX_MARKETS_TO_SCAN, predicate: Optional[Callable[[dict], bool]] = None,
+                         vs_currency: str = "usd", max_workers: Optional[int] = None,
+                         page_filter: Optional[Callable[[dict], Sequence[bool]]] = None) -> Iterator[dict]:
+    """
+    Yield up to ``total`` unique markets (MARKET_FIELDS only), fetching every /coins/markets page
+    concurrently through the shared rate limiter and yielding as each page lands. Only rows that
+    pass the filters are turned into dicts for the caller: ``page_filter`` gets each page as
+    {field: [values]} columns and returns a keep-mask; ``predicate`` is a per-row check.
+    The projected universe is kept as a columnar snapshot for UNIVERSE_TTL_SEC (in memory and
+    under UNIVERSE_CACHE_DIR), so repeat calls within the TTL cost no API quota.
+    """
+    with _universe_lock:
+        snap = _cached_universe(total, vs_currency)
+    inc("scanner_cache_requests_total", cache="universe", result="hit" if snap is not None else "miss")
+    if snap is not None:
+        columns = snap["columns"]
+        yield from _select(list(zip(*(columns[f][:total] for f in MARKET_FIELDS))), predicate, page_filter)
+        return
+
+    per_page = min(MARKETS_PER_PAGE, max(total, 1))
+    pages = range(1, -(-total // per_page) + 1)
+    page_rows = {}
+    seen = set()
+    complete = True
+    pool = ThreadPoolExecutor(max_workers=max_workers or FETCH_CONCURRENCY, thread_name_prefix="markets")
+    try:
+        futures = {pool.submit(get_markets_page, page, per_page, vs_currency): page for page in pages}
+        for fut in as_completed(futures):
+            try:
+                rows = fut.result()
+            except Exception:
+                logging.exception("Markets page %d failed", futures[fut])
+                complete = False
+                continue
+            page = futures[fut]
+            kept = page_rows[page] = []
+            for m in rows[:total - (page - 1) * per_page]:  # the last page may run past ``total``
+                coin_id = m.get("id")
+                if not coin_id or coin_id in seen:
+                    continue  # rank shifts between pages can repeat a coin
+                seen.add(coin_id)
+                kept.append(tuple(m.get(f) for f in MARKET_FIELDS))
+            yield from _select(kept, predicate, page_filter)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    if complete:
+        ordered = [row for page in sorted(page_rows) for row in page_rows[page]]  # market-cap rank order
+        columns = {f: [row[i] for row in ordered] for i, f in enumerate(MARKET_FIELDS)}
+        with _universe_lock:
+            _store_universe({"fetched_at": time.time(), "requested": total, "columns": columns}, vs_currency)
+
+
+def get_top_markets(limit: int = 200, vs_currency: str = "usd") -> List[dict]:
+    """Return coin market objects from CoinGecko (id, symbol, name, current_price, market_cap, total_volume, price_change_percentage_24h)."""
+    return list(iter_market_universe(limit, vs_currency=vs_currency))
+
+
+def prefetch_universe(total: int = MAX_MARKETS_TO_SCAN, vs_currency: str = "usd") -> Optional[str]:
+    """
+    List the universe once and persist its snapshot, so scans started within UNIVERSE_TTL_SEC
+    (e.g. every shard of one run) read it instead of paging /coins/markets themselves. Returns the
+    snapshot path, or None if a page failed or UNIVERSE_CACHE_DIR is unset.
+    """
+    for _ in iter_market_universe(total, vs_currency=vs_currency):
+        pass
+    path = _universe_path(vs_currency)
+    with _universe_lock:
+        fresh = _cached_universe(total, vs_currency) is not None
+    return path if fresh and path and os.path.exists(path) else None
+
+
+def _chart_to_candles(data: dict) -> np.ndarray:
+    """market_chart prices/total_volumes as raw ticks (open = high = low = close)."""
+    prices = np.asarray(data.get("prices") or [], dtype=float).reshape(-1, 2)
+    volumes = np.asarray(data.get("total_volumes") or [], dtype=float).reshape(-1, 2)
+    vols = volumes[:, 1] if len(volumes) == len(prices) else np.zeros(len(prices))
+    return to_candles((prices[:, 0] // 1000).astype(np.int64), prices[:, 1], vols)
+
+
+def _ohlc_to_candles(rows: list, step: int = CANDLE_INTERVAL_SEC) -> np.ndarray:
+    """
+    /coins/{id}/ohlc rows ([close_ms, o, h, l, c]) restamped at their open time, with unknown
+    volume. Candles coarser than ``step`` are dropped: their range can't be placed inside one bar.
+    """
+    ohlc = np.asarray(rows or [], dtype=float).reshape(-1, 5)
+    if len(ohlc) < 2:
+        return to_candles([], [], [])
+    ts = (ohlc[:, 0] // 1000).astype(np.int64)
+    granularity = int(np.median(np.diff(ts)))
+    if granularity > step:
+        return to_candles([], [], [])
+    return to_candles(ts - granularity, ohlc[:, 4], np.full(len(ts), np.nan), ohlc[:, 1], ohlc[:, 2], ohlc[:, 3])
+
+
+def _candles_to_frame(arr: np.ndarray) -> pd.DataFrame:
+    if not len(arr):
         return pd.DataFrame()
+    return pd.DataFrame(
+        {c: arr[c] for c in ("open", "high", "low", "close", "volume")},
+        index=pd.to_datetime(arr["ts"], unit="s"),
+    )
+
+
+def _wants_ohlc(window: float) -> bool:
+    # ticks over more than a day come hourly, one per bar, so the bars would have no range
+    return CANDLE_USE_OHLC or window > 86400
 
-    # Align prices and volumes by index
-    import pandas as pd
-    ts = [int(p[0] / 1000) for p in prices]
-    closes = [p[1] for p in prices]
-    vols = [v[1] for v in volumes] if volumes else [0] * len(closes)
-    df = pd.DataFrame({"close": closes, "volume": vols}, index=pd.to_datetime(ts, unit="s"))
-    # approximate high/low
-    df["high"] = df["close"] * 1.001
-    df["low"] = df["close"] * 0.999
+
+def estimated_calls(coin_id: str, days: int = 7, fresh_sec: float = CANDLE_STORE_FRESH_SEC,
+                    store: Optional[CandleStore] = None) -> int:
+    """
+    API requests get_ohlcv_coin_gecko would make for the coin now, before retries: 0 when the
+    stored candles are fresh, else the chart request plus /ohlc if needed. Judged from the
+    file's age alone, so it is cheap enough to ask for every coin a scheduler considers.
+    """
+    store = store or candle_store.store
+    age = store.age(coin_id) if store else None
+    if age is not None and age < fresh_sec:
+        return 0
+    window = days * 86400 if age is None or age >= days * 86400 else age
+    return 1 + _wants_ohlc(window)
+
+
+def get_ohlcv_coin_gecko(coin_id: str, days: int = 7, store: Optional[CandleStore] = None,
+                         fresh_sec: float = CANDLE_STORE_FRESH_SEC) -> pd.DataFrame:
+    """
+    Return a DataFrame with columns: open, high, low, close, volume indexed by bar open time.
+    Price ticks are resampled into CANDLE_INTERVAL bars (and merged with /ohlc candles when
+    CANDLE_USE_OHLC is set), so high/low are real ranges. Resampling happens once, on ingest:
+    the local candle store keeps finished bars. A cold start pulls the full
+    /coins/{id}/market_chart window, a warm start only pulls the tail from the last (still open)
+    bar via /market_chart/range. Files written within ``fresh_sec`` are served as-is.
+
+    Windows over a day come back as hourly ticks, so a cold start (or a gap of more than a day)
+    also pulls the last day of 30m /ohlc candles: the latest 24 hourly bars, and with them the
+    ATR window, get real high/low. Older cold-start bars stay close-only (open = high = low =
+    close) and with CANDLE_INTERVAL under 30m the /ohlc candles are too coarse to use.
+    """
+    store = store or candle_store.store
+    now = int(time.time())
+    step = store.step if store else CANDLE_INTERVAL_SEC
+    cached = store.load(coin_id) if store else None
+    base = f"{COINGECKO_API}/coins/{coin_id}"
+
+    if cached is not None and len(cached) and store.age(coin_id) < fresh_sec:
+        inc("scanner_cache_requests_total", cache="candles", result="hit")
+        return _candles_to_frame(cached)
+    if cached is not None and len(cached) and now - int(cached["ts"][-1]) < days * 86400:
+        inc("scanner_cache_requests_total", cache="candles", result="partial")
+        window = now - int(cached["ts"][-1])
+        params = {"vs_currency": "usd", "from": int(cached["ts"][-1]), "to": now}
+        fresh = _chart_to_candles(_get_json(f"{base}/market_chart/range", params=params, timeout=30))
+    else:
+        inc("scanner_cache_requests_total", cache="candles", result="miss")
+        cached = None
+        window = days * 86400
+        fresh = _chart_to_candles(_get_json(f"{base}/market_chart", params={"vs_currency": "usd", "days": days}, timeout=30))
+    if _wants_ohlc(window):
+        try:
+            rows = _get_json(f"{base}/ohlc", params={"vs_currency": "usd", "days": 1}, timeout=30)
+            ohlc = _ohlc_to_candles(rows, step)
+            fresh = np.concatenate([ohlc, fresh])  # ticks sort after a same-second candle open
+        except Exception:
+            logging.warning("OHLC fetch failed for %s; using price ticks only", coin_id)
+
+    if not store:
+        return _candles_to_frame(resample(fresh, step))
+    merged = store.merge(cached, fresh)
+    store.save(coin_id, merged)
+    return _candles_to_frame(merged)
+
+
+def _fetch_counted(coin_id: str, days: int, fresh_sec: float) -> pd.DataFrame:
+    """get_ohlcv_coin_gecko on a pool thread, with the API requests it made in df.attrs["api_calls"]."""
+    _calls.n = 0
+    try:
+        df = get_ohlcv_coin_gecko(coin_id, days, fresh_sec=fresh_sec)
+    except Exception as e:
+        e.api_calls = _calls.n
+        raise
+    df.attrs["api_calls"] = _calls.n
     return df
 
+
+def fetch_ohlcv_many(coin_ids: Iterable[Optional[str]], days: int = 7, max_workers: Optional[int] = None,
+                     fresh_sec: float = CANDLE_STORE_FRESH_SEC, poll_sec: float = 0.05) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Fetch OHLCV for many coins on a bounded thread pool, yielding (coin_id, df) as each
+    response arrives. Throughput is bounded by the shared rate limiter, not per-request latency.
+    ``coin_ids`` is consumed lazily (at most 2x max_workers requests in flight), so it can be a
+    stream fed by an upstream stage; such a stream yields None when it has nothing ready, and
+    finished fetches are then handed out while it is polled again every ``poll_sec``.
+    Coins that fail after retries yield an empty DataFrame. Each frame's attrs["api_calls"]
+    says how many API requests (retries included) it took.
+    """
+    workers = max_workers or FETCH_CONCURRENCY
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ohlcv")
+    pending = {}
+    source = iter(coin_ids)
+    exhausted = False
+    try:
+        while True:
+            idle = False
+            while not exhausted and len(pending) < 2 * workers:
+                try:
+                    coin_id = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if coin_id is None:  # upstream has nothing yet; don't block on it
+                    idle = True
+                    break
+                pending[pool.submit(_fetch_counted, coin_id, days, fresh_sec)] = coin_id
+            if not pending:
+                if exhausted:
+                    return
+                continue
+            done, _ = wait(pending, timeout=poll_sec if idle else None, return_when=FIRST_COMPLETED)
+            for fut in done:
+                coin_id = pending.pop(fut)
+                try:
+                    df = fut.result()
+                except Exception as e:
+                    logging.exception("OHLCV fetch failed for %s", coin_id)
+                    df = pd.DataFrame()
+                    df.attrs["api_calls"] = getattr(e, "api_calls", 0)
+                yield coin_id, df
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
 def get_current_price_for_symbol(symbol: str, vs_currency: str = "usd") -> float:
     """
     Symbol should be CoinGecko coin id or symbol; this helper fetches current price for an id.
@@ -53,6 +406,4 @@ def get_current_price_for_symbol(symbol: str, vs_currency: str = "usd") -> float
     """
     url = f"{COINGECKO_API}/simple/price"
     params = {"ids": symbol, "vs_currencies": vs_currency, "include_24hr_change": "true"}
-    r = requests.get(url, params=params, timeout=10)
-    r.raise_for_status()
-    return r.json().get(symbol, {}).get(vs_currency)
+    return _get_json(url, params=params, timeout=10).get(symbol, {}).get(vs_currency)
@@ -1,16 +1,264 @@
-import pandas as pd
-import requests
+# services/scanner.py
+"""
+Single-process scan pipeline: market fetch -> passes_tier1 -> OHLCV fetch -> compute_metrics
+-> compute_ai_score -> persist; alert candidates are then deduped in one store query, [batched social sentiment] and sent. Tier 1 runs on its own thread and streams
+matches through a bounded queue, so deep-scan fetches start with the first match and the
+network wait overlaps indicator compute. No tier1_symbols.txt handoff or second process.
+"""
+import time
+import queue
+import logging
+import threading
+from typing import Dict, Iterator, List, Optional
 
-def run_auto_scan():
+from config import (
+    MAX_MARKETS_TO_SCAN, PIPELINE_QUEUE_SIZE, ALERT_MIN_SCORE, RESULTS_FILE, RUN_SUMMARY_FILE, INDICATOR_STATE_FILE,
+)
+from db import SignalWriter
+from duplicate_cache import seen_recent_many, mark_seen_many
+from services.providers import iter_market_universe, fetch_ohlcv_many
+from scanner_tier1 import tier1_mask, tier1_payload
+from scanner_tier2 import build_tier2_payload, new_indicator_state
+from technical_indicators import TimeframeStates, load_states, save_states
+from results_store import ResultsWriter
+from sentiment_analysis import collect_sentiment
+from catalyst_analysis import get_index, catalyst_summary, ingest_feed
+from services.sentiment import get_collector
+from services.sharding import Shard, shard_mask, shard_path
+from instrumentation import inc, observe, timer, write_run_summary
+
+_DONE = object()
+
+
+def tier1_page_filter(rejections: dict, shard: Optional[Shard] = None):
+    """
+    page_filter for iter_market_universe: column-wise Tier 1 mask, tallying rejections by rule.
+    With a shard, coins outside it are dropped first and don't count as rejections.
+    """
+    def page_filter(columns):
+        own = shard_mask(shard, columns["id"]) if shard else None
+        if own is not None:
+            columns = {f: [v for v, keep in zip(values, own) if keep] for f, values in columns.items()}
+        with timer("scanner_stage_seconds", stage="tier1_filter"):
+            mask, rejected = tier1_mask(columns) if columns["id"] else ([], {})
+        for rule, count in rejected.items():
+            rejections[rule] = rejections.get(rule, 0) + count
+        if own is None:
+            return mask
+        passed = iter(mask)
+        return [keep and bool(next(passed)) for keep in own]
+    return page_filter
+
+
+def _tier1_stage(out_q: queue.Queue, writer: SignalWriter, markets: dict, stats: dict, limit: int,
+                 shard: Optional[Shard] = None):
+    page_filter = tier1_page_filter(stats["tier1_rejections"], shard)
+    try:
+        # pages are fetched concurrently and filtered column-wise; only Tier 1 matches come back
+        for m in iter_market_universe(limit, page_filter=page_filter):
+            markets[m["id"]] = m
+            writer.add(tier1_payload(m), on_conflict="coin_id")
+            stats["tier1"] += 1
+            inc("scanner_candidates_total", tier="tier1")
+            out_q.put(m["id"])  # blocks while the deep scan is a full queue behind
+    except Exception:
+        logging.exception("Tier 1 stage failed")
+    finally:
+        out_q.put(_DONE)
+
+
+def _drain(q: queue.Queue, poll_sec: float = 0.05) -> Iterator[Optional[str]]:
+    """Queue items until _DONE; None while the queue stays empty for ``poll_sec`` (see fetch_ohlcv_many)."""
+    while True:
+        try:
+            item = q.get(timeout=poll_sec)
+        except queue.Empty:
+            yield None
+            continue
+        if item is _DONE:
+            return
+        yield item
+
+
+def _alert_payload(row: dict, sentiment: Optional[dict] = None) -> dict:
+    payload = {
+        "symbol": row["ticker"],
+        "price": row.get("price"),
+        "change_pct": row.get("price_change_pct_24h") or 0.0,
+        "ai_score": row.get("ai_score", 0.0),
+        "ai_reason": row.get("ai_reason", ""),
+        "risk": row.get("risk", {}),
+        "links": {"tradingview": f"https://www.tradingview.com/symbols/{row['ticker']}USD/"},
+    }
+    catalyst = get_index().best(row["ticker"], row.get("coin_id"))
+    if catalyst:
+        payload["links"]["catalyst"] = [catalyst_summary(catalyst)]
+        payload["links"]["news"] = [catalyst["url"]] if catalyst.get("url") else []
+    if sentiment and sentiment.get("score") is not None:
+        payload["sentiment"] = sentiment
+        payload["links"]["reddit"] = sentiment.get("links", [])
+    return payload
+
+
+class AlertStage:
+    """
+    Alert gate shared by the one-shot pipeline and the daemon: score threshold, dedupe and
+    dispatch. offer() only applies the score threshold; finish() checks every candidate against
+    the dedupe store in one query, runs one batched sentiment lookup when sources are configured
+    (dropping rows that fail passes_sentiment; a coin no source answered for in time is still
+    alerted), submits the rest and marks the sent tickers seen in one write.
+    """
+
+    def __init__(self, dispatcher):
+        self.dispatcher = dispatcher
+        self.collector = get_collector() if dispatcher is not None else None
+        self.candidates: List[dict] = []
+        self.alerted: List[dict] = []
+
+    def offer(self, row: dict):
+        if self.dispatcher is not None and row["ai_score"] >= ALERT_MIN_SCORE:
+            self.candidates.append(row)
+
+    def _send(self, row: dict, sentiment: Optional[dict] = None) -> bool:
+        if not self.dispatcher.submit(_alert_payload(row, sentiment)):
+            return False
+        self.alerted.append(row)
+        inc("scanner_candidates_total", tier="alerted")
+        return True
+
+    def _unseen(self, candidates: List[dict]) -> List[dict]:
+        """Candidates not alerted within the dedupe window, first row per ticker, in one store query."""
+        seen = seen_recent_many(r["ticker"] for r in candidates)
+        fresh = []
+        for row in candidates:
+            ticker = row["ticker"].upper()
+            if not seen[ticker]:
+                seen[ticker] = True
+                fresh.append(row)
+        return fresh
+
+    def finish(self) -> List[dict]:
+        """Send this scan's alerts, wait for delivery and return every row alerted so far."""
+        candidates, self.candidates = self.candidates, []
+        candidates = self._unseen(candidates) if candidates else []
+        sentiment: Dict[str, dict] = {}
+        if candidates and self.collector is not None:
+            with timer("scanner_stage_seconds", stage="sentiment"):
+                sentiment = collect_sentiment({r["coin_id"]: r["ticker"] for r in candidates}, self.collector)
+        rejected, sent = 0, []
+        for row in candidates:
+            result = sentiment.get(row["coin_id"])
+            if result and result.get("score") is not None and not result.get("passes"):
+                rejected += 1
+                continue
+            if self._send(row, result):
+                sent.append(row["ticker"])
+        mark_seen_many(sent)
+        if rejected:
+            inc("scanner_candidates_total", value=rejected, tier="sentiment_rejected")
+            logging.info("Sentiment rejected %d of %d alert candidates", rejected, len(candidates))
+        if self.dispatcher is not None:
+            self.dispatcher.flush()
+        return self.alerted
+
+
+def current_states(states: Dict[str, TimeframeStates]) -> Dict[str, TimeframeStates]:
+    """Saved indicator states minus any computed for other METRIC_TIMEFRAMES / PRIMARY_TIMEFRAME."""
+    fresh = new_indicator_state()
+    return {c: s for c, s in states.items() if (s.timeframes, s.primary) == (fresh.timeframes, fresh.primary)}
+
+
+def process_coin(coin_id: str, df, market: Optional[dict], writer: SignalWriter,
+                 states: Optional[Dict[str, TimeframeStates]] = None) -> Optional[dict]:
+    """
+    Tier 2 row for one coin's OHLCV, queued for persistence; None if there is nothing to score.
+    With ``states`` the coin's indicators are updated incrementally from its entry there.
+    """
+    if df.empty:
+        logging.warning("No OHLCV for %s; skipping", coin_id)
+        return None
+    state = None
+    if states is not None:
+        state = states.setdefault(coin_id, new_indicator_state())
+    try:
+        row = build_tier2_payload(coin_id, df, market, state)
+    except Exception:
+        logging.exception("Error processing %s", coin_id)
+        if states is not None:
+            states.pop(coin_id, None)  # may be half-updated; the next scan starts it over
+        return None
+    writer.add(row, on_conflict="coin_id")
+    inc("scanner_candidates_total", tier="tier2")
+    logging.info("Processed %s ai_score=%s rsi=%s rvol=%s", coin_id, row["ai_score"], row["rsi"], row["rvol"])
+    return row
+
+
+def run_pipeline(alerts: bool = False, limit: int = MAX_MARKETS_TO_SCAN, dispatcher=None,
+                 shard: Optional[Shard] = None) -> dict:
+    """
+    Run one full scan cycle. Returns counts plus the rows that were alerted. With a shard, only
+    its slice of the universe is scanned and results / run summary go to its shard files.
+    """
+    started = time.time()
+    stats = {"tier1": 0, "tier1_rejections": {}}
+    markets: dict = {}
+    if alerts and dispatcher is None:
+        from telegram_alerts import get_dispatcher
+        dispatcher = get_dispatcher()
+    alert_stage = AlertStage(dispatcher)
+    ingest_feed()  # catalysts appended since the last run, for the alert links
+    state_file = shard_path(INDICATOR_STATE_FILE, shard)
+    states = current_states(load_states(state_file, TimeframeStates)) if state_file else {}
+    scanned = set()
+
+    tier1_q: queue.Queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    # results stream to disk as they are scored and are published atomically when the cycle ends
+    with SignalWriter() as writer, ResultsWriter(shard_path(RESULTS_FILE, shard)) as results:
+        producer = threading.Thread(
+            target=_tier1_stage, args=(tier1_q, writer, markets, stats, limit, shard), name="tier1", daemon=True
+        )
+        producer.start()
+        for coin_id, df in fetch_ohlcv_many(_drain(tier1_q)):
+            row = process_coin(coin_id, df, markets.get(coin_id), writer, states)
+            if row is not None:
+                scanned.add(coin_id)
+                results.add(row)
+                alert_stage.offer(row)
+        producer.join()
+    if state_file:
+        try:
+            save_states(state_file, {c: s for c, s in states.items() if c in scanned})  # this run's Tier 1 only
+        except OSError as e:
+            logging.warning("Could not save indicator state to %s: %s", state_file, e)
+    alerted = alert_stage.finish()
+    logging.info("Tier1 matched %d; rejections by rule: %s", stats["tier1"], stats["tier1_rejections"])
+
+    duration = time.time() - started
+    observe("scanner_stage_seconds", duration, stage="pipeline")
+    summary = {"tier1": stats["tier1"], "tier1_rejections": stats["tier1_rejections"], "tier2": results.count, "alerts": alerted}
+    write_run_summary({
+        "started_at": started, "duration_sec": round(duration, 3), "tier1": stats["tier1"],
+        "tier1_rejections": stats["tier1_rejections"], "tier2": results.count, "alerts": len(alerted),
+        "shard": str(shard) if shard else None,
+    }, shard_path(RUN_SUMMARY_FILE, shard))
+    return summary
+
+
+def run_auto_scan(limit: Optional[int] = None):
     """
     Run automatic scan (used by scheduler / GitHub Actions / Render cronjob)
     """
-    # ✅ Replace this with your real scanning logic
-    return {"message": "Auto scan completed successfully"}
+    summary = run_pipeline(alerts=False, limit=limit or MAX_MARKETS_TO_SCAN)
+    return {
+        "message": "Auto scan completed successfully",
+        "tier1": summary["tier1"],
+        "tier2": summary["tier2"],
+    }
+
 
-def scan_and_alert():
+def scan_and_alert(limit: Optional[int] = None, shard: Optional[Shard] = None) -> List[dict]:
     """
-    Run manual scan + send alerts
+    Run scan + send Telegram alerts for high-scoring, not recently alerted signals.
+    Returns the alerted rows.
     """
-    # ✅ Replace this with your real alert logic (Telegram, Supabase, etc.)
-    return {"message": "Manual scan & alert triggered successfully"}
+    return run_pipeline(alerts=True, limit=limit or MAX_MARKETS_TO_SCAN, shard=shard)["alerts"]
@@ -0,0 +1,308 @@
+# services/sentiment.py
+"""
+Social sentiment collection. Each source adapter fetches raw per-coin stats for a batch of
+coins (one bulk call where the API has one, else one call per coin); SentimentCollector fans
+out to every source at once, keeps a per-source TTL cache and enforces a hard per-batch
+deadline. Sources that miss the deadline are left out of that batch's scores, and their late
+results still land in the cache for the next batch.
+
+Adapters return {coin_id: dict} in the shapes sentiment_analysis.aggregate_sentiment reads:
+    lunarcrush  {"galaxy_score": 0..100, "mentions", "engagement"}
+    santiment   {"sentiment": -1..1}
+    reddit      {"engagement", "mentions"}
+    twitter     {"engagement", "mentions", "influencer_hit"}
+"""
+import os
+import abc
+import json
+import math
+import time
+import zlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+from config import SENTIMENT_DEADLINE_SEC, SENTIMENT_SOURCES
+from services.providers import get_session
+from instrumentation import inc, observe
+
+Coins = Dict[str, str]  # coin_id -> ticker symbol
+
+
+class SentimentSource(abc.ABC):
+    """Adapter base. ``bulk`` sources get whole batches (up to ``batch_size``) per fetch call."""
+
+    name = "source"
+    ttl = 900.0
+    bulk = False
+    batch_size = 100
+
+    @abc.abstractmethod
+    def fetch(self, coins: Coins) -> Dict[str, dict]:
+        """{coin_id: stats} for the coins the source has data on."""
+
+    def _get(self, url: str, **kwargs):
+        resp = get_session().get(url, timeout=kwargs.pop("timeout", 10), **kwargs)
+        resp.raise_for_status()
+        return resp.json()
+
+
+class LunarCrushSource(SentimentSource):
+    """LunarCrush v4 coin list: galaxy score and social volume for every coin in one call."""
+
+    name = "lunarcrush"
+    ttl = 900.0
+    bulk = True
+    batch_size = 10_000
+    url = "https://lunarcrush.com/api4/public/coins/list/v2"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def fetch(self, coins: Coins) -> Dict[str, dict]:
+        data = self._get(self.url, headers={"Authorization": f"Bearer {self.api_key}"}, timeout=15)
+        by_symbol = {str(row.get("symbol", "")).upper(): row for row in data.get("data", [])}
+        out = {}
+        for coin_id, symbol in coins.items():
+            row = by_symbol.get(symbol.upper())
+            if row and row.get("galaxy_score") is not None:
+                out[coin_id] = {
+                    "galaxy_score": row["galaxy_score"],
+                    "mentions": row.get("social_volume_24h") or 0,
+                    "engagement": row.get("interactions_24h") or 0,
+                }
+        return out
+
+
+class SantimentSource(SentimentSource):
+    """Santiment GraphQL: weighted sentiment for many slugs (CoinGecko ids mostly match) per query."""
+
+    name = "santiment"
+    ttl = 3600.0
+    bulk = True
+    batch_size = 50
+    url = "https://api.santiment.net/graphql"
+    query = """{ getMetric(metric: "sentiment_weighted_total") {
+        timeseriesDataPerSlugJson(selector: {slugs: %s}, from: "utc_now-1d", to: "utc_now", interval: "1d") } }"""
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def fetch(self, coins: Coins) -> Dict[str, dict]:
+        slugs = json.dumps(list(coins))  # a JSON string list is also a valid GraphQL list literal
+        resp = get_session().post(self.url, json={"query": self.query % slugs},
+                                  headers={"Authorization": f"Apikey {self.api_key}"}, timeout=15)
+        resp.raise_for_status()
+        series = resp.json()["data"]["getMetric"]["timeseriesDataPerSlugJson"] or []
+        out = {}
+        for point in series[-1:]:
+            for item in point.get("data", []):
+                if item.get("slug") in coins and item.get("value") is not None:
+                    # weighted sentiment is unbounded around 0; squash into -1..1
+                    out[item["slug"]] = {"sentiment": math.tanh(item["value"] / 5.0)}
+        return out
+
+
+class RedditSource(SentimentSource):
+    """Reddit search over the last day, one request per coin (no bulk endpoint)."""
+
+    name = "reddit"
+    ttl = 600.0
+    url = "https://www.reddit.com/search.json"
+
+    def fetch(self, coins: Coins) -> Dict[str, dict]:
+        out = {}
+        for coin_id, symbol in coins.items():
+            data = self._get(self.url, params={"q": f"${symbol.upper()} OR {coin_id}", "sort": "new", "t": "day", "limit": 100},
+                             headers={"User-Agent": "crypto-trading-scanner/1.0"})
+            posts = [c.get("data", {}) for c in data.get("data", {}).get("children", [])]
+            out[coin_id] = {
+                "mentions": len(posts),
+                "engagement": sum((p.get("score") or 0) + (p.get("num_comments") or 0) for p in posts),
+                "links": [f"https://www.reddit.com{p['permalink']}" for p in posts[:1] if p.get("permalink")],
+            }
+        return out
+
+
+class TwitterSource(SentimentSource):
+    """X/Twitter v2 recent search, one request per coin; flags posts from large accounts."""
+
+    name = "twitter"
+    ttl = 600.0
+    url = "https://api.twitter.com/2/tweets/search/recent"
+    influencer_followers = 100_000
+
+    def __init__(self, bearer_token: str):
+        self.bearer_token = bearer_token
+
+    def fetch(self, coins: Coins) -> Dict[str, dict]:
+        out = {}
+        for coin_id, symbol in coins.items():
+            data = self._get(self.url, headers={"Authorization": f"Bearer {self.bearer_token}"}, params={
+                "query": f"${symbol.upper()} -is:retweet", "max_results": 100,
+                "tweet.fields": "public_metrics", "expansions": "author_id", "user.fields": "public_metrics",
+            })
+            tweets = data.get("data", [])
+            users = data.get("includes", {}).get("users", [])
+            out[coin_id] = {
+                "mentions": len(tweets),
+                "engagement": sum(sum((t.get("public_metrics") or {}).get(k, 0) for k in ("like_count", "retweet_count", "reply_count"))
+                                  for t in tweets),
+                "influencer_hit": any((u.get("public_metrics") or {}).get("followers_count", 0) >= self.influencer_followers
+                                      for u in users),
+            }
+        return out
+
+
+class FakeSource(SentimentSource):
+    """
+    Offline stand-in for any source: deterministic stats derived from the coin id, with optional
+    per-call latency and failure, for tests, benchmarks and local runs (SENTIMENT_SOURCES=fake).
+    """
+
+    def __init__(self, name: str, bulk: bool = True, delay: float = 0.0, fail: bool = False, ttl: float = 900.0):
+        self.name = name
+        self.bulk = bulk
+        self.delay = delay
+        self.fail = fail
+        self.ttl = ttl
+        self.calls = 0
+
+    def fetch(self, coins: Coins) -> Dict[str, dict]:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} unavailable")
+        out = {}
+        for coin_id in coins:
+            h = zlib.crc32(f"{self.name}:{coin_id}".encode()) / 2**32
+            out[coin_id] = {
+                "galaxy_score": round(h * 100, 1),
+                "sentiment": round(h * 2 - 1, 3),
+                "mentions": int(h * 200),
+                "engagement": int(h * 2000),
+                "influencer_hit": h > 0.9,
+            }
+        return out
+
+
+class _SourceCache:
+    """Per-source {coin_id: (expires_at, stats)}; misses are cached as None so empty coins aren't refetched."""
+
+    def __init__(self, ttl: float, clock: Callable[[], float]):
+        self.ttl = ttl
+        self._clock = clock
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def split(self, coins: Coins):
+        now = self._clock()
+        hits, missing = {}, {}
+        with self._lock:
+            for coin_id, symbol in coins.items():
+                entry = self._data.get(coin_id)
+                if entry and entry[0] > now:
+                    if entry[1] is not None:
+                        hits[coin_id] = entry[1]
+                else:
+                    missing[coin_id] = symbol
+        return hits, missing
+
+    def put(self, coins: Coins, results: Dict[str, dict]):
+        expires = self._clock() + self.ttl
+        with self._lock:
+            for coin_id in coins:
+                self._data[coin_id] = (expires, results.get(coin_id))
+
+
+class SentimentCollector:
+    """Concurrent fan-out over ``sources`` with per-source TTL caches and a per-batch deadline."""
+
+    def __init__(self, sources: List[SentimentSource], deadline: float = SENTIMENT_DEADLINE_SEC,
+                 max_workers: int = 8, clock: Callable[[], float] = time.monotonic):
+        self.sources = list(sources)
+        self.deadline = deadline
+        self._clock = clock
+        self._caches = {s.name: _SourceCache(s.ttl, clock) for s in self.sources}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sentiment")
+
+    def _tasks(self, source: SentimentSource, missing: Coins) -> List[Coins]:
+        items = list(missing.items())
+        size = source.batch_size if source.bulk else 1
+        return [dict(items[i:i + size]) for i in range(0, len(items), size)]
+
+    def _run(self, source: SentimentSource, coins: Coins) -> Dict[str, dict]:
+        started = time.perf_counter()
+        try:
+            results = source.fetch(coins)
+        except Exception as e:
+            inc("sentiment_fetch_total", source=source.name, outcome="error")
+            logging.warning("Sentiment source %s failed: %s", source.name, e)
+            raise
+        observe("sentiment_fetch_seconds", time.perf_counter() - started, source=source.name)
+        inc("sentiment_fetch_total", source=source.name, outcome="ok")
+        self._caches[source.name].put(coins, results)  # even if the batch deadline already passed
+        return results
+
+    def collect(self, coins: Coins) -> Dict[str, Dict[str, dict]]:
+        """{source_name: {coin_id: stats}} for ``coins``; sources that miss the deadline contribute what they had cached."""
+        started = self._clock()
+        per_source: Dict[str, Dict[str, dict]] = {}
+        futures = {}
+        for source in self.sources:
+            hits, missing = self._caches[source.name].split(coins)
+            per_source[source.name] = hits
+            inc("scanner_cache_requests_total", cache=f"sentiment_{source.name}", result="hit", value=len(hits))
+            for batch in self._tasks(source, missing):
+                futures[self._pool.submit(self._run, source, batch)] = source.name
+
+        done, late = wait(futures, timeout=max(self.deadline - (self._clock() - started), 0))
+        for fut in done:
+            if fut.exception() is None:
+                per_source[futures[fut]].update(fut.result())
+        for fut in late:
+            fut.cancel()  # no-op once running; a running fetch still fills the cache
+            inc("sentiment_fetch_total", source=futures[fut], outcome="deadline")
+        if late:
+            logging.info("Sentiment deadline hit; partial results from %s", sorted({futures[f] for f in late}))
+        return per_source
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def sources_from_env(names: List[str] = SENTIMENT_SOURCES) -> List[SentimentSource]:
+    """Adapters for SENTIMENT_SOURCES whose credentials are configured; "fake" gives the four offline fakes."""
+    if names == ["fake"]:
+        return [FakeSource("lunarcrush"), FakeSource("santiment"), FakeSource("reddit", bulk=False), FakeSource("twitter", bulk=False)]
+    factories = {
+        "lunarcrush": lambda: LunarCrushSource(os.environ["LUNARCRUSH_API_KEY"]) if os.getenv("LUNARCRUSH_API_KEY") else None,
+        "santiment": lambda: SantimentSource(os.environ["SANTIMENT_API_KEY"]) if os.getenv("SANTIMENT_API_KEY") else None,
+        "reddit": lambda: RedditSource(),
+        "twitter": lambda: TwitterSource(os.environ["TWITTER_BEARER_TOKEN"]) if os.getenv("TWITTER_BEARER_TOKEN") else None,
+    }
+    sources = []
+    for name in names:
+        source = factories[name]() if name in factories else None
+        if source is None:
+            logging.info("Sentiment source %s not configured; skipping", name)
+        else:
+            sources.append(source)
+    return sources
+
+
+_collector: Optional[SentimentCollector] = None
+_collector_lock = threading.Lock()
+
+
+def get_collector() -> Optional[SentimentCollector]:
+    """Process-wide collector over the configured sources (so caches outlive one scan), or None if there are none."""
+    global _collector
+    if _collector is None and SENTIMENT_SOURCES:
+        with _collector_lock:
+            if _collector is None:
+                sources = sources_from_env()
+                _collector = SentimentCollector(sources) if sources else None
+    return _collector
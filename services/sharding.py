@@ -0,0 +1,134 @@
+# services/sharding.py
+"""
+Horizontal scanning: ``scheduler.py --shard i/N`` scans only the coins that consistent-hash to
+shard i of N (1-based), and ``scheduler.py --merge N`` combines the shards' outputs into the
+single ranked result set, run summary and dashboard snapshot.
+
+Coins are placed on a hash ring with VNODES points per shard (blake2b, so every process and
+runner agrees). Changing N moves only about 1/N of the coins, so each shard's candle store and
+dedupe state mostly stay valid. Each shard applies the shard filter to the whole market universe
+before the Tier 1 rules and deep-scans only its own slice, so rejection counts add up across
+shards. To list the universe once per run rather than once per shard, run
+``scheduler.py --list-universe`` first and hand its snapshot (UNIVERSE_CACHE_DIR) to every shard
+within UNIVERSE_TTL_SEC; a shard without a fresh snapshot pages /coins/markets itself.
+
+Every shard writes its signals to Supabase as it goes, which is what the web service reads; the
+merged files are the local record of the run (and the cold-start snapshot for an app sharing
+this data dir).
+
+Shard outputs sit next to the usual files with a ``.shard-i-of-N`` suffix (see shard_path).
+"""
+import os
+import hashlib
+import logging
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from config import RESULTS_FILE, RUN_SUMMARY_FILE, DASHBOARD_SNAPSHOT_FILE
+from results_store import read_results, write_results, save_snapshot_rows
+from signals_query import _sort_key
+from instrumentation import read_run_summary, write_run_summary
+
+VNODES = 256  # points per shard; at N=4 shard sizes stay within about 6% of even
+SNAPSHOT_ROWS = 200  # what the dashboard's Supabase query returns
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class Shard(NamedTuple):
+    index: int  # 1-based
+    count: int
+
+    @classmethod
+    def parse(cls, spec: str) -> "Shard":
+        """``"i/N"`` with 1 <= i <= N."""
+        try:
+            index, count = (int(p) for p in spec.split("/"))
+        except ValueError:
+            raise ValueError(f"shard spec must look like i/N, got {spec!r}")
+        if not 1 <= index <= count:
+            raise ValueError(f"shard index must be in 1..{count}, got {index}")
+        return cls(index, count)
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    @property
+    def suffix(self) -> str:
+        return f"shard-{self.index}-of-{self.count}"
+
+
+class HashRing:
+    """Consistent-hash ring over shards 1..count."""
+
+    _rings: Dict[tuple, tuple] = {}
+
+    def __init__(self, count: int, vnodes: int = VNODES):
+        key = (count, vnodes)
+        if key not in self._rings:
+            points = sorted((_hash(f"shard-{s}-{v}"), s) for s in range(1, count + 1) for v in range(vnodes))
+            self._rings[key] = ([p for p, _ in points], [s for _, s in points])
+        self._points, self._owners = self._rings[key]
+
+    def owner(self, coin_id: str) -> int:
+        i = bisect_right(self._points, _hash(coin_id))
+        return self._owners[i % len(self._owners)]
+
+
+def shard_mask(shard: Optional[Shard], coin_ids: Sequence[str]) -> List[bool]:
+    if shard is None or shard.count == 1:
+        return [True] * len(coin_ids)
+    ring = HashRing(shard.count)
+    return [bool(c) and ring.owner(c) == shard.index for c in coin_ids]
+
+
+def shard_path(path: str, shard: Optional[Shard]) -> str:
+    """``data/x.ndjson`` -> ``data/x.shard-2-of-4.ndjson``; unchanged without a shard."""
+    if shard is None or not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{shard.suffix}{ext}"
+
+
+def merge_shards(count: int, results_path: str = RESULTS_FILE, summary_path: str = RUN_SUMMARY_FILE,
+                 snapshot_path: str = DASHBOARD_SNAPSHOT_FILE) -> dict:
+    """Combine the outputs of shards 1..count into the unsharded results, run summary and dashboard snapshot."""
+    rows: List[dict] = []
+    summaries: List[dict] = []
+    missing = []
+    for index in range(1, count + 1):
+        shard = Shard(index, count)
+        path = shard_path(results_path, shard)
+        if not os.path.exists(path):
+            missing.append(str(shard))
+            continue
+        rows.extend(read_results(path))
+        summary = read_run_summary(shard_path(summary_path, shard))
+        if summary:
+            summaries.append(summary)
+    if missing:
+        logging.warning("Merging without shard outputs for %s", ", ".join(missing))
+
+    rows.sort(key=_sort_key, reverse=True)  # signals order: ai_score desc nulls last, coin_id desc
+    write_results(rows, results_path)
+    save_snapshot_rows(rows[:SNAPSHOT_ROWS], snapshot_path)
+
+    rejections: Dict[str, int] = {}
+    for s in summaries:
+        for rule, n in (s.get("tier1_rejections") or {}).items():
+            rejections[rule] = rejections.get(rule, 0) + n
+    merged = {
+        "started_at": min((s["started_at"] for s in summaries if s.get("started_at")), default=None),
+        "duration_sec": max((s.get("duration_sec") or 0 for s in summaries), default=0),
+        "tier1": sum(s.get("tier1") or 0 for s in summaries),
+        "tier1_rejections": rejections,
+        "tier2": len(rows),
+        "alerts": sum(s.get("alerts") or 0 for s in summaries),
+        "shards": count,
+        "missing_shards": missing,
+    }
+    write_run_summary(merged, summary_path)
+    logging.info("Merged %d shards: %d rows (missing: %s)", count - len(missing), len(rows), missing or "none")
+    return merged
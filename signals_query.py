@@ -0,0 +1,141 @@
+# signals_query.py
+"""
+Filtering, keyset pagination and column projection for the signals API.
+Rows are ordered by (ai_score desc nulls last, coin_id desc); the cursor is the last row's
+(ai_score, coin_id). Filters are pushed down to PostgREST when Supabase is the source and
+applied in Python over the local results otherwise.
+
+SIGNAL_FIELDS are the columns both scanner tiers write to the signals table; alert links are
+built at send time and never stored, so they can't be selected.
+"""
+import json
+import math
+import base64
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+SIGNAL_FIELDS = (
+    "ticker", "coin_id", "name", "time", "price", "market_cap", "volume_24h", "price_change_pct_24h",
+    "rsi", "ema5", "ema13", "ema50", "vwap", "atr", "rvol", "volume", "ai_score", "ai_reason",
+    "risk", "tier",
+)
+KEY_FIELDS = ("ai_score", "coin_id")
+MAX_LIMIT = 500
+
+
+class QueryError(ValueError):
+    """Bad client input (unknown field, malformed cursor)."""
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in SIGNAL_FIELDS]
+    if unknown:
+        raise QueryError(f"unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def encode_cursor(row: dict) -> str:
+    raw = json.dumps([row.get("ai_score"), row.get("coin_id")]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[Optional[float], str]]:
+    if not cursor:
+        return None
+    try:
+        score, coin_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        score = float(score) if score is not None else None
+    except Exception:
+        raise QueryError("malformed cursor")
+    if score is not None and not math.isfinite(score):
+        raise QueryError("malformed cursor")
+    return score, str(coin_id)
+
+
+def _quote(value: str) -> str:
+    """A PostgREST filter value in double quotes, so commas, dots and parens can't change the filter."""
+    return '"%s"' % value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _sort_key(row: dict):
+    score = row.get("ai_score")
+    return (score is not None, score if score is not None else 0.0, str(row.get("coin_id") or ""))
+
+
+def _project(row: dict, fields: Optional[List[str]]) -> dict:
+    if not fields:
+        return row
+    return {f: row.get(f) for f in fields}
+
+
+def _in_range(value, lo, hi) -> bool:
+    if lo is None and hi is None:
+        return True
+    if value is None:
+        return False
+    return (lo is None or value >= lo) and (hi is None or value <= hi)
+
+
+def query_rows(rows: List[dict], *, tier=None, min_score=None, rsi_min=None, rsi_max=None, rvol_min=None,
+               cursor=None, limit: int = 50, fields=None) -> Dict[str, Any]:
+    """Apply filters, keyset pagination and projection to an in-memory row list."""
+    after = decode_cursor(cursor)
+    matched = [
+        r for r in rows
+        if (tier is None or r.get("tier") == tier)
+        and _in_range(r.get("ai_score"), min_score, None)
+        and _in_range(r.get("rsi"), rsi_min, rsi_max)
+        and _in_range(r.get("rvol"), rvol_min, None)
+    ]
+    matched.sort(key=_sort_key, reverse=True)
+    if after is not None:
+        bound = _sort_key({"ai_score": after[0], "coin_id": after[1]})
+        matched = [r for r in matched if _sort_key(r) < bound]
+    page = matched[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(matched) > limit else None
+    return {"data": [_project(r, fields) for r in page], "next_cursor": next_cursor}
+
+
+def query_supabase(client, table: str, *, tier=None, min_score=None, rsi_min=None, rsi_max=None, rvol_min=None,
+                   cursor=None, limit: int = 50, fields=None) -> Dict[str, Any]:
+    """Same contract as query_rows, with filters, ordering and the keyset bound run by PostgREST."""
+    after = decode_cursor(cursor)
+    columns = list(dict.fromkeys(list(fields) + list(KEY_FIELDS))) if fields else ["*"]
+    q = client.table(table).select(",".join(columns))
+    if tier is not None:
+        q = q.eq("tier", tier)
+    if min_score is not None:
+        q = q.gte("ai_score", min_score)
+    if rsi_min is not None:
+        q = q.gte("rsi", rsi_min)
+    if rsi_max is not None:
+        q = q.lte("rsi", rsi_max)
+    if rvol_min is not None:
+        q = q.gte("rvol", rvol_min)
+    if after is not None:
+        score, coin_id = after[0], _quote(after[1])
+        if score is None:
+            q = q.or_(f"and(ai_score.is.null,coin_id.lt.{coin_id})")
+        else:
+            q = q.or_(f"ai_score.lt.{score},ai_score.is.null,and(ai_score.eq.{score},coin_id.lt.{coin_id})")
+    q = q.order("ai_score", desc=True, nullsfirst=False).order("coin_id", desc=True)
+    res = q.limit(limit + 1).execute()
+    data = (res.data if hasattr(res, "data") else res) or []
+    page = data[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(data) > limit else None
+    return {"data": [_project(r, fields) for r in page], "next_cursor": next_cursor}
+
+
+def query_signals(client, table: str, local_rows, **params) -> Dict[str, Any]:
+    """Query Supabase when configured, falling back to ``local_rows()`` if it is missing or fails."""
+    if client:
+        try:
+            return query_supabase(client, table, **params)
+        except QueryError:
+            raise
+        except Exception:
+            logging.exception("Supabase signals query failed; using local results")
+    return query_rows(local_rows(), **params)
@@ -0,0 +1,189 @@
+# snapshot_cache.py
+import os
+import gzip
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+from instrumentation import inc
+from config import (
+    RESULTS_FILE, RESULTS_VERSION_FILE, DASHBOARD_CACHE_TTL, DASHBOARD_STALE_TTL, DASHBOARD_CACHE_MAX_ENTRIES,
+)
+
+
+class Snapshot:
+    """A prebuilt response body with precompressed variants and an ETag."""
+
+    __slots__ = ("body", "gzip", "br", "etag", "media_type", "data", "built_at")
+
+    def __init__(self, body: bytes, media_type: str, data: Any = None):
+        self.body = body
+        self.gzip = gzip.compress(body, compresslevel=6)
+        self.br = brotli.compress(body) if brotli else None
+        self.etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.media_type = media_type
+        self.data = data
+        self.built_at = time.time()
+
+    def matches(self, if_none_match: str) -> bool:
+        """If-None-Match check: a comma-separated list of tags, compared weakly (W/ ignored); * matches."""
+        for tag in (if_none_match or "").split(","):
+            tag = tag.strip()
+            if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == self.etag:
+                return True
+        return False
+
+    def encoded(self, accept_encoding: str):
+        """Return (payload, content_encoding or None) for the client's Accept-Encoding."""
+        accept = (accept_encoding or "").lower()
+        if self.br is not None and "br" in accept:
+            return self.br, "br"
+        if "gzip" in accept:
+            return self.gzip, "gzip"
+        return self.body, None
+
+
+def results_version() -> tuple:
+    """Cheap change token: mtimes of the local results files and the scanners' version marker."""
+    stamp = []
+    for path in (RESULTS_FILE, RESULTS_VERSION_FILE):
+        try:
+            stamp.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def mark_results_updated():
+    """Called by the scanners after writing results so dashboard caches rebuild on next hit."""
+    try:
+        os.makedirs(os.path.dirname(RESULTS_VERSION_FILE) or ".", exist_ok=True)
+        with open(RESULTS_VERSION_FILE, "w") as f:
+            f.write(str(time.time()))
+    except OSError:
+        logging.warning("Could not update %s", RESULTS_VERSION_FILE)
+
+
+class _Entry:
+    __slots__ = ("value", "loaded_at", "version", "refreshing")
+
+    def __init__(self, value, loaded_at, version):
+        self.value = value
+        self.loaded_at = loaded_at
+        self.version = version
+        self.refreshing = False
+
+
+class TTLCache:
+    """
+    Per-key cache with stale-while-revalidate. Entries younger than ``ttl`` are served as-is;
+    entries up to ``ttl + stale_ttl`` old are served while one background thread reloads them.
+    A change in ``version()`` (new scanner results) or invalidate() forces a synchronous reload.
+    Concurrent misses on one key share a single load. At most ``max_entries`` keys are kept;
+    the least recently used one is evicted along with its lock.
+    """
+
+    def __init__(self, ttl: float = DASHBOARD_CACHE_TTL, stale_ttl: float = DASHBOARD_STALE_TTL,
+                 version: Callable[[], Any] = results_version, clock=time.monotonic, name: str = "dashboard",
+                 max_entries: int = DASHBOARD_CACHE_MAX_ENTRIES):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max(1, max_entries)
+        self._version = version
+        self._clock = clock
+        self._entries: "OrderedDict[Any, _Entry]" = OrderedDict()
+        self._locks: Dict[Any, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key, loader: Callable[[], Any]):
+        version = self._version()
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            age = self._clock() - entry.loaded_at
+            if age < self.ttl:
+                self._touch(key)
+                self.hits += 1
+                inc("scanner_cache_requests_total", cache=self.name, result="hit")
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self._touch(key)
+                self.hits += 1
+                inc("scanner_cache_requests_total", cache=self.name, result="stale")
+                self._refresh_in_background(key, entry, loader)
+                return entry.value
+        self.misses += 1
+        inc("scanner_cache_requests_total", cache=self.name, result="miss")
+        try:
+            with self._key_lock(key):
+                entry = self._entries.get(key)
+                if entry is not None and entry.version == version and self._clock() - entry.loaded_at < self.ttl:
+                    return entry.value
+                return self._load(key, loader, version)
+        finally:
+            self._drop_orphan_lock(key)
+
+    def _touch(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def _load(self, key, loader, version):
+        value = loader()
+        with self._lock:
+            self._entries[key] = _Entry(value, self._clock(), version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._locks.pop(evicted, None)
+        return value
+
+    def _drop_orphan_lock(self, key):
+        """Forget the lock of a key whose load failed or was evicted, unless someone is waiting on it."""
+        with self._lock:
+            lock = self._locks.get(key)
+            if key not in self._entries and lock is not None and not lock.locked():
+                del self._locks[key]
+
+    def _refresh_in_background(self, key, entry: _Entry, loader):
+        with self._lock:
+            if entry.refreshing:
+                return
+            entry.refreshing = True
+
+        def run():
+            try:
+                with self._key_lock(key):
+                    self._load(key, loader, self._version())
+            except Exception:
+                logging.exception("Background refresh of %r failed; keeping stale value", key)
+                entry.refreshing = False
+
+        threading.Thread(target=run, name=f"refresh-{key}", daemon=True).start()
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._locks.clear()
+            else:
+                self._entries.pop(key, None)
+                self._locks.pop(key, None)
+
+    def peek(self, key) -> Optional[Any]:
+        entry = self._entries.get(key)
+        return entry.value if entry else None
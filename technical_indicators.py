@@ -1,14 +1,23 @@
 # technical_indicators.py
+import os
+import json
+import logging
 import pandas as pd
 import numpy as np
 
-def compute_metrics(df: pd.DataFrame) -> dict:
+from config import INTERVAL_SEC
+
+def compute_metrics(df: pd.DataFrame, timeframes=None, primary: str = None) -> dict:
     """
     Input: df with columns ['close','high','low','volume'] indexed by timestamp.
     Output: dictionary {rsi, ema5, ema13, ema50, vwap, atr, rvol, volume}
+    With ``timeframes`` (e.g. ["15m", "1h", "4h"]) also {"tf": {timeframe: metrics}}, downsampled
+    from df; the top-level fields then come from the ``primary`` timeframe if given.
     """
     if df is None or df.empty:
         return {}
+    if timeframes:
+        return _multi_timeframe_metrics(df, timeframes, primary)
 
     close = df["close"].astype(float)
     high = df.get("high", close).astype(float)
@@ -62,3 +71,452 @@ def compute_metrics(df: pd.DataFrame) -> dict:
         "volume": float(volume.iloc[-1]) if len(volume) > 0 else None,
     }
     return metrics
+
+
+def indicator_series(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Walk-forward compute_metrics: row t holds the metrics compute_metrics would return for
+    df.iloc[:t + 1], computed for every t in one vectorized pass (used by the backtester).
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=["rsi", "ema5", "ema13", "ema50", "vwap", "atr", "rvol", "volume"])
+
+    close = df["close"].astype(float)
+    high = df.get("high", close).astype(float)
+    low = df.get("low", close).astype(float)
+    volume = df.get("volume", pd.Series([0] * len(df), index=df.index)).astype(float)
+
+    delta = close.diff()
+    roll_up = delta.clip(lower=0).ewm(alpha=1/14, adjust=False).mean()
+    roll_down = (-delta.clip(upper=0)).ewm(alpha=1/14, adjust=False).mean()
+    rsi = 100 - (100 / (1 + roll_up / (roll_down + 1e-9)))
+
+    typical_price = (high + low + close) / 3.0
+    vwap = (typical_price * volume).cumsum() / (volume.cumsum() + 1e-9)
+
+    # ATR/RVOL windows fall back to the expanding mean until 14 candles exist, as in compute_metrics
+    tr = pd.concat([high - low, (high - close.shift()).abs(), (low - close.shift()).abs()], axis=1).max(axis=1)
+    atr = tr.rolling(14).mean().fillna(tr.expanding().mean())
+    avg_vol = volume.expanding().mean()
+    recent_vol = volume.rolling(14).mean().fillna(avg_vol)
+    rvol = (recent_vol / (avg_vol + 1e-9)).where(avg_vol > 0, 0.0)
+
+    return pd.DataFrame({
+        "rsi": rsi,
+        "ema5": close.ewm(span=5, adjust=False).mean(),
+        "ema13": close.ewm(span=13, adjust=False).mean(),
+        "ema50": close.ewm(span=50, adjust=False).mean(),
+        "vwap": vwap,
+        "atr": atr,
+        "rvol": rvol,
+        "volume": volume,
+    })
+
+
+def panel_from_frames(frames: dict):
+    """
+    Stack per-coin OHLCV frames into right-aligned (coins x candles) arrays, NaN-padded on the
+    left for shorter histories, so column -1 is every coin's latest candle.
+    Returns (coin_ids, close, high, low, volume).
+    """
+    ids = list(frames)
+    width = max((len(df) for df in frames.values()), default=0)
+    panels = {c: np.full((len(ids), width), np.nan) for c in ("close", "high", "low", "volume")}
+    for i, coin_id in enumerate(ids):
+        df = frames[coin_id]
+        n = len(df)
+        if not n:
+            continue
+        close = df["close"].to_numpy(dtype=float)
+        panels["close"][i, width - n:] = close
+        panels["high"][i, width - n:] = df["high"].to_numpy(dtype=float) if "high" in df else close
+        panels["low"][i, width - n:] = df["low"].to_numpy(dtype=float) if "low" in df else close
+        panels["volume"][i, width - n:] = df["volume"].to_numpy(dtype=float) if "volume" in df else 0.0
+    return ids, panels["close"], panels["high"], panels["low"], panels["volume"]
+
+
+def _tail_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the last ``window`` non-NaN columns per row (all of them if fewer)."""
+    tail = values[:, -window:]
+    count = (~np.isnan(tail)).sum(axis=1)
+    total = np.nansum(tail, axis=1)
+    return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def compute_metrics_batch(close, high=None, low=None, volume=None, index=None) -> pd.DataFrame:
+    """
+    Vectorized compute_metrics over a (coins x candles) panel, e.g. from panel_from_frames.
+    Histories must be right-aligned with NaN padding on the left. Every indicator is one
+    whole-panel operation, so adding rows (coins, timeframes) costs far less than another call.
+    Output: DataFrame with one row per coin and the same columns as compute_metrics.
+    """
+    close = np.atleast_2d(np.asarray(close, dtype=float))
+    high = close if high is None else np.atleast_2d(np.asarray(high, dtype=float))
+    low = close if low is None else np.atleast_2d(np.asarray(low, dtype=float))
+    valid = ~np.isnan(close)
+    volume = np.zeros_like(close) if volume is None else np.atleast_2d(np.asarray(volume, dtype=float))
+    volume = np.where(valid, volume, np.nan)
+    n_coins, n_candles = close.shape
+
+    # EMA5/13/50 and Wilder RSI14 as column-wise ewm over the (candles x coins) transpose: one C
+    # pass per indicator for every coin; leading NaN padding is skipped like ewm(adjust=False) does
+    frame = pd.DataFrame(close.T)
+    ema = np.stack([frame.ewm(span=span, adjust=False).mean().to_numpy()[-1] if n_candles else np.full(n_coins, np.nan)
+                    for span in (5, 13, 50)])
+    delta = frame.diff()
+    roll_up = delta.clip(lower=0).ewm(alpha=1/14, adjust=False).mean().to_numpy()
+    roll_down = (-delta.clip(upper=0)).ewm(alpha=1/14, adjust=False).mean().to_numpy()
+    rs = (roll_up / (roll_down + 1e-9))[-1] if n_candles else np.full(n_coins, np.nan)
+    rsi = 100 - (100 / (1 + rs))
+    prev_close = np.hstack([np.full((n_coins, 1), np.nan), close[:, :-1]])
+
+    # VWAP over the full history
+    typical = (high + low + close) / 3.0
+    vwap = np.nansum(typical * volume, axis=1) / (np.nansum(volume, axis=1) + 1e-9)
+    vwap = np.where(valid.any(axis=1), vwap, np.nan)
+
+    # ATR14: rolling mean of the last 14 true ranges, or the mean of all of them if fewer
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    tr = np.where(valid, tr, np.nan)
+    atr = _tail_mean(tr, 14)
+
+    # RVOL: last-14 average volume vs full-history average
+    avg_vol = _tail_mean(volume, n_candles)
+    recent_vol = _tail_mean(volume, 14)
+    rvol = np.where(avg_vol > 0, recent_vol / (avg_vol + 1e-9), 0.0)
+    rvol = np.where(valid.any(axis=1), rvol, np.nan)
+
+    return pd.DataFrame(
+        {
+            "rsi": rsi,
+            "ema5": ema[0],
+            "ema13": ema[1],
+            "ema50": ema[2],
+            "vwap": vwap,
+            "atr": atr,
+            "rvol": rvol,
+            "volume": volume[:, -1] if n_candles else np.full(n_coins, np.nan),
+        },
+        index=index,
+    )
+
+
+def _epoch_seconds(index: pd.DatetimeIndex) -> np.ndarray:
+    return index.values.astype("datetime64[s]").astype(np.int64)
+
+
+def downsample(df: pd.DataFrame, step: int) -> pd.DataFrame:
+    """
+    Aggregate OHLCV bars into ``step``-second bars (first open, max high, min low, last close,
+    last volume: volumes are rolling 24h totals, as in the candle store). Index = bar open time.
+    """
+    bucket = _epoch_seconds(df.index) // step
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(df)] - 1
+    close = df["close"].to_numpy(dtype=float)
+    out = {
+        "open": df["open"].to_numpy(dtype=float)[starts] if "open" in df else close[starts],
+        "high": np.fmax.reduceat(df["high"].to_numpy(dtype=float) if "high" in df else close, starts),
+        "low": np.fmin.reduceat(df["low"].to_numpy(dtype=float) if "low" in df else close, starts),
+        "close": close[ends],
+    }
+    if "volume" in df:
+        out["volume"] = df["volume"].to_numpy(dtype=float)[ends]
+    return pd.DataFrame(out, index=pd.to_datetime(bucket[starts] * step, unit="s"))
+
+
+def regular_bars(df: pd.DataFrame):
+    """
+    (bars, step): df at its real bar size, the known interval nearest the typical (median) gap
+    between bars. Bars finer than that, e.g. a few 15m bars after a run of hourly ones, are
+    merged up to it so indicators never run over unevenly spaced bars. step is 0 for fewer than two bars.
+    """
+    diffs = np.diff(_epoch_seconds(df.index))
+    if not len(diffs):
+        return df, 0
+    median = max(float(np.median(diffs)), 1.0)
+    step = min(INTERVAL_SEC.values(), key=lambda s: abs(np.log(s / median)))
+    if diffs.min() < step:
+        df = downsample(df, step)
+    return df, step
+
+
+def timeframe_frames(df: pd.DataFrame, timeframes) -> dict:
+    """
+    {timeframe: bars} for each timeframe at least as coarse as df's real spacing (see
+    regular_bars); finer ones are skipped. Each one is downsampled from the previous (finer)
+    result when the steps divide evenly, so the work shrinks with every step up instead of
+    rescanning the base series.
+    """
+    df, base_step = regular_bars(df)
+    frames = {}
+    source, source_step = df, base_step
+    for tf in sorted(timeframes, key=lambda t: INTERVAL_SEC[t]):
+        step = INTERVAL_SEC[tf]
+        if step < base_step:
+            logging.debug("Skipping %s metrics: bars are %ss apart", tf, base_step)
+            continue  # can't invent finer bars than were fetched
+        if step != source_step:
+            if source_step and step % source_step:
+                source, source_step = df, base_step
+            source, source_step = downsample(source, step), step
+        frames[tf] = source
+    return frames
+
+
+def htf_series(df: pd.DataFrame, step: int) -> pd.DataFrame:
+    """
+    Walk-forward ema5/ema13/rsi of the ``step``-second timeframe: row t holds what
+    compute_metrics reports for that timeframe given df.iloc[:t + 1], whose last coarse bar is
+    still forming (its close is close[t]). One pass over the finished coarse bars, then one
+    recurrence step per row, instead of downsampling every prefix.
+    """
+    close = df["close"].to_numpy(dtype=float)
+    if not len(close):
+        return pd.DataFrame({"ema5": [], "ema13": [], "rsi": []}, index=df.index)
+    bucket = _epoch_seconds(df.index) // step
+    new_bar = np.r_[True, bucket[1:] != bucket[:-1]]
+    k = np.cumsum(new_bar) - 1                                  # coarse bar of each row
+    finals = close[np.r_[np.flatnonzero(new_bar)[1:], len(close)] - 1]  # each coarse bar's last close
+    prev = np.maximum(k - 1, 0)
+
+    out = {}
+    for span in (5, 13):
+        alpha = 2 / (span + 1)
+        ema = pd.Series(finals).ewm(span=span, adjust=False).mean().to_numpy()
+        out[f"ema{span}"] = np.where(k > 0, ema[prev] * (1 - alpha) + alpha * close, close)
+
+    # Wilder averages of finished bar-to-bar moves, extended by the forming bar's move so far
+    delta = np.diff(finals)
+    smooth = lambda x: pd.Series(x).ewm(alpha=1/14, adjust=False).mean().to_numpy()
+    roll_up, roll_down = smooth(np.clip(delta, 0, None)), smooth(np.clip(-delta, 0, None))
+    move = close - finals[prev]
+    up, down = np.clip(move, 0, None), np.clip(-move, 0, None)
+    before = np.maximum(k - 2, 0)
+    with np.errstate(invalid="ignore"):
+        avg_up = np.where(k >= 2, roll_up[before] * 13 / 14 + up / 14, up) if len(delta) else up
+        avg_down = np.where(k >= 2, roll_down[before] * 13 / 14 + down / 14, down) if len(delta) else down
+        out["rsi"] = np.where(k > 0, 100 - (100 / (1 + avg_up / (avg_down + 1e-9))), np.nan)
+    return pd.DataFrame(out, index=df.index)
+
+
+def _clean(row: dict) -> dict:
+    return {k: (float(v) if v is not None and not pd.isna(v) else None) for k, v in row.items()}
+
+
+def _multi_timeframe_metrics(df: pd.DataFrame, timeframes, primary: str = None) -> dict:
+    """All timeframes (plus df itself when primary isn't one of them) in one compute_metrics_batch panel."""
+    df, _ = regular_bars(df)
+    frames = timeframe_frames(df, timeframes)
+    keyed = dict(frames)
+    if primary not in frames:
+        keyed[None] = df
+    ids, close, high, low, volume = panel_from_frames(keyed)
+    batch = compute_metrics_batch(close, high, low, volume, index=range(len(ids)))
+    rows = {key: _clean(batch.iloc[i].to_dict()) for i, key in enumerate(ids)}
+    metrics = dict(rows[primary if primary in frames else None])
+    metrics["tf"] = {tf: rows[tf] for tf in frames}
+    return metrics
+
+
+class IndicatorState:
+    """
+    Running indicator state for one coin: each update(candle) is O(1) and metrics() returns the
+    same dict compute_metrics would give for every candle fed so far. to_dict()/from_dict()
+    (and save_states/load_states) let the state survive between runs; TimeframeStates keeps one
+    per timeframe for the scanner.
+    """
+
+    WINDOW = 14
+    __slots__ = (
+        "n", "ema5", "ema13", "ema50", "prev_close", "roll_up", "roll_down",
+        "cum_pv", "cum_vol", "tr_ring", "vol_ring", "pos", "last_volume",
+    )
+
+    def __init__(self):
+        self.n = 0
+        self.ema5 = self.ema13 = self.ema50 = None
+        self.prev_close = None
+        self.roll_up = self.roll_down = None
+        self.cum_pv = 0.0
+        self.cum_vol = 0.0
+        self.tr_ring = []   # last WINDOW true ranges
+        self.vol_ring = []  # last WINDOW volumes
+        self.pos = 0
+        self.last_volume = None
+
+    def update(self, candle) -> "IndicatorState":
+        """Fold in one candle: a mapping with 'close' and optional 'high', 'low', 'volume'."""
+        close = float(candle["close"])
+        high = float(candle.get("high", close))
+        low = float(candle.get("low", close))
+        volume = float(candle.get("volume", 0.0) or 0.0)
+
+        if self.n == 0:
+            self.ema5 = self.ema13 = self.ema50 = close
+            tr = high - low
+        else:
+            self.ema5 += (2 / 6) * (close - self.ema5)
+            self.ema13 += (2 / 14) * (close - self.ema13)
+            self.ema50 += (2 / 51) * (close - self.ema50)
+            delta = close - self.prev_close
+            up, down = max(delta, 0.0), max(-delta, 0.0)
+            if self.roll_up is None:
+                self.roll_up, self.roll_down = up, down
+            else:
+                self.roll_up += (up - self.roll_up) / 14
+                self.roll_down += (down - self.roll_down) / 14
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+        self.cum_pv += (high + low + close) / 3.0 * volume
+        self.cum_vol += volume
+        if len(self.tr_ring) < self.WINDOW:
+            self.tr_ring.append(tr)
+            self.vol_ring.append(volume)
+        else:
+            self.tr_ring[self.pos] = tr
+            self.vol_ring[self.pos] = volume
+            self.pos = (self.pos + 1) % self.WINDOW
+        self.prev_close = close
+        self.last_volume = volume
+        self.n += 1
+        return self
+
+    def update_frame(self, df: pd.DataFrame) -> "IndicatorState":
+        for row in df.to_dict("records"):
+            self.update(row)
+        return self
+
+    def metrics(self) -> dict:
+        if self.n == 0:
+            return {}
+        rsi = None
+        if self.roll_up is not None:
+            rs = self.roll_up / (self.roll_down + 1e-9)
+            rsi = 100 - (100 / (1 + rs))
+        avg_vol = self.cum_vol / self.n
+        recent_vol = sum(self.vol_ring) / len(self.vol_ring)
+        return {
+            "rsi": rsi,
+            "ema5": self.ema5,
+            "ema13": self.ema13,
+            "ema50": self.ema50,
+            "vwap": self.cum_pv / (self.cum_vol + 1e-9),
+            "atr": sum(self.tr_ring) / len(self.tr_ring),
+            "rvol": (recent_vol / (avg_vol + 1e-9)) if avg_vol > 0 else 0,
+            "volume": self.last_volume,
+        }
+
+    def copy(self) -> "IndicatorState":
+        return IndicatorState.from_dict(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IndicatorState":
+        state = cls()
+        for k in cls.__slots__:
+            if k in data:
+                setattr(state, k, list(data[k]) if k in ("tr_ring", "vol_ring") else data[k])
+        return state
+
+
+class TimeframeStates:
+    """
+    One coin's IndicatorState per timeframe, kept warm between scans: update(df) folds in only the
+    bars that closed since the last call and returns what compute_metrics(df, timeframes, primary)
+    would, for every bar seen since the state started. The last bar of each timeframe is still
+    forming, so it is applied to a copy and never stored. The state starts over when the bar
+    size or the timeframes change, or when df doesn't cover the first unfed bar (e.g. the
+    candle store was wiped or restored from an older copy).
+    """
+
+    BASE = ""  # key for the regularized bars when primary isn't one of the timeframes
+
+    def __init__(self, timeframes=None, primary: str = None):
+        self.timeframes = sorted(timeframes or (), key=lambda t: INTERVAL_SEC[t])
+        self.primary = primary
+        self.step = 0
+        self.states = {}   # key -> IndicatorState over closed bars
+        self.fed = {}      # key -> open time (epoch s) of the last bar folded in
+
+    def _keys(self, base_step: int) -> dict:
+        keys = {tf: INTERVAL_SEC[tf] for tf in self.timeframes if INTERVAL_SEC[tf] >= base_step}
+        if self.primary not in keys:
+            keys[self.BASE] = base_step
+        return keys
+
+    def _reset(self, step: int):
+        self.step, self.states, self.fed = step, {}, {}
+
+    def update(self, df: pd.DataFrame) -> dict:
+        if df is None or df.empty:
+            return {}
+        bars, step = regular_bars(df)
+        if step != self.step:
+            self._reset(step)
+        keys = self._keys(step)
+        if self.states and set(self.states) != set(keys):
+            self._reset(step)
+        ts = _epoch_seconds(bars.index)
+        starts = [self.fed[k] + keys[k] for k in keys if k in self.fed]  # first unfed bar per timeframe
+        tail = bars
+        if starts and len(starts) == len(keys):
+            if ts[0] > min(starts) or ts[-1] < max(starts):
+                self._reset(step)  # a hole between what was fed and what df holds, or df went back in time
+            else:
+                tail = bars[ts >= min(starts)]
+
+        rows = {}
+        for key, key_step in keys.items():
+            frame = tail if key_step == step else downsample(tail, key_step)
+            state = self.states.setdefault(key, IndicatorState())
+            if len(frame):
+                opens = _epoch_seconds(frame.index)
+                closed = frame.iloc[:-1]
+                if key in self.fed:
+                    closed = closed[opens[:-1] > self.fed[key]]
+                if len(closed):
+                    state.update_frame(closed)
+                    self.fed[key] = int(_epoch_seconds(closed.index)[-1])
+                rows[key] = _clean(state.copy().update(frame.iloc[-1].to_dict()).metrics())
+            else:
+                rows[key] = _clean(state.metrics()) if state.n else {}
+        metrics = dict(rows[self.primary if self.primary in keys else self.BASE])
+        if self.timeframes:
+            metrics["tf"] = {tf: rows[tf] for tf in self.timeframes if tf in rows}
+        return metrics
+
+    def to_dict(self) -> dict:
+        return {"timeframes": self.timeframes, "primary": self.primary, "step": self.step, "fed": self.fed,
+                "states": {k: v.to_dict() for k, v in self.states.items()}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TimeframeStates":
+        out = cls(data.get("timeframes"), data.get("primary"))
+        out.step = data.get("step", 0)
+        out.fed = {k: int(v) for k, v in (data.get("fed") or {}).items()}
+        out.states = {k: IndicatorState.from_dict(v) for k, v in (data.get("states") or {}).items()}
+        return out
+
+
+def save_states(path: str, states: dict):
+    """Write {coin_id: IndicatorState or TimeframeStates} as JSON, atomically."""
+    tmp = f"{path}.tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(tmp, "w") as f:
+        json.dump({k: v.to_dict() for k, v in states.items()}, f)
+    os.replace(tmp, path)
+
+
+def load_states(path: str, cls=IndicatorState) -> dict:
+    """{coin_id: cls} from save_states; an unreadable file is logged and treated as empty."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return {k: cls.from_dict(v) for k, v in json.load(f).items()}
+    except (OSError, ValueError, TypeError, AttributeError, KeyError) as e:
+        logging.warning("Ignoring unreadable indicator state %s: %s", path, e)
+        return {}
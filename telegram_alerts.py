@@ -1,18 +1,33 @@
 import os
+import math
+import time
+import queue
+import logging
+import threading
+from typing import Dict, List, Optional
+
 import requests
 
+from services.ratelimit import TokenBucket
+from instrumentation import inc, timer
+
 BOT = os.getenv("TELEGRAM_BOT_TOKEN")
 CHAT_ID = os.getenv("TELEGRAM_CHANNEL_ID")
+TELEGRAM_API = os.getenv("TELEGRAM_API", "https://api.telegram.org")
+
+# Telegram allows ~30 msg/s per bot overall and ~20 msg/min into one group/channel
+GLOBAL_MSGS_PER_SEC = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+CHAT_MSGS_PER_SEC = float(os.getenv("TELEGRAM_CHAT_RATE", str(20 / 60)))
+QUEUE_SIZE = int(os.getenv("TELEGRAM_QUEUE_SIZE", "500"))
+DIGEST_THRESHOLD = int(os.getenv("TELEGRAM_DIGEST_THRESHOLD", "5"))  # queued alerts per chat before coalescing
+MAX_MESSAGE_CHARS = 4096
 
 def _fmt_price(x):
     if x is None: return "—"
     return f"${x:,.6f}" if x < 1 else f"${x:,.2f}"
 
-def send_telegram_alert(payload: dict):
-    """Format per your spec and send."""
-    if not (BOT and CHAT_ID):
-        return  # silently skip if Telegram not configured
-
+def format_alert(payload: dict) -> str:
+    """Format per your spec."""
     tkr = payload["symbol"]
     price = _fmt_price(payload.get("price"))
     chg = payload.get("change_pct", 0.0)
@@ -22,8 +37,10 @@ def send_telegram_alert(payload: dict):
     tp = _fmt_price(payload.get("risk", {}).get("take_profit"))
     pos = payload.get("risk", {}).get("position_size", "—")
 
-    sents = payload.get("sentiment", {})
-    sent_label = "Bullish" if sents.get("score", 0) >= 0.6 else ("Bearish" if sents.get("score", 0) <= 0.4 else "Neutral")
+    sents = payload.get("sentiment") or {}
+    sent_score = sents.get("score") or 0
+    sent_label = "Bullish" if sent_score >= 0.6 else ("Bearish" if sent_score <= 0.4 else "Neutral")
+    sent_sources = " + ".join(name.capitalize() for name in sents.get("detail", {})) or "Twitter + Reddit + News"
 
     links = payload.get("links", {})
     tv = links.get("tradingview", "")
@@ -32,14 +49,14 @@ def send_telegram_alert(payload: dict):
     reddit = (links.get("reddit") or [""])[0]
     tweet = (links.get("tweet") or [""])[0]
 
-    text = (
+    return (
 f"TELEGRAM ALERTS\n"
 f"🚨 New Signal: ${tkr}\n\n"
 f"📈 Price: {price} | Change: {chg:+.2f}%\n"
 f"📊 AI Score: {ai_score:.1f}/10 (High Confidence)\n"
 f"🧠 Reason: \"{reason}\"\n"
 f"📍 Risk: SL = {sl} | TP = {tp} | Position Size: {pos}\n"
-f"📡 Sentiment: {sent_label} (Twitter + Reddit + News)\n"
+f"📡 Sentiment: {sent_label} ({sent_sources})\n"
 f"📰 Catalyst: {catalyst or '—'}\n\n"
 f"🔗 [TradingView Chart]({tv})\n"
 f"🔗 [News Source]({news})\n"
@@ -47,8 +64,212 @@ f"🔗 [Reddit Thread]({reddit or news})\n"
 f"🔗 [Tweet]({tweet or news})\n"
     )
 
-    url = f"https://api.telegram.org/bot{BOT}/sendMessage"
-    resp = requests.post(url, json={"chat_id": CHAT_ID, "text": text, "parse_mode": "Markdown"}, timeout=20)
-    if not resp.ok:
-        # Best effort; don't crash the pipeline for Telegram issues
-        pass
+def format_digest(payloads: List[dict]) -> List[str]:
+    """One line per signal, split into as few messages as fit Telegram's length limit."""
+    header = f"🚨 {len(payloads)} new signals\n\n"
+    lines = []
+    for p in sorted(payloads, key=lambda p: p.get("ai_score", 0.0), reverse=True):
+        lines.append(
+            f"• ${p['symbol']} {_fmt_price(p.get('price'))} ({p.get('change_pct', 0.0):+.2f}%) "
+            f"| AI {p.get('ai_score', 0.0):.1f}/10 | {p.get('ai_reason', '')}\n"
+        )
+    messages, current = [], header
+    for line in lines:
+        if len(current) + len(line) > MAX_MESSAGE_CHARS:
+            messages.append(current)
+            current = ""
+        current += line
+    messages.append(current)
+    return messages
+
+_session: Optional[requests.Session] = None
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+def send_telegram_alert(payload: dict):
+    """Format per your spec and send synchronously. Prefer get_dispatcher().submit() inside scan loops."""
+    if not (BOT and CHAT_ID):
+        return  # silently skip if Telegram not configured
+    url = f"{TELEGRAM_API}/bot{BOT}/sendMessage"
+    try:
+        resp = _get_session().post(url, json={"chat_id": CHAT_ID, "text": format_alert(payload), "parse_mode": "Markdown"}, timeout=20)
+        if not resp.ok:
+            # Best effort; don't crash the pipeline for Telegram issues
+            logging.warning("Telegram send failed: %s %s", resp.status_code, resp.text[:200])
+    except requests.RequestException as e:
+        logging.warning("Telegram send failed: %s", e)
+
+
+def _retry_after(resp) -> float:
+    """Seconds Telegram asks us to wait after a 429; 1 if the body doesn't say."""
+    try:
+        body = resp.json()
+    except ValueError:
+        return 1.0
+    params = body.get("parameters") if isinstance(body, dict) else None
+    value = params.get("retry_after") if isinstance(params, dict) else None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return 1.0
+    return seconds if math.isfinite(seconds) and seconds >= 0 else 1.0
+
+
+class TelegramDispatcher:
+    """
+    Background alert sender. submit() never blocks: alerts go on a bounded queue (and are
+    dropped with a warning when it is full) and one worker thread sends them over a pooled
+    session, within a global and a per-chat rate limit. When DIGEST_THRESHOLD or more alerts
+    for one chat are waiting, they are coalesced into digest messages. 429 responses are
+    retried after Telegram's ``retry_after``.
+    """
+
+    _STOP = object()
+
+    def __init__(self, bot: Optional[str] = BOT, chat_id: Optional[str] = CHAT_ID, api: str = TELEGRAM_API,
+                 queue_size: int = QUEUE_SIZE, digest_threshold: int = DIGEST_THRESHOLD,
+                 global_rate: float = GLOBAL_MSGS_PER_SEC, chat_rate: float = CHAT_MSGS_PER_SEC,
+                 max_retries: int = 3, session: Optional[requests.Session] = None):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.url = f"{api}/bot{bot}/sendMessage"
+        self.digest_threshold = max(digest_threshold, 2)
+        self.max_retries = max_retries
+        self.session = session or requests.Session()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._global = TokenBucket(global_rate, capacity=global_rate)
+        self._chat_rate = chat_rate
+        self._chats: Dict[str, TokenBucket] = {}
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="telegram-dispatcher", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.bot and self.chat_id)
+
+    def submit(self, payload: dict, chat_id: Optional[str] = None) -> bool:
+        if not self.enabled:
+            return False
+        try:
+            self._queue.put_nowait((chat_id or self.chat_id, payload))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logging.warning("Telegram queue full; dropping alert for %s", payload.get("symbol"))
+            return False
+
+    def flush(self):
+        """Block until everything submitted so far has been sent (or given up on)."""
+        self._queue.join()
+
+    def close(self, timeout: Optional[float] = 60):
+        """Send everything still queued, then stop the worker."""
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            stop = False
+            while True:  # drain whatever is already waiting so bursts can be coalesced
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is self._STOP:
+                    stop = True
+                    break
+                batch.append(nxt)
+            try:
+                self._deliver(batch)
+            except Exception:
+                logging.exception("Telegram dispatch failed")
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _deliver(self, batch):
+        by_chat: Dict[str, List[dict]] = {}
+        for chat_id, payload in batch:
+            by_chat.setdefault(chat_id, []).append(payload)
+        for chat_id, payloads in by_chat.items():
+            if len(payloads) >= self.digest_threshold:
+                good = [p for p in payloads if self._format(lambda p: format_digest([p]), p) is not None]
+                texts = format_digest(good) if good else []
+            else:
+                texts = [t for t in (self._format(format_alert, p) for p in payloads) if t is not None]
+            for text in texts:
+                try:
+                    self._send(chat_id, text)
+                except Exception:
+                    self.failed += 1
+                    logging.exception("Telegram send to %s failed", chat_id)
+
+    def _format(self, fmt, payload):
+        """``fmt(payload)``, or None for a payload it can't format; that alert is counted as failed and skipped."""
+        try:
+            return fmt(payload)
+        except Exception:
+            self.failed += 1
+            logging.exception("Skipping malformed Telegram alert: %.200r", payload)
+            return None
+
+    def _chat_limiter(self, chat_id: str) -> TokenBucket:
+        if chat_id not in self._chats:
+            self._chats[chat_id] = TokenBucket(self._chat_rate, capacity=1)
+        return self._chats[chat_id]
+
+    def _send(self, chat_id: str, text: str):
+        chat_limiter = self._chat_limiter(chat_id)
+        for attempt in range(self.max_retries + 1):
+            chat_limiter.acquire()
+            self._global.acquire()
+            try:
+                with timer("scanner_stage_seconds", stage="telegram_send"):
+                    resp = self.session.post(self.url, json={"chat_id": chat_id, "text": text, "parse_mode": "Markdown"}, timeout=20)
+            except requests.RequestException as e:
+                inc("scanner_http_retries_total", endpoint="telegram/sendMessage", reason="connection")
+                logging.warning("Telegram send failed (%s); attempt %d", e, attempt + 1)
+                if attempt < self.max_retries:
+                    time.sleep(min(2 ** attempt, 30))
+                continue
+            if resp.ok:
+                self.sent += 1
+                return
+            if resp.status_code == 429:
+                inc("scanner_http_429_total", endpoint="telegram/sendMessage")
+                retry_after = _retry_after(resp)
+                logging.warning("Telegram rate limited; retrying in %ss", retry_after)
+                chat_limiter.pause(retry_after)
+                continue
+            logging.warning("Telegram send failed: %s %s", resp.status_code, resp.text[:200])
+            break
+        self.failed += 1
+
+
+_dispatcher: Optional[TelegramDispatcher] = None
+
+def get_dispatcher() -> TelegramDispatcher:
+    """Process-wide dispatcher, started on first use."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = TelegramDispatcher()
+    return _dispatcher
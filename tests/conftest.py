@@ -0,0 +1,20 @@
+# tests/conftest.py
+"""
+Every test runs offline: config is read at import time, so local state is pointed at a scratch
+DATA_DIR and the external services are unconfigured before any scanner module is imported.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="scanner-tests-")
+os.environ["COINGECKO_CALLS_PER_MIN"] = "0"  # no client-side rate limit against local stubs
+os.environ["SENTIMENT_SOURCES"] = ""
+for _key in ("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", "SUPABASE_ANON_KEY", "TELEGRAM_BOT_TOKEN",
+             "TELEGRAM_CHANNEL_ID", "COINGECKO_API", "TELEGRAM_API", "SCORING_MODEL", "TIER1_EXTRA_RULES",
+             "CANDLE_STORE_DIR", "RESULTS_FILE", "RUN_SUMMARY_FILE", "SCAN_LOCK_FILE", "DEDUPE_DB",
+             "INDICATOR_STATE_FILE", "CATALYST_FEED_FILE", "METRIC_TIMEFRAMES", "PRIMARY_TIMEFRAME", "CANDLE_INTERVAL"):
+    os.environ.pop(_key, None)
@@ -0,0 +1,76 @@
+# tests/test_broadcaster.py
+import json
+import asyncio
+import threading
+
+from broadcaster import RESYNC, Broadcaster
+
+CLIENTS = 500
+
+
+def _rows(version: int, n: int = 20):
+    return [{"coin_id": f"c{i}", "ai_score": float(i == 0 and version)} for i in range(n)]
+
+
+def _events(frames):
+    return [json.loads(f.split("data: ", 1)[1]) for f in frames if f.startswith("event: signals")]
+
+
+def test_diff_sends_only_changes():
+    b = Broadcaster()
+    assert len(b.diff(_rows(0))["upsert"]) == 20
+    assert b.diff(_rows(0)) == {"upsert": [], "remove": []}
+    changes = b.diff(_rows(1)[:-1])
+    assert [u["coin_id"] for u in changes["upsert"]] == ["c0"] and changes["remove"] == ["c19"]
+
+
+def test_fans_out_to_hundreds_of_clients_and_resyncs_a_stalled_one():
+    async def scenario():
+        b = Broadcaster(queue_size=4, render=lambda r: f"<tr>{r['coin_id']}</tr>")
+        b.bind(asyncio.get_running_loop())
+        disconnected = asyncio.Event()
+
+        async def is_disconnected():
+            return disconnected.is_set()
+
+        async def client(n_frames):
+            frames = []
+            gen = b.stream(b.subscribe(), is_disconnected, heartbeat=5)  # no pings mid-test, even on a loaded box
+            async for frame in gen:
+                frames.append(frame)
+                if len(frames) == n_frames:
+                    break
+            await gen.aclose()
+            return frames
+
+        readers = [asyncio.ensure_future(client(1 + 3)) for _ in range(CLIENTS)]  # retry + three updates
+        stalled = b.subscribe()  # never reads
+        await asyncio.sleep(0)
+        assert b.subscriber_count == CLIENTS + 1
+
+        for version in range(3):  # published from a worker thread, as the scanner does
+            t = threading.Thread(target=b.publish, args=(_rows(version),))
+            t.start()
+            t.join()
+            await asyncio.sleep(0.01)
+        results = await asyncio.wait_for(asyncio.gather(*readers), timeout=10)
+
+        for version in range(10, 20):  # keep publishing: the stalled queue overflows
+            b.publish(_rows(version))
+            await asyncio.sleep(0)
+        return b, results, stalled
+
+    b, results, stalled = asyncio.run(scenario())
+    first = results[0]
+    assert first[0].startswith("retry:")
+    assert all(r == first for r in results)  # every client saw the same pre-encoded events
+    events = _events(first)
+    assert len(events[0]["upsert"]) == 20 and events[0]["upsert"][0]["html"] == "<tr>c0</tr>"
+    assert all(len(e["upsert"]) == 1 for e in events[1:])
+
+    backlog = []
+    while not stalled.queue.empty():
+        backlog.append(stalled.queue.get_nowait())
+    assert RESYNC in backlog and stalled.dropped > 0
+    assert len(backlog) <= b.queue_size
+    assert b.subscriber_count == 1  # finished streams unsubscribe themselves
@@ -0,0 +1,78 @@
+# tests/test_candle_store.py
+import numpy as np
+import pytest
+
+from benchmarks.stub_server import start_stub
+from services import providers
+from services.candle_store import LEGACY_DTYPE, CandleStore, resample, to_candles
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server, state, url = start_stub()
+    monkeypatch.setattr(providers, "COINGECKO_API", url)
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CandleStore(str(tmp_path), step=3600)
+
+
+def test_cold_start_fetches_the_full_window_and_saves_it(stub, store):
+    df = providers.get_ohlcv_coin_gecko("bitcoin", days=7, store=store)
+    assert any(p.endswith("/market_chart") for p in stub.requests)
+    saved = store.load("bitcoin")
+    assert len(saved) == len(df) >= 7 * 24
+    assert np.all(np.diff(saved["ts"]) == 3600)
+
+
+def test_fresh_store_is_served_without_requests(stub, store):
+    providers.get_ohlcv_coin_gecko("bitcoin", days=7, store=store)
+    stub.requests.clear()
+    df = providers.get_ohlcv_coin_gecko("bitcoin", days=7, store=store, fresh_sec=3600)
+    assert stub.requests == [] and len(df) == len(store.load("bitcoin"))
+
+
+def test_warm_start_only_fetches_the_tail(stub, store):
+    providers.get_ohlcv_coin_gecko("bitcoin", days=7, store=store)
+    before = store.load("bitcoin")
+    stub.requests.clear()
+    providers.get_ohlcv_coin_gecko("bitcoin", days=7, store=store, fresh_sec=0)
+    assert [p.rsplit("/", 2)[-2:] for p in stub.requests] == [["market_chart", "range"]]
+    after = store.load("bitcoin")
+    assert np.all(np.diff(after["ts"]) > 0)
+    np.testing.assert_array_equal(after[:len(before) - 1], before[:-1])  # finished bars are kept as stored
+
+
+def test_corrupt_file_is_dropped_and_refetched(stub, store):
+    with open(store.path("bitcoin"), "wb") as f:
+        f.write(b"not a numpy file")
+    assert store.load("bitcoin") is None
+    providers.get_ohlcv_coin_gecko("bitcoin", days=7, store=store)
+    assert any(p.endswith("/market_chart") for p in stub.requests)
+    assert store.load("bitcoin") is not None
+
+
+def test_unsorted_file_counts_as_corrupt(store):
+    rows = to_candles([200, 100], [1.0, 2.0], [0.0, 0.0])
+    np.save(store.path("x"), rows)
+    assert store.load("x") is None
+
+
+def test_legacy_close_only_files_still_load(store):
+    legacy = np.array([(0, 1.0, 5.0), (3600, 2.0, 6.0)], dtype=LEGACY_DTYPE)
+    np.save(store.path("old"), legacy)
+    arr = store.load("old")
+    assert list(arr["close"]) == [1.0, 2.0] and list(arr["high"]) == [1.0, 2.0]
+
+
+def test_merge_extends_the_open_bar_and_trims(tmp_path):
+    store = CandleStore(str(tmp_path), max_candles=3, step=3600)
+    stored = resample(to_candles([0, 3600, 7200], [1.0, 2.0, 3.0], [1.0, 1.0, 1.0]), 3600)
+    fresh = to_candles([3000, 7500, 10800], [9.0, 4.0, 5.0], [2.0, 2.0, 2.0])  # 3000 is older than the open bar
+    merged = store.merge(stored, fresh)
+    assert list(merged["ts"]) == [3600, 7200, 10800]
+    assert list(merged["close"]) == [2.0, 4.0, 5.0] and merged["high"][1] == 4.0
@@ -0,0 +1,43 @@
+# tests/test_catalyst.py
+import json
+
+from catalyst_analysis import CatalystIndex
+
+
+def _index(now=1_000_000.0):
+    return CatalystIndex(clock=lambda: now)
+
+
+def test_add_leaves_the_callers_item_alone():
+    item = {"title": "Mainnet launch", "tickers": ["SOL"], "impact": 2}
+    assert _index().add(item)
+    assert "ts" not in item
+
+
+def test_items_without_text_are_not_duplicates_of_each_other():
+    index = _index()
+    assert index.add({"tickers": ["SOL"], "url": "https://a", "impact": 1})
+    assert index.add({"tickers": ["SOL"], "url": "https://b", "impact": 2})
+    assert index.stats["duplicates"] == 0 and len(index) == 2
+    assert index.add({"title": "SOL breaks out", "tickers": ["SOL"]})
+    assert not index.add({"title": "SOL breaks out!", "tickers": ["SOL"]})
+
+
+def test_ingest_feed_reads_only_new_complete_lines(tmp_path):
+    feed = tmp_path / "catalysts.ndjson"
+    index = _index()
+    with open(feed, "w") as f:
+        f.write(json.dumps({"title": "ETF approved", "tickers": ["BTC"]}) + "\n")
+        f.write("not json\n")
+        f.write(json.dumps({"title": "Hack on bridge", "tickers": ["ETH"]})[:10])  # still being written
+    assert index.ingest_feed(str(feed)) == 1
+    assert index.ingest_feed(str(feed)) == 0
+
+    with open(feed, "a") as f:
+        f.write(json.dumps({"title": "Hack on bridge", "tickers": ["ETH"]})[10:] + "\n")
+    assert index.ingest_feed(str(feed)) == 1
+    assert index.best("ETH")["title"] == "Hack on bridge"
+
+    feed.write_text(json.dumps({"title": "Token unlock next week", "tickers": ["ARB"]}) + "\n")  # rotated
+    assert index.ingest_feed(str(feed)) == 1
+    assert index.ingest_feed(str(tmp_path / "missing.ndjson")) == 0
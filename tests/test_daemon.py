@@ -0,0 +1,160 @@
+# tests/test_daemon.py
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from benchmarks import fixtures
+from db import SignalWriter
+from scanner_tier2 import new_indicator_state
+from services import daemon
+from services.candle_store import CandleStore, resample
+from services.daemon import ScanDaemon, ScanLocked, scan_lock
+from services.providers import _candles_to_frame, _chart_to_candles, estimated_calls
+
+HOT, COLD = "coin-0", "coin-1"
+
+
+def _candles():
+    return resample(_chart_to_candles(fixtures.market_chart_payload("a", 2)), 3600)
+
+
+class FakeClock:
+    def __init__(self, t: float = 1_000_000.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+    def advance(self, sec: float):
+        self.t += sec
+
+
+@pytest.fixture
+def fakes(monkeypatch, tmp_path):
+    """Offline universe, fetch and scoring: HOT always scores hot; API cost per coin is settable."""
+    markets = fixtures.markets_payload(2)
+    env = {"fetched": [], "estimate": {HOT: 1, COLD: 1}, "actual": {HOT: 1, COLD: 1}}
+
+    def fetch(coin_ids, fresh_sec):
+        for coin_id in coin_ids:
+            env["fetched"].append(coin_id)
+            df = pd.DataFrame({"close": [1.0]}, index=pd.to_datetime([0], unit="s"))
+            df.attrs["api_calls"] = env["actual"][coin_id]
+            yield coin_id, df
+
+    def process(coin_id, df, market, writer, states):
+        return {"coin_id": coin_id, "ticker": coin_id.upper(), "ai_score": 9.0 if coin_id == HOT else 1.0, "rvol": 0.0}
+
+    monkeypatch.setattr(daemon, "iter_market_universe", lambda limit, page_filter: iter(markets))
+    monkeypatch.setattr(daemon, "fetch_ohlcv_many", fetch)
+    monkeypatch.setattr(daemon, "estimated_calls", lambda coin_id, fresh_sec: env["estimate"][coin_id])
+    monkeypatch.setattr(daemon, "process_coin", process)
+    monkeypatch.setattr(daemon, "SignalWriter", lambda: SignalWriter(client=None, spill_file=""))
+    monkeypatch.setattr(daemon, "RESULTS_FILE", str(tmp_path / "results.ndjson"))
+    monkeypatch.setattr(daemon, "RUN_SUMMARY_FILE", str(tmp_path / "run_summary.json"))
+    return env
+
+
+def _daemon(tmp_path, clock, **kwargs):
+    kwargs.setdefault("calls_per_min", 0)
+    return ScanDaemon(limit=2, alerts=False, hot_sec=60, cold_sec=600, universe_sec=3600,
+                      state_file=str(tmp_path / "daemon_state.json"), clock=clock, **kwargs)
+
+
+def test_hot_and_cold_cadence(fakes, tmp_path):
+    clock = FakeClock()
+    d = _daemon(tmp_path, clock)
+    assert d.run_cycle()["universe"] and sorted(fakes["fetched"]) == [HOT, COLD]
+    assert d.hot == {HOT}
+
+    for at, expected in [(30, []), (61, [HOT]), (125, [HOT]), (170, []), (601, [HOT, COLD])]:
+        fakes["fetched"].clear()
+        clock.t = 1_000_000.0 + at
+        d.run_cycle()
+        assert fakes["fetched"] == expected, at
+
+
+def test_run_forever_sleeps_until_the_next_coin_is_due(fakes, tmp_path):
+    clock = FakeClock()
+    sleeps = []
+    d = _daemon(tmp_path, clock, tick_sec=1000, sleep=lambda s: (sleeps.append(s), clock.advance(s)))
+    d.run_forever(max_cycles=4)
+    assert sleeps == [60, 60, 60]
+    assert fakes["fetched"].count(HOT) == 4 and fakes["fetched"].count(COLD) == 1
+
+
+def test_budget_charges_actual_calls(fakes, tmp_path):
+    clock = FakeClock()
+    d = _daemon(tmp_path, clock, calls_per_min=3)
+    fakes["estimate"] = {HOT: 2, COLD: 2}
+    fakes["actual"] = {HOT: 2, COLD: 2}
+    stats = d.run_cycle()  # 3 calls: one markets page, then only HOT's chart + /ohlc fit
+    assert fakes["fetched"] == [HOT] and stats["calls"] == 2
+    assert d._allowance == pytest.approx(0)
+
+    fakes["fetched"].clear()
+    fakes["estimate"][COLD] = fakes["actual"][COLD] = 0  # its candles are fresh on disk: free
+    clock.advance(1)
+    d.run_cycle()
+    assert fakes["fetched"] == [COLD]
+
+    fakes["fetched"].clear()
+    fakes["actual"][HOT] = 5  # retries cost more than estimated; the overdraft delays the next scan
+    clock.advance(59)
+    d.run_cycle()
+    assert fakes["fetched"] == [HOT] and d._allowance < 0
+    fakes["fetched"].clear()
+    clock.advance(61)
+    d.run_cycle()
+    assert fakes["fetched"] == []
+
+
+def test_estimated_calls_follow_the_candle_store(tmp_path):
+    store = CandleStore(str(tmp_path), step=3600)
+    assert estimated_calls("a", store=store) == 2  # cold: market_chart + /ohlc
+    store.save("a", _candles())
+    assert estimated_calls("a", fresh_sec=300, store=store) == 0
+    two_hours_ago = time.time() - 7200
+    os.utime(store.path("a"), (two_hours_ago, two_hours_ago))
+    assert estimated_calls("a", fresh_sec=300, store=store) == 1  # tail via /market_chart/range
+    two_days_ago = time.time() - 2 * 86400
+    os.utime(store.path("a"), (two_days_ago, two_days_ago))
+    assert estimated_calls("a", fresh_sec=300, store=store) == 2
+
+
+def test_checkpoint_and_restore(fakes, tmp_path):
+    clock = FakeClock()
+    d = _daemon(tmp_path, clock)
+    d.run_cycle()
+    state = new_indicator_state()
+    state.update(_candles_to_frame(_candles()))
+    d.states[HOT] = state
+    d.checkpoint()
+
+    restored = _daemon(tmp_path, clock)
+    assert restored.restore()
+    assert restored.schedule == d.schedule and restored.hot == d.hot and restored.rows == d.rows
+    assert restored.universe_at == d.universe_at and restored.markets == d.markets
+    assert restored.states[HOT].to_dict() == state.to_dict()
+
+    fakes["fetched"].clear()
+    clock.advance(61)
+    restored.run_cycle()  # picks the cadence up where the checkpoint left it
+    assert fakes["fetched"] == [HOT]
+
+
+def test_restore_ignores_a_corrupt_checkpoint(tmp_path):
+    (tmp_path / "daemon_state.json").write_text("{oops")
+    assert not _daemon(tmp_path, FakeClock()).restore()
+
+
+def test_scan_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "scan.lock")
+    with scan_lock(path):
+        with pytest.raises(ScanLocked):
+            with scan_lock(path):
+                pass
+    with scan_lock(path):
+        pass
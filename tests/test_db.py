@@ -0,0 +1,159 @@
+# tests/test_db.py
+import json
+import threading
+import time
+
+import pytest
+
+from db import SignalWriter
+
+
+class FakeClient:
+    """Records every upsert; the first ``fail`` executes raise."""
+
+    def __init__(self, fail: int = 0):
+        self.calls = []
+        self.fail = fail
+
+    def table(self, name):
+        client = self
+
+        class Query:
+            def upsert(self, rows, on_conflict=""):
+                self.rows, self.on_conflict = [dict(r) for r in rows], on_conflict
+                return self
+
+            def execute(self):
+                if client.fail:
+                    client.fail -= 1
+                    raise RuntimeError("upstream unavailable")
+                client.calls.append((name, self.on_conflict, self.rows))
+                return self
+
+        return Query()
+
+
+def _writer(client, tmp_path, **kwargs):
+    kwargs.setdefault("flush_sec", 3600)
+    return SignalWriter(client=client, spill_file=str(tmp_path / "spill.ndjson"), sleep=lambda s: None, **kwargs)
+
+
+def test_batches_rows_into_few_round_trips(tmp_path):
+    client = FakeClient()
+    with _writer(client, tmp_path, batch_size=100) as writer:
+        for i in range(250):
+            writer.add({"coin_id": f"c{i}", "price": i}, on_conflict="coin_id")
+    assert [len(rows) for _, _, rows in client.calls] == [100, 100, 50]
+    assert writer.round_trips == 3 and writer.rows_written == 250
+    assert {on_conflict for _, on_conflict, _ in client.calls} == {"coin_id"}
+
+
+def test_mixed_row_shapes_never_null_each_other(tmp_path):
+    client = FakeClient()
+    tier1 = lambda c: {"coin_id": c, "price": 1.0, "market_cap": 5e7, "volume_24h": 2e7, "tier": "tier1"}
+    tier2 = lambda c: {"coin_id": c, "price": 1.1, "rsi": 55.0, "ai_score": 7.0, "tier": "tier2"}
+    with _writer(client, tmp_path) as writer:
+        writer.add(tier1("a"), on_conflict="coin_id")
+        writer.add(tier1("b"), on_conflict="coin_id")
+        writer.add(tier2("a"), on_conflict="coin_id")
+        writer.add(tier2("c"), on_conflict="coin_id")
+
+    for _, _, rows in client.calls:
+        assert len({frozenset(r) for r in rows}) == 1  # one column set per request
+    sent = {r["coin_id"]: r for _, _, rows in client.calls for r in rows}
+    assert sent["a"] == {**tier1("a"), **tier2("a")}  # both tiers' columns, later values win
+    assert sent["b"] == tier1("b") and sent["c"] == tier2("c")
+    assert writer.rows_written == 3
+
+
+def test_retries_failed_chunk_with_backoff(tmp_path):
+    client = FakeClient(fail=2)
+    delays = []
+    writer = SignalWriter(client=client, spill_file=str(tmp_path / "spill.ndjson"), max_retries=3, sleep=delays.append)
+    writer.add({"coin_id": "a"}, on_conflict="coin_id")
+    writer.close()
+    assert delays == [1, 2]
+    assert writer.round_trips == 3 and writer.rows_written == 1
+    assert not (tmp_path / "spill.ndjson").exists()
+
+
+def test_spills_unsent_rows_and_replays_them(tmp_path):
+    spill = tmp_path / "spill.ndjson"
+    down = FakeClient(fail=100)
+    with _writer(down, tmp_path, max_retries=1) as writer:
+        writer.add({"coin_id": "a", "rsi": 1.0}, on_conflict="coin_id")
+        writer.add({"ticker": "B", "rsi": 2.0}, on_conflict="ticker")
+    assert writer.rows_spilled == 2 and writer.rows_written == 0
+    assert len(spill.read_text().splitlines()) == 2
+
+    up = FakeClient()
+    replay = _writer(up, tmp_path)
+    assert not spill.exists()  # moved aside until the replayed rows are sent
+    replay.close()
+    sent = {(on_conflict, json.dumps(rows)) for _, on_conflict, rows in up.calls}
+    assert sent == {("coin_id", json.dumps([{"coin_id": "a", "rsi": 1.0}])),
+                    ("ticker", json.dumps([{"ticker": "B", "rsi": 2.0}]))}
+    assert not spill.exists() and not (tmp_path / "spill.ndjson.replay").exists()
+
+
+@pytest.mark.parametrize("flush_sec, expected_calls", [(0, 3), (3600, 1)])
+def test_flushes_on_time(tmp_path, flush_sec, expected_calls):
+    client = FakeClient()
+    writer = _writer(client, tmp_path, flush_sec=flush_sec)
+    for c in "abc":
+        writer.add({"coin_id": c}, on_conflict="coin_id")
+    writer.close()
+    assert len(client.calls) == expected_calls
+
+
+def test_idle_rows_are_flushed_by_the_timer(tmp_path):
+    client = FakeClient()
+    writer = _writer(client, tmp_path, flush_sec=0.05)
+    writer.add({"coin_id": "a"}, on_conflict="coin_id")
+    deadline = time.monotonic() + 5
+    while not client.calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [rows for _, _, rows in client.calls] == [[{"coin_id": "a"}]]
+    writer.close()
+    assert len(client.calls) == 1
+
+
+class BlockingClient(FakeClient):
+    """Holds the first upsert until ``release`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.started, self.release = threading.Event(), threading.Event()
+
+    def table(self, name):
+        query = super().table(name)
+        execute = query.execute
+
+        def blocking_execute():
+            if not self.started.is_set():
+                self.started.set()
+                self.release.wait(5)
+            return execute()
+
+        query.execute = blocking_execute
+        return query
+
+
+def test_only_the_flush_sending_replayed_rows_deletes_the_replay_file(tmp_path):
+    spill = tmp_path / "spill.ndjson"
+    spill.write_text(json.dumps({"on_conflict": "coin_id", "row": {"coin_id": "old"}}) + "\n")
+    client = BlockingClient()
+    writer = _writer(client, tmp_path)
+    replay = tmp_path / "spill.ndjson.replay"
+    first = threading.Thread(target=writer.flush)
+    first.start()
+    assert client.started.wait(5)  # the replayed rows are in flight
+    writer.add({"coin_id": "new"}, on_conflict="coin_id")
+    second = threading.Thread(target=writer.flush)  # e.g. the Tier 1 thread flushing its own rows
+    second.start()
+    second.join(5)
+    assert replay.exists()  # a crash now would still replay "old"
+    client.release.set()
+    first.join(5)
+    assert not replay.exists()
+    assert sorted(r["coin_id"] for _, _, rows in client.calls for r in rows) == ["new", "old"]
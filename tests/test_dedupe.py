@@ -0,0 +1,131 @@
+# tests/test_dedupe.py
+import threading
+
+import pytest
+
+import duplicate_cache
+from duplicate_cache import DedupeStore, MemoryDedupeStore, SQLiteDedupeStore
+
+
+class FakeClock:
+    def __init__(self, t: float = 1_000_000.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _stores(tmp_path, clock):
+    return [MemoryDedupeStore(window_sec=3600, clock=clock),
+            SQLiteDedupeStore(str(tmp_path / "dedupe.db"), window_sec=3600, clock=clock)]
+
+
+def test_backends_must_implement_fetch_and_store():
+    with pytest.raises(TypeError):
+        DedupeStore()
+
+
+@pytest.mark.parametrize("kind", [0, 1], ids=["memory", "sqlite"])
+def test_symbols_are_seen_within_the_window(tmp_path, kind):
+    clock = FakeClock()
+    store = _stores(tmp_path, clock)[kind]
+    store.mark_seen_many(["btc", "ETH"])
+    assert store.seen_recent_many(["BTC", "eth", "sol"]) == {"BTC": True, "ETH": True, "SOL": False}
+    clock.t += 3601
+    assert not store.seen_recent("btc")
+
+
+def test_memory_store_purges_expired_symbols_on_write():
+    clock = FakeClock()
+    store = MemoryDedupeStore(window_sec=3600, clock=clock)
+    store.mark_seen_many([f"c{i}" for i in range(100)])
+    clock.t += 3601
+    store.mark_seen("new")
+    assert list(store._seen) == ["NEW"]
+    clock.t += 30  # within PURGE_EVERY_SEC: no second pass
+    store._seen["OLD"] = 0.0
+    store.mark_seen("other")
+    assert "OLD" in store._seen
+
+
+def test_sqlite_store_purges_expired_rows(tmp_path):
+    clock = FakeClock()
+    store = SQLiteDedupeStore(str(tmp_path / "dedupe.db"), window_sec=3600, clock=clock)
+    store.mark_seen("btc")
+    clock.t += 3601
+    store.mark_seen("eth")
+    assert [r[0] for r in store._db.execute("SELECT symbol FROM seen")] == ["ETH"]
+    store.close()
+
+
+def test_get_store_builds_one_store_across_threads(monkeypatch):
+    monkeypatch.setattr(duplicate_cache, "_store", None)
+    monkeypatch.setattr(duplicate_cache, "DEDUPE_DB", "")
+    built = []
+    real = duplicate_cache.MemoryDedupeStore
+
+    def slow_store():
+        built.append(1)
+        threading.Event().wait(0.01)
+        return real()
+
+    monkeypatch.setattr(duplicate_cache, "MemoryDedupeStore", slow_store)
+    got = []
+    threads = [threading.Thread(target=lambda: got.append(duplicate_cache.get_store())) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(built) == 1 and all(s is got[0] for s in got)
+
+
+class CountingStore(MemoryDedupeStore):
+    def __init__(self):
+        super().__init__()
+        self.fetches = self.stores = 0
+
+    def _fetch(self, symbols, since):
+        self.fetches += 1
+        return super()._fetch(symbols, since)
+
+    def _store(self, stamps):
+        self.stores += 1
+        super()._store(stamps)
+
+
+class Dispatcher:
+    def __init__(self):
+        self.sent = []
+
+    def submit(self, payload):
+        self.sent.append(payload["symbol"])
+        return True
+
+    def flush(self):
+        pass
+
+
+def test_a_scan_checks_and_marks_all_candidates_in_one_call_each(monkeypatch):
+    from services.scanner import AlertStage
+
+    store = CountingStore()
+    monkeypatch.setattr(duplicate_cache, "_store", store)
+    store.mark_seen("c0")
+    store.stores = 0
+    rows = [{"coin_id": f"coin-{i}", "ticker": f"C{i}", "ai_score": 9.0} for i in range(20)]
+    rows.append({"coin_id": "other-c1", "ticker": "c1", "ai_score": 9.5})  # same ticker as coin-1
+    rows.append({"coin_id": "low", "ticker": "LOW", "ai_score": 1.0})
+
+    dispatcher = Dispatcher()
+    stage = AlertStage(dispatcher)
+    for row in rows:
+        stage.offer(row)
+    alerted = stage.finish()
+    assert store.fetches == 1 and store.stores == 1
+    assert [r["coin_id"] for r in alerted] == [f"coin-{i}" for i in range(1, 20)]
+    assert dispatcher.sent == [f"C{i}" for i in range(1, 20)]
+
+    stage = AlertStage(dispatcher)  # the next scan finds them all alerted already
+    for row in rows:
+        stage.offer(row)
+    assert stage.finish() == [] and store.fetches == 2 and store.stores == 1
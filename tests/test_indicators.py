@@ -0,0 +1,161 @@
+# tests/test_indicators.py
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import signal_series, walk_forward_metrics
+from benchmarks import fixtures
+from scoring import compute_ai_score
+from services import providers
+from technical_indicators import (
+    IndicatorState, TimeframeStates, _clean, compute_metrics, compute_metrics_batch, downsample, load_states,
+    panel_from_frames, regular_bars, save_states, timeframe_frames,
+)
+
+
+def _hourly(coin_id="bitcoin", days=7):
+    return providers._candles_to_frame(providers._chart_to_candles(fixtures.market_chart_payload(coin_id, days)))
+
+
+def _mixed(coin_id="bitcoin"):
+    """A cold-start store: hourly bars, then a 15m tail once refreshes started landing."""
+    hourly = _hourly(coin_id)
+    tail = hourly.index[-1] + pd.to_timedelta(np.arange(1, 17) * 15, unit="min")
+    fine = pd.DataFrame({c: hourly[c].iloc[-1] for c in hourly.columns}, index=tail)
+    fine["close"] = fine["close"] * (1 + np.linspace(0.001, 0.02, len(tail)))
+    fine["high"] = fine["close"] * 1.002
+    fine["low"] = fine["close"] * 0.998
+    return pd.concat([hourly, fine])
+
+
+def test_regular_bars_merges_a_finer_tail():
+    bars, step = regular_bars(_mixed())
+    assert step == 3600
+    assert set(np.diff(bars.index.values).astype("timedelta64[s]").astype(int)) == {3600}
+
+
+def test_timeframes_finer_than_the_bars_are_skipped():
+    frames = timeframe_frames(_hourly(), ["15m", "1h", "4h"])
+    assert list(frames) == ["1h", "4h"]
+    assert compute_metrics(_hourly(), ["15m", "1h", "4h"], primary="1h")["tf"].keys() == {"1h", "4h"}
+
+
+def test_mixed_spacing_scores_like_the_regularized_bars():
+    df = _mixed()
+    regular = downsample(df, 3600)
+    assert compute_metrics(df, ["1h", "4h"], primary="1h") == compute_metrics(regular, ["1h", "4h"], primary="1h")
+
+
+@pytest.mark.parametrize("coin_id", ["bitcoin", "solana", "coin-7"])
+def test_backtest_scores_match_the_scanner(coin_id):
+    df = _hourly(coin_id)
+    bars, series = walk_forward_metrics(df, ["1h", "4h"], "1h")
+    assert len(bars) == len(df) and set(series["htf"]) == {"4h"}
+    for t in list(range(0, 12)) + list(range(20, len(df), 9)) + [len(df) - 1]:
+        live = compute_metrics(df.iloc[:t + 1], ["1h", "4h"], primary="1h")
+        h = live["tf"]["4h"]
+        assert series["htf_ema5"].iloc[t] == pytest.approx(h["ema5"], rel=1e-9)
+        assert series["htf_ema13"].iloc[t] == pytest.approx(h["ema13"], rel=1e-9)
+        if h["rsi"] is None:
+            assert np.isnan(series["htf_rsi"].iloc[t])
+        else:
+            assert series["htf_rsi"].iloc[t] == pytest.approx(h["rsi"], rel=1e-6)
+
+    s = signal_series(coin_id, df)
+    for t in range(len(df)):
+        live = compute_metrics(df.iloc[:t + 1], ["1h", "4h"], primary="1h")
+        assert s.score[t] == pytest.approx(compute_ai_score(live)[0], abs=1e-9), t
+
+
+def test_backtest_runs_on_primary_bars_of_a_mixed_store():
+    s = signal_series("bitcoin", _mixed())
+    assert set(np.diff(s.ts)) == {3600}
+
+
+def _random_candles(seed, n, step="1h"):
+    """Seeded random walk with real ranges; some zero-volume bars."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    spread = close * rng.uniform(0, 0.02, n)
+    volume = np.where(rng.random(n) < 0.1, 0.0, rng.uniform(1e5, 1e6, n))
+    index = pd.date_range("2024-01-01", periods=n, freq=step.replace("m", "min"))
+    return pd.DataFrame({"open": close, "high": close + spread, "low": close - spread,
+                         "close": close, "volume": volume}, index=index)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_batch_metrics_match_the_per_coin_function_on_ragged_panels(seed):
+    rng = np.random.default_rng(seed)
+    lengths = [1, 2, 3, 13, 14, 15, 50] + [int(n) for n in rng.integers(1, 200, 12)]
+    frames = {f"c{i}": _random_candles(seed * 100 + i, n) for i, n in enumerate(lengths)}
+    frames["no-volume"] = _random_candles(seed, 40).assign(volume=0.0)
+    frames["no-volume-1"] = _random_candles(seed, 1).assign(volume=0.0)
+    ids, close, high, low, volume = panel_from_frames(frames)
+    batch = compute_metrics_batch(close, high, low, volume, index=ids)
+    for coin_id, df in frames.items():
+        want = compute_metrics(df)
+        got = batch.loc[coin_id].to_dict()
+        assert got.keys() == want.keys()
+        for k, v in want.items():
+            if v is None:
+                assert np.isnan(got[k]), (coin_id, len(df), k)
+            else:
+                assert got[k] == pytest.approx(v, rel=1e-9, abs=1e-9), (coin_id, len(df), k)
+
+
+def _assert_same(got, want, path=""):
+    assert got.keys() == want.keys(), path
+    for k, v in want.items():
+        if isinstance(v, dict):
+            _assert_same(got[k], v, f"{path}{k}.")
+        elif v is None:
+            assert got[k] is None, f"{path}{k}"
+        else:
+            assert got[k] == pytest.approx(v, rel=1e-9, abs=1e-9), f"{path}{k}"
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_indicator_state_matches_compute_metrics(seed):
+    n = int(np.random.default_rng(seed).integers(1, 120))
+    df = _random_candles(seed, n)
+    state = IndicatorState()
+    for i, row in enumerate(df.to_dict("records")):
+        state.update(row)
+        if i % 7 == 0:
+            state = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+    _assert_same(_clean(state.metrics()), compute_metrics(df))
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("timeframes, primary", [(["1h", "4h"], "1h"), (["15m", "1h", "4h"], "1h"),
+                                                 (["4h", "1d"], "1h"), (["1h"], "1h")])
+def test_timeframe_states_match_compute_metrics(seed, timeframes, primary):
+    """Fed in random-sized growing prefixes, with a save/load round trip between scans."""
+    rng = np.random.default_rng(seed)
+    df = _random_candles(seed, 150)
+    state = TimeframeStates(timeframes, primary)
+    end = 0
+    while end < len(df):
+        end = min(end + int(rng.integers(1, 30)), len(df))
+        _assert_same(state.update(df.iloc[:end]), compute_metrics(df.iloc[:end], timeframes, primary=primary))
+        state = TimeframeStates.from_dict(json.loads(json.dumps(state.to_dict())))
+
+
+def test_timeframe_states_start_over_when_history_is_replaced():
+    df = _random_candles(1, 120)
+    state = TimeframeStates(["1h", "4h"], "1h")
+    state.update(df.iloc[:60])
+    wiped = df.iloc[90:]  # cold refetch after a gap: nothing connects to what was fed
+    _assert_same(state.update(wiped), compute_metrics(wiped, ["1h", "4h"], primary="1h"))
+    older = df.iloc[:40]  # restored from an older copy
+    _assert_same(state.update(older), compute_metrics(older, ["1h", "4h"], primary="1h"))
+
+
+def test_load_states_ignores_a_corrupt_file(tmp_path):
+    path = tmp_path / "state.json"
+    save_states(str(path), {"a": TimeframeStates(["1h", "4h"], "1h")})
+    assert load_states(str(path), TimeframeStates)["a"].timeframes == ["1h", "4h"]
+    path.write_text("{not json")
+    assert load_states(str(path), TimeframeStates) == {}
@@ -0,0 +1,192 @@
+# tests/test_providers.py
+import time
+
+import pytest
+
+from benchmarks import fixtures
+from benchmarks.stub_server import start_stub
+from services import providers
+from services.candle_store import CandleStore
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server, state, url = start_stub(n_markets=500)
+    monkeypatch.setattr(providers, "COINGECKO_API", url)
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def _paths(state, suffix):
+    return [p for p in state.requests if p.endswith(suffix)]
+
+
+def test_cold_start_gives_the_atr_window_real_ranges(stub, tmp_path):
+    store = CandleStore(str(tmp_path), step=3600)
+    df = providers.get_ohlcv_coin_gecko("bitcoin", days=7, store=store)
+    assert _paths(stub, "/market_chart") and _paths(stub, "/ohlc")
+    assert len(df) >= 7 * 24
+    assert (df["high"] > df["low"]).iloc[-15:-1].all()  # the forming last bar may hold a single tick
+
+
+def test_warm_refresh_skips_ohlc(stub, tmp_path):
+    store = CandleStore(str(tmp_path), step=3600)
+    providers.get_ohlcv_coin_gecko("bitcoin", days=7, store=store)
+    stub.requests.clear()
+    providers.get_ohlcv_coin_gecko("bitcoin", days=7, store=store, fresh_sec=0)
+    assert _paths(stub, "/market_chart/range") and not _paths(stub, "/ohlc")
+
+
+class _Response:
+    def __init__(self, status, body=None, headers=None):
+        self.status_code, self._body, self.headers = status, body, headers or {}
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise providers.requests.HTTPError(str(self.status_code))
+
+
+class _Session:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+class _Limiter:
+    def __init__(self):
+        self.pauses = []
+
+    def acquire(self):
+        pass
+
+    def pause(self, sec):
+        self.pauses.append(sec)
+
+
+def test_get_json_backs_off_on_429_and_5xx(monkeypatch):
+    session = _Session([_Response(429, headers={"Retry-After": "7"}), _Response(503), _Response(200, {"ok": 1})])
+    limiter, sleeps = _Limiter(), []
+    monkeypatch.setattr(providers, "_session", session)
+    monkeypatch.setattr(providers, "limiter", limiter)
+    monkeypatch.setattr(providers.time, "sleep", sleeps.append)
+    assert providers._get_json("http://stub/coins/x/market_chart") == {"ok": 1}
+    assert session.calls == 3
+    assert limiter.pauses == [7.0]  # a 429 pauses every fetch, honouring Retry-After
+    assert len(sleeps) == 1         # a 5xx only backs off this request
+
+
+def test_get_json_gives_up_after_max_retries(monkeypatch):
+    session = _Session([_Response(500)] * (providers.FETCH_MAX_RETRIES + 1))
+    monkeypatch.setattr(providers, "_session", session)
+    monkeypatch.setattr(providers, "limiter", _Limiter())
+    monkeypatch.setattr(providers.time, "sleep", lambda s: None)
+    with pytest.raises(providers.requests.HTTPError):
+        providers._get_json("http://stub/coins/x/market_chart")
+    assert session.calls == providers.FETCH_MAX_RETRIES + 1
+
+
+def test_fetch_many_overlaps_requests_and_counts_calls(monkeypatch, tmp_path):
+    server, state, url = start_stub(latency=0.2)
+    try:
+        monkeypatch.setattr(providers, "COINGECKO_API", url)
+        monkeypatch.setattr(providers.candle_store, "store", CandleStore(str(tmp_path), step=3600))
+        coins = [f"coin-{i}" for i in range(16)]
+        t0 = time.perf_counter()
+        got = dict(providers.fetch_ohlcv_many(coins, max_workers=8))
+        elapsed = time.perf_counter() - t0
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert set(got) == set(coins) and all(not df.empty for df in got.values())
+    assert all(df.attrs["api_calls"] == 2 for df in got.values())  # cold: market_chart + /ohlc
+    assert len(state.requests) == 32
+    assert elapsed < 32 * 0.2 / 2  # sequential would take 6.4s
+
+
+def test_fetch_many_yields_empty_frames_for_failures(monkeypatch):
+    def fetch(coin_id, days, fresh_sec):
+        if coin_id == "bad":
+            raise RuntimeError("boom")
+        return providers._candles_to_frame(providers._chart_to_candles(fixtures.market_chart_payload(coin_id, 2)))
+
+    monkeypatch.setattr(providers, "get_ohlcv_coin_gecko", fetch)
+    got = dict(providers.fetch_ohlcv_many(["good", "bad"], max_workers=2))
+    assert not got["good"].empty and got["bad"].empty
+
+
+@pytest.fixture
+def universe(monkeypatch, tmp_path):
+    monkeypatch.setattr(providers, "_universe_cache", {})
+    monkeypatch.setattr(providers, "UNIVERSE_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(providers, "MARKETS_PER_PAGE", 100)
+
+
+def test_universe_pages_are_fetched_once_and_cached(stub, universe, tmp_path):
+    got = list(providers.iter_market_universe(450))
+    pages = _paths(stub, "/coins/markets")
+    assert len(pages) == 5
+    assert len(got) == 450 and len({m["id"] for m in got}) == 450
+    assert set(got[0]) == set(providers.MARKET_FIELDS)
+
+    stub.requests.clear()
+    again = list(providers.iter_market_universe(300))
+    assert stub.requests == [] and [m["id"] for m in again] == [f"coin-{i}" for i in range(300)]
+
+    providers._universe_cache.clear()  # a new process reads the snapshot from disk
+    assert len(list(providers.iter_market_universe(450))) == 450 and stub.requests == []
+
+
+def test_universe_page_filter_sees_columns(stub, universe):
+    seen = []
+
+    def page_filter(columns):
+        seen.append(len(columns["id"]))
+        return [(cap or 0) > 1e9 for cap in columns["market_cap"]]
+
+    got = list(providers.iter_market_universe(300, page_filter=page_filter))
+    assert sorted(seen) == [100, 100, 100]
+    assert got and all(m["market_cap"] > 1e9 for m in got)
+
+
+def test_universe_skips_coins_repeated_across_pages(monkeypatch, universe):
+    pages = {1: [{"id": "a"}, {"id": "b"}], 2: [{"id": "b"}, {"id": "c"}]}  # rank shift repeats "b"
+    monkeypatch.setattr(providers, "get_markets_page", lambda page, per_page, vs: pages[page])
+    monkeypatch.setattr(providers, "MARKETS_PER_PAGE", 2)
+    assert sorted(m["id"] for m in providers.iter_market_universe(4, max_workers=1)) == ["a", "b", "c"]
+
+
+def test_failed_page_is_not_cached(monkeypatch, universe):
+    def page(page, per_page, vs):
+        if page == 2:
+            raise RuntimeError("503")
+        return [{"id": f"p{page}-{i}"} for i in range(per_page)]
+
+    monkeypatch.setattr(providers, "get_markets_page", page)
+    assert len(list(providers.iter_market_universe(300))) == 200
+    assert providers._cached_universe(300, "usd") is None
+
+
+def test_prefetched_universe_is_reused_without_listing_again(stub, universe, tmp_path):
+    path = providers.prefetch_universe(450)
+    assert path == str(tmp_path / "universe_usd.json") and len(_paths(stub, "/coins/markets")) == 5
+    stub.requests.clear()
+    providers._universe_cache.clear()  # a shard in another process
+    assert len(list(providers.iter_market_universe(450))) == 450 and stub.requests == []
+
+
+def test_incomplete_prefetch_reports_failure(monkeypatch, universe):
+    def page(page, per_page, vs):
+        if page == 2:
+            raise RuntimeError("503")
+        return [{"id": f"p{page}-{i}"} for i in range(per_page)]
+
+    monkeypatch.setattr(providers, "get_markets_page", page)
+    assert providers.prefetch_universe(300) is None
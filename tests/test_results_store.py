@@ -0,0 +1,106 @@
+# tests/test_results_store.py
+import json
+import os
+
+import pytest
+
+import results_store
+from results_store import RESULT_COLUMNS, ResultsWriter, _decode_prefix, read_results, write_results
+
+
+def _rows(n=30):
+    rows = []
+    for i in range(n):
+        rows.append({"coin_id": f"c{i:02d}", "ticker": f"C{i}", "ai_score": None if i % 10 == 9 else float(i % 7),
+                     "rsi": 40.0 + i, "risk": {"stop_loss": i * 0.9}, "ai_reason": f"reason, \"{i}\"\n",
+                     **({"extra_field": i} if i % 3 == 0 else {})})
+    return rows
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "results.ndjson")
+
+
+def test_round_trip_keeps_every_column_and_extra_keys(path):
+    rows = _rows()
+    assert write_results(rows, path) == len(rows)
+    got = {r["coin_id"]: r for r in read_results(path)}
+    for row in rows:
+        want = {c: row.get(c) for c in RESULT_COLUMNS}
+        want.update({k: v for k, v in row.items() if k not in RESULT_COLUMNS})
+        assert got[row["coin_id"]] == want
+
+
+@pytest.mark.parametrize("fields", [["coin_id"], ["ai_score", "coin_id", "ticker"], ["coin_id", "rsi", "extra_field"],
+                                    ["coin_id", "risk", "ai_reason"], ["coin_id", "no_such_field"]])
+def test_projection_matches_the_full_rows(path, fields):
+    write_results(_rows(), path)
+    full = read_results(path)
+    assert read_results(path, fields=fields) == [{f: r.get(f) for f in fields} for r in full]
+
+
+def test_narrow_projections_never_decode_trailing_columns():
+    line = '[7.5,"sol","SOL",' + "{broken json" + "]"
+    assert _decode_prefix(line, 3) == [7.5, "sol", "SOL"]
+    assert _decode_prefix("[]", 2) == []
+    assert RESULT_COLUMNS[-2:] == ("risk", "ai_reason")
+
+
+def test_limit_and_min_score_pick_top_rows_from_raw_lines(path):
+    rows = _rows()
+    write_results(rows, path)
+    top = read_results(path, fields=["coin_id", "ai_score"], limit=5)
+    scores = sorted((r["ai_score"] for r in rows if r["ai_score"] is not None), reverse=True)
+    assert all(r["ai_score"] >= scores[4] for r in top)
+    assert len(top) == sum(1 for s in scores if s >= scores[4])  # ties at the cutoff are kept
+    assert {r["coin_id"] for r in read_results(path, min_score=5)} == \
+        {r["coin_id"] for r in rows if r["ai_score"] is not None and r["ai_score"] >= 5}
+    assert read_results(path, limit=0) == []
+    assert len(read_results(path, limit=1000)) == len(rows)
+
+
+def test_rows_are_only_visible_once_the_writer_closes(path):
+    write_results(_rows(2), path)
+    writer = ResultsWriter(path)
+    writer.add_many(_rows(5))
+    assert os.path.exists(path + ".partial")
+    assert len(read_results(path)) == 2  # readers still see the previous complete file
+    writer.close()
+    assert not os.path.exists(path + ".partial") and len(read_results(path)) == 5
+
+
+def test_an_interrupted_run_is_published_by_the_next_writer(path):
+    writer = ResultsWriter(path)
+    writer.add_many(_rows(4))
+    writer._f.write(b'[3.0,"torn')  # the process died mid-line
+    writer._f.close()
+    assert not os.path.exists(path)
+
+    recovered = ResultsWriter(path)  # publishes the leftover rows before starting its own
+    assert [r["coin_id"] for r in read_results(path)] == ["c00", "c01", "c02", "c03"]
+    recovered.add(_rows(1)[0])
+    recovered.close()
+    assert [r["coin_id"] for r in read_results(path)] == ["c00"]
+
+
+def test_an_empty_partial_is_not_published(path):
+    write_results(_rows(3), path)
+    ResultsWriter(path)._f.close()  # died right after the header
+    ResultsWriter(path).close()
+    assert read_results(path) == []
+
+
+def test_unknown_formats_are_rejected(path):
+    with open(path, "w") as f:
+        f.write(json.dumps({"format": "something-else"}) + "\n[1]\n")
+    with pytest.raises(ValueError):
+        read_results(path)
+
+
+def test_missing_results_fall_back_to_the_legacy_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(results_store, "RESULTS_FILE", str(tmp_path / "missing.ndjson"))
+    (tmp_path / results_store.LEGACY_FILE).write_text(json.dumps(_rows(5)))
+    got = read_results(str(tmp_path / "missing.ndjson"), fields=["coin_id"], limit=2)
+    assert got == [{"coin_id": "c04"}, {"coin_id": "c03"}]
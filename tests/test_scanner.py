@@ -0,0 +1,98 @@
+# tests/test_scanner.py
+import json
+import queue
+import threading
+
+import pandas as pd
+import pytest
+
+from benchmarks import fixtures
+from db import SignalWriter
+from services import providers, scanner
+
+
+def _frame(coin_id, days=7):
+    return providers._candles_to_frame(providers._chart_to_candles(fixtures.market_chart_payload(coin_id, days)))
+
+
+def test_fetch_yields_finished_coins_while_upstream_is_idle(monkeypatch):
+    monkeypatch.setattr(providers, "get_ohlcv_coin_gecko", lambda coin_id, days, fresh_sec: _frame(coin_id))
+    q = queue.Queue()
+    q.put("coin-1")  # Tier 1 has matched one coin and is still paging
+    results = providers.fetch_ohlcv_many(scanner._drain(q, poll_sec=0.01), max_workers=2)
+
+    first = []
+    reader = threading.Thread(target=lambda: first.append(next(results)), daemon=True)
+    reader.start()
+    reader.join(timeout=5)
+    assert first and first[0][0] == "coin-1" and not first[0][1].empty
+
+    q.put("coin-2")
+    q.put(scanner._DONE)
+    assert [coin_id for coin_id, _ in results] == ["coin-2"]
+
+
+class _Table:
+    """PostgREST upsert semantics: every column named in a request is written, missing keys as NULL."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def table(self, name):
+        table = self
+
+        class Query:
+            def upsert(self, rows, on_conflict=""):
+                self.rows, self.key = rows, on_conflict
+                return self
+
+            def execute(self):
+                columns = set().union(*self.rows)
+                for row in self.rows:
+                    stored = table.rows.setdefault(row[self.key], {})
+                    stored.update({c: row.get(c) for c in columns})
+                return self
+
+        return Query()
+
+
+def test_pipeline_keeps_both_tiers_columns(monkeypatch, tmp_path):
+    markets = fixtures.markets_payload(300)
+    monkeypatch.setattr(scanner, "iter_market_universe",
+                        lambda limit, page_filter: iter(m for m, keep in zip(
+                            markets, page_filter({f: [m.get(f) for m in markets] for f in providers.MARKET_FIELDS})) if keep))
+    monkeypatch.setattr(providers, "get_ohlcv_coin_gecko", lambda coin_id, days, fresh_sec: _frame(coin_id))
+    table = _Table()
+    monkeypatch.setattr(scanner, "SignalWriter",
+                        lambda: SignalWriter(client=table, spill_file=str(tmp_path / "spill.ndjson"), batch_size=7))
+    monkeypatch.setattr(scanner, "RESULTS_FILE", str(tmp_path / "results.ndjson"))
+    monkeypatch.setattr(scanner, "RUN_SUMMARY_FILE", str(tmp_path / "run_summary.json"))
+
+    summary = scanner.run_pipeline(limit=len(markets))
+    assert summary["tier1"] > 0 and summary["tier2"] == summary["tier1"]
+    for row in table.rows.values():
+        assert row["market_cap"] is not None and row["volume_24h"] is not None  # Tier 1 columns
+        assert row["ai_score"] is not None and row["rsi"] is not None          # Tier 2 columns
+
+
+def test_pipeline_keeps_indicator_state_warm_between_runs(monkeypatch, tmp_path):
+    markets = fixtures.markets_payload(100)
+    monkeypatch.setattr(scanner, "iter_market_universe",
+                        lambda limit, page_filter: iter(m for m, keep in zip(
+                            markets, page_filter({f: [m.get(f) for m in markets] for f in providers.MARKET_FIELDS})) if keep))
+    monkeypatch.setattr(providers, "get_ohlcv_coin_gecko", lambda coin_id, days, fresh_sec: _frame(coin_id))
+    monkeypatch.setattr(scanner, "SignalWriter", lambda: SignalWriter(client=None, spill_file=""))
+    monkeypatch.setattr(scanner, "RESULTS_FILE", str(tmp_path / "results.ndjson"))
+    monkeypatch.setattr(scanner, "RUN_SUMMARY_FILE", str(tmp_path / "run_summary.json"))
+    state_file = tmp_path / "indicator_state.json"
+    monkeypatch.setattr(scanner, "INDICATOR_STATE_FILE", str(state_file))
+    rows = {}
+    monkeypatch.setattr(scanner.ResultsWriter, "add", lambda self, row: rows.setdefault(row["coin_id"], []).append(row))
+
+    scanner.run_pipeline(limit=len(markets))
+    saved = json.loads(state_file.read_text())
+    assert saved and set(saved) == set(rows)
+    scanner.run_pipeline(limit=len(markets))
+    for coin_id, (cold, warm) in rows.items():
+        assert warm["ai_score"] == cold["ai_score"]
+        assert warm["rsi"] == pytest.approx(cold["rsi"], rel=1e-9)
@@ -0,0 +1,109 @@
+# tests/test_scoring.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import scoring
+from benchmarks.fixtures import metrics_dicts
+from scoring import (
+    HeuristicBackend, LogisticBackend, compute_ai_score, get_backend, metrics_columns, save_logistic, score_batch,
+    score_metrics,
+)
+
+FEATURES = ["rvol", "rsi", "ema5_13", "ema13_50", "htf_ema5_13", "htf_rsi"]
+
+EDGE_CASES = [
+    {},
+    {"rvol": None, "rsi": None, "ema5": None, "ema13": None, "ema50": None},
+    {"rsi": 50.0, "rvol": 1.0}, {"rsi": 70.0}, {"rsi": 70.0001}, {"rsi": 49.999},
+    {"rvol": 2.335, "rsi": 60.0}, {"rvol": 1.005}, {"rvol": 100.0, "rsi": 60.0, "ema5": 3, "ema13": 2, "ema50": 1},
+    {"ema5": 3, "ema13": 2, "ema50": 0}, {"ema5": 2, "ema13": 2, "ema50": 1},
+    {"rsi": 55, "tf": {"1h": {"ema5": 2, "ema13": 1, "rsi": 60}}},  # one timeframe: no confirmation
+    {"rsi": 55, "tf": {"1h": {}, "4h": {"ema5": 2, "ema13": 1, "rsi": 50}}},
+    {"rsi": 55, "tf": {"4h": {"ema5": 2, "ema13": 1, "rsi": None}, "1h": {}}},
+    {"rsi": 55, "tf": {"15m": {}, "1d": {"ema5": 0, "ema13": 1, "rsi": 80}}},
+]
+
+
+@pytest.mark.parametrize("timeframes", [None, ["1h", "4h"], ["15m", "1h", "4h"]])
+def test_heuristic_batch_matches_compute_ai_score_exactly(timeframes):
+    metrics = metrics_dicts(3000, seed=len(timeframes or ()), timeframes=timeframes) + EDGE_CASES
+    want = [compute_ai_score(m) for m in metrics]
+    for batch in (metrics, metrics_columns(metrics)):
+        scores, texts = score_batch(batch, HeuristicBackend())
+        assert scores.tolist() == [s for s, _ in want]
+        assert texts.tolist() == [r for _, r in want]
+
+
+def test_heuristic_batch_scores_metrics_frames():
+    metrics = metrics_dicts(50)
+    frame = pd.DataFrame(metrics)
+    scores, texts = score_batch(frame, HeuristicBackend())
+    assert list(zip(scores.tolist(), texts.tolist())) == [compute_ai_score(m) for m in metrics]
+
+
+def test_score_metrics_matches_the_heuristic():
+    for m in metrics_dicts(200, timeframes=["1h", "4h"]) + EDGE_CASES:
+        assert score_metrics(m, HeuristicBackend()) == compute_ai_score(m)
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = str(tmp_path / "model.npz")
+    save_logistic(path, FEATURES, [0.8, 0.3, 0.5, 0.4, 0.3, 0.2], -1.0,
+                  mean=[1.5, 50, 0, 0, 0, 50], std=[1, 15, 0.05, 0.03, 0.05, 15])
+    return path
+
+
+def test_logistic_model_round_trips_and_scores(model_file):
+    model = LogisticBackend.load(model_file)
+    assert model.features == FEATURES and model.bias == -1.0
+    m = {"rvol": 2.5, "rsi": 65.0, "ema5": 1.1, "ema13": 1.05, "ema50": 1.0,
+         "tf": {"1h": {}, "4h": {"ema5": 1.2, "ema13": 1.0, "rsi": 60.0}}}
+    x = np.array([2.5, 65.0, 1.1 / 1.05 - 1, 1.05 - 1, 1.2 - 1, 60.0])
+    z = (x - np.array([1.5, 50, 0, 0, 0, 50])) / np.array([1, 15, 0.05, 0.03, 0.05, 15])
+    want = round(10 / (1 + np.exp(-(z @ np.array([0.8, 0.3, 0.5, 0.4, 0.3, 0.2]) - 1.0))), 2)
+    score, reason = score_metrics(m, model)
+    assert score == pytest.approx(want, abs=1e-9)
+    assert reason == compute_ai_score(m)[1]  # reasons always come from the heuristic's rules
+
+
+def test_logistic_model_treats_missing_inputs_as_the_mean(model_file):
+    model = LogisticBackend.load(model_file)
+    scores, _ = score_batch([{}, {"rvol": 1.5, "rsi": 50.0}], model)
+    assert scores.tolist() == [round(10 / (1 + np.exp(1.0)), 2)] * 2
+
+
+def test_unknown_model_features_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        save_logistic(str(tmp_path / "m.npz"), ["rvol", "moon_phase"], [1, 1], 0.0)
+
+
+@pytest.fixture
+def configured(monkeypatch):
+    def configure(path):
+        monkeypatch.setattr(scoring, "SCORING_MODEL", path)
+        monkeypatch.setattr(scoring, "_backend", None)
+        return get_backend()
+    yield configure
+    scoring._backend = None
+
+
+def test_get_backend_loads_the_configured_model(configured, model_file):
+    assert isinstance(configured(model_file), LogisticBackend)
+    assert isinstance(configured(""), HeuristicBackend)
+
+
+@pytest.mark.parametrize("contents", [None, b"not a model", b"PK\x03\x04truncated zip", "wrong-kind", "missing-keys"])
+def test_get_backend_falls_back_to_the_heuristic(configured, tmp_path, contents):
+    path = tmp_path / "model.npz"
+    if contents == "wrong-kind":
+        np.savez(path, kind="forest", features=np.array(["rvol"]), weights=[1.0], bias=0.0, mean=[0.0], std=[1.0])
+    elif contents == "missing-keys":
+        np.savez(path, kind="logistic")
+    elif contents is not None:
+        path.write_bytes(contents)
+    backend = configured(str(path))
+    assert isinstance(backend, HeuristicBackend)
+    m = metrics_dicts(1)[0]
+    assert score_metrics(m) == compute_ai_score(m)
@@ -0,0 +1,151 @@
+# tests/test_sentiment.py
+import json
+import time
+
+import pytest
+
+from sentiment_analysis import collect_sentiment
+from services import scanner
+from services import sentiment as sentiment_module
+from services.scanner import AlertStage
+from services.sentiment import FakeSource, SantimentSource, SentimentCollector, SentimentSource
+
+COINS = {f"coin-{i}": f"C{i}" for i in range(5)}
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_sources_must_implement_fetch():
+    with pytest.raises(TypeError):
+        SentimentSource()
+
+
+def test_bulk_sources_fetch_once_and_per_coin_sources_once_per_coin():
+    bulk, single = FakeSource("lunarcrush"), FakeSource("reddit", bulk=False)
+    collector = SentimentCollector([bulk, single], deadline=5)
+    try:
+        raw = collector.collect(COINS)
+    finally:
+        collector.close()
+    assert bulk.calls == 1 and single.calls == len(COINS)
+    assert set(raw["lunarcrush"]) == set(raw["reddit"]) == set(COINS)
+
+
+def test_cached_results_are_served_until_the_ttl_expires():
+    clock = FakeClock()
+    source = FakeSource("lunarcrush", ttl=60)
+    collector = SentimentCollector([source], deadline=5, clock=clock)
+    try:
+        first = collector.collect(COINS)
+        clock.t = 30
+        assert collector.collect(COINS) == first and source.calls == 1
+        collector.collect(dict(COINS, extra="X"))  # only the new coin is fetched
+        assert source.calls == 2
+        clock.t = 61
+        collector.collect(COINS)
+        assert source.calls == 3
+    finally:
+        collector.close()
+
+
+def test_failing_and_slow_sources_are_left_out_of_the_batch():
+    ok, down, slow = FakeSource("lunarcrush"), FakeSource("santiment", fail=True), FakeSource("twitter", delay=0.5)
+    collector = SentimentCollector([ok, down, slow], deadline=0.1)
+    try:
+        started = time.perf_counter()
+        raw = collector.collect(COINS)
+        assert time.perf_counter() - started < 0.4
+        assert set(raw["lunarcrush"]) == set(COINS) and raw["santiment"] == {} and raw["twitter"] == {}
+        time.sleep(0.6)  # the late fetch still lands in the cache for the next batch
+        assert set(collector.collect(COINS)["twitter"]) == set(COINS) and slow.calls == 1
+    finally:
+        collector.close()
+
+
+def test_collect_sentiment_aggregates_every_source():
+    sources = [FakeSource("lunarcrush"), FakeSource("santiment"), FakeSource("reddit", bulk=False),
+               FakeSource("twitter", bulk=False)]
+    collector = SentimentCollector(sources, deadline=5)
+    try:
+        out = collect_sentiment(COINS, collector)
+    finally:
+        collector.close()
+    assert set(out) == set(COINS)
+    for result in out.values():
+        assert set(result["detail"]) == {"lunarcrush", "santiment", "reddit", "twitter"}
+        assert 0 <= result["score"] <= 1 and isinstance(result["passes"], bool)
+    assert all(s.calls >= 1 for s in sources)
+
+
+def test_santiment_slugs_are_json_encoded(monkeypatch):
+    sent = {}
+
+    class Session:
+        def post(self, url, json, headers, timeout):
+            sent["query"] = json["query"]
+            return self
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"data": {"getMetric": {"timeseriesDataPerSlugJson": []}}}
+
+    monkeypatch.setattr(sentiment_module, "get_session", Session)
+    SantimentSource("key").fetch({"bitcoin": "BTC", 'we"ird\\coin': "W"})
+    slugs = sent["query"].split("slugs: ", 1)[1].split("}", 1)[0]
+    assert json.loads(slugs) == ["bitcoin", 'we"ird\\coin']
+
+
+class Fixed(SentimentSource):
+    """One bulk source returning preset LunarCrush-shaped stats."""
+
+    name = "lunarcrush"
+    bulk = True
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def fetch(self, coins):
+        return {c: self.stats[c] for c in coins if c in self.stats}
+
+
+class Dispatcher:
+    def __init__(self):
+        self.sent = []
+
+    def submit(self, payload):
+        self.sent.append(payload)
+        return True
+
+    def flush(self):
+        pass
+
+
+def test_alerts_are_gated_on_sentiment(monkeypatch):
+    monkeypatch.setattr(scanner, "seen_recent_many", lambda tickers: {t.upper(): False for t in tickers})
+    monkeypatch.setattr(scanner, "mark_seen_many", lambda tickers: None)
+    collector = SentimentCollector([Fixed({
+        "bull": {"galaxy_score": 90, "mentions": 50, "engagement": 500},
+        "bear": {"galaxy_score": 10, "mentions": 50, "engagement": 500},
+        "quiet": {"galaxy_score": 90, "mentions": 1, "engagement": 5},
+    })], deadline=5)
+    dispatcher = Dispatcher()
+    stage = AlertStage(dispatcher)
+    stage.collector = collector
+    try:
+        for coin_id in ("bull", "bear", "quiet", "unknown"):
+            stage.offer({"coin_id": coin_id, "ticker": coin_id.upper(), "ai_score": 9.0})
+        assert dispatcher.sent == []  # deferred to the batched lookup
+        alerted = stage.finish()
+    finally:
+        collector.close()
+    # no source had data on "unknown": it goes out unconfirmed rather than being dropped
+    assert [r["coin_id"] for r in alerted] == ["bull", "unknown"]
+    assert len(dispatcher.sent) == 2
@@ -0,0 +1,91 @@
+# tests/test_sharding.py
+import json
+
+import pytest
+
+from benchmarks import shard_check
+from instrumentation import read_run_summary, write_run_summary
+from results_store import read_results, read_snapshot_rows, write_results
+from services import sharding
+from services.sharding import HashRing, Shard, merge_shards, shard_mask, shard_path
+
+COINS = [f"coin-{i}" for i in range(20000)]
+
+
+def _owners(count):
+    ring = HashRing(count)
+    return [ring.owner(c) for c in COINS]
+
+
+def test_assignment_is_stable_across_rings(monkeypatch):
+    first = _owners(4)
+    monkeypatch.setattr(HashRing, "_rings", {})  # rebuilt from scratch, as in another process
+    assert _owners(4) == first
+    assert HashRing(4).owner("bitcoin") == HashRing(4).owner("bitcoin")
+    assert set(first) == {1, 2, 3, 4}
+
+
+@pytest.mark.parametrize("count", [2, 4, 8])
+def test_shards_are_roughly_even(count):
+    owners = _owners(count)
+    even = len(COINS) / count
+    assert all(abs(owners.count(s) / even - 1) < 0.2 for s in range(1, count + 1))
+
+
+@pytest.mark.parametrize("count", [1, 3, 4, 7])
+def test_adding_a_shard_moves_only_coins_onto_it(count):
+    before, after = _owners(count), _owners(count + 1)
+    moved = [(a, b) for a, b in zip(before, after) if a != b]
+    assert all(b == count + 1 for _, b in moved)  # nothing moves between existing shards
+    assert len(moved) / len(COINS) < 1.3 / (count + 1)  # about 1/(N+1) of the coins
+
+
+def test_shard_masks_partition_the_universe():
+    coins = COINS[:2000] + [""]
+    masks = [shard_mask(Shard(i, 3), coins) for i in (1, 2, 3)]
+    for j, coin in enumerate(coins[:-1]):
+        assert sum(m[j] for m in masks) == 1, coin
+    assert not any(m[-1] for m in masks)  # rows without an id belong to no shard
+    assert shard_mask(None, coins) == shard_mask(Shard(1, 1), coins) == [True] * len(coins)
+
+
+@pytest.mark.parametrize("spec", ["0/4", "5/4", "1", "a/b", "1/2/3"])
+def test_bad_shard_specs_are_rejected(spec):
+    with pytest.raises(ValueError):
+        Shard.parse(spec)
+
+
+def test_shard_paths():
+    shard = Shard.parse("2/4")
+    assert str(shard) == "2/4"
+    assert shard_path("data/tier2_results.ndjson", shard) == "data/tier2_results.shard-2-of-4.ndjson"
+    assert shard_path("data/tier2_results.ndjson", None) == "data/tier2_results.ndjson"
+
+
+def test_merge_combines_shard_outputs_in_signal_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(sharding, "SNAPSHOT_ROWS", 3)
+    results, summary, snapshot = (str(tmp_path / n) for n in ("r.ndjson", "s.json", "d.json"))
+    outputs = {
+        1: ([{"coin_id": "a", "ai_score": 2.0}, {"coin_id": "b", "ai_score": None}],
+            {"started_at": 20, "duration_sec": 4, "tier1": 5, "tier1_rejections": {"volume": 3}, "alerts": 1}),
+        3: ([{"coin_id": "c", "ai_score": 9.0}, {"coin_id": "d", "ai_score": 2.0}],
+            {"started_at": 10, "duration_sec": 6, "tier1": 7, "tier1_rejections": {"volume": 1, "rsi": 2}, "alerts": 2}),
+    }
+    for index, (rows, run) in outputs.items():  # shard 2 of 3 never finished
+        write_results(rows, shard_path(results, Shard(index, 3)))
+        write_run_summary(run, shard_path(summary, Shard(index, 3)))
+
+    merged = merge_shards(3, results, summary, snapshot)
+    assert [r["coin_id"] for r in read_results(results)] == ["c", "d", "a", "b"]
+    assert [r["coin_id"] for r in read_snapshot_rows(snapshot)] == ["c", "d", "a"]
+    on_disk = read_run_summary(summary)
+    for key, want in {"started_at": 10, "duration_sec": 6, "tier1": 12, "tier1_rejections": {"volume": 4, "rsi": 2},
+                      "tier2": 4, "alerts": 3, "shards": 3, "missing_shards": ["2/3"]}.items():
+        assert merged[key] == on_disk[key] == want, key
+
+
+def test_shard_check_matches_a_single_worker(capsys):
+    assert shard_check.main(["--shards", "2", "--markets", "200"]) == 0
+    result = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert result["rows"] == sum(result["rows_per_shard"]) > 0
+    assert result["universe_listed_once"] and result["rows_equal"]
@@ -0,0 +1,100 @@
+# tests/test_signals_api.py
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from config import RESULTS_FILE
+from results_store import write_results
+from signals_query import QueryError, encode_cursor, query_supabase
+from snapshot_cache import TTLCache
+
+ROWS = [
+    {"coin_id": f"coin-{i}", "ticker": f"C{i}", "tier": "tier2" if i % 2 else "tier1",
+     "ai_score": None if i == 9 else float(i % 4), "rsi": 30.0 + i * 5, "rvol": i / 4}
+    for i in range(10)
+]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The API with Supabase unconfigured, so /api/signals reads the local results file."""
+    write_results(ROWS)
+    monkeypatch.setattr(app_module, "cache", TTLCache())
+    yield TestClient(app_module.app)
+    os.remove(RESULTS_FILE)
+
+
+def _pages(client, **params):
+    pages, cursor = [], None
+    while True:
+        body = client.get("/api/signals", params=dict(params, **({"cursor": cursor} if cursor else {}))).json()
+        pages.append(body["data"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            return pages
+
+
+def test_local_fallback_pages_through_every_row_in_order(client):
+    pages = _pages(client, limit=3)
+    assert [len(p) for p in pages] == [3, 3, 3, 1]
+    rows = [r for p in pages for r in p]
+    assert sorted(r["coin_id"] for r in rows) == sorted(r["coin_id"] for r in ROWS)
+    keys = [(r["ai_score"] is not None, r["ai_score"] or 0.0, r["coin_id"]) for r in rows]
+    assert keys == sorted(keys, reverse=True) and rows[-1]["ai_score"] is None
+
+
+def test_local_fallback_filters_and_projects(client):
+    rows = [r for p in _pages(client, limit=2, tier="tier2", min_score=1, fields="coin_id,rsi") for r in p]
+    want = [r for r in ROWS if r["tier"] == "tier2" and (r["ai_score"] or 0) >= 1]
+    assert sorted(r["coin_id"] for r in rows) == sorted(r["coin_id"] for r in want)
+    assert all(r.keys() == {"coin_id", "rsi"} for r in rows)
+
+    rows = client.get("/api/signals", params={"rsi_min": 40, "rsi_max": 50, "rvol_min": 0.5}).json()["data"]
+    assert sorted(r["coin_id"] for r in rows) == ["coin-2", "coin-3", "coin-4"]
+
+
+@pytest.mark.parametrize("params", [{"fields": "coin_id,links"}, {"cursor": "not-a-cursor"},
+                                    {"cursor": encode_cursor({"ai_score": float("inf"), "coin_id": "x"})}])
+def test_bad_input_is_a_400(client, params):
+    res = client.get("/api/signals", params=params)
+    assert res.status_code == 400 and "error" in res.json()
+
+
+class FakeQuery:
+    """Records the PostgREST builder calls query_supabase makes."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: (self.calls.append((name, args)), self)[1]
+
+    def execute(self):
+        return []
+
+
+class FakeClient:
+    def __init__(self):
+        self.query = FakeQuery()
+
+    def table(self, name):
+        return self.query
+
+
+def test_cursor_coin_id_is_quoted_in_the_supabase_filter():
+    client = FakeClient()
+    cursor = encode_cursor({"ai_score": 2.5, "coin_id": 'x,ai_score.gt.0"\\'})
+    query_supabase(client, "signals", cursor=cursor)
+    (flt,) = [args[0] for name, args in client.query.calls if name == "or_"]
+    assert flt == 'ai_score.lt.2.5,ai_score.is.null,and(ai_score.eq.2.5,coin_id.lt."x,ai_score.gt.0\\"\\\\")'
+
+    client = FakeClient()
+    query_supabase(client, "signals", cursor=encode_cursor({"ai_score": None, "coin_id": "coin-1"}))
+    assert ("or_", ('and(ai_score.is.null,coin_id.lt."coin-1")',)) in client.query.calls
+
+
+def test_non_finite_cursor_scores_are_rejected():
+    with pytest.raises(QueryError):
+        query_supabase(FakeClient(), "signals", cursor=encode_cursor({"ai_score": float("nan"), "coin_id": "x"}))
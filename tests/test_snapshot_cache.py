@@ -0,0 +1,154 @@
+# tests/test_snapshot_cache.py
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from config import RESULTS_FILE
+from results_store import write_results
+from snapshot_cache import Snapshot, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+class Loader:
+    """Returns 1, 2, 3, ... on successive loads; clear ``release`` to hold loads back."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.done = threading.Event()
+
+    def __call__(self):
+        self.release.wait(5)
+        self.calls += 1
+        self.done.set()
+        return self.calls
+
+
+def _cache(**kwargs):
+    return TTLCache(ttl=30, stale_ttl=0, version=lambda: 0, clock=lambda: 0.0, **kwargs)
+
+
+def test_least_recently_used_keys_are_evicted_with_their_locks():
+    cache = _cache(max_entries=3)
+    loads = []
+
+    def loader(key):
+        return lambda: (loads.append(key), key)[1]
+
+    for key in "abc":
+        cache.get(key, loader(key))
+    assert cache.get("a", loader("a")) == "a"  # hit: "a" is now the most recent
+    cache.get("d", loader("d"))
+    assert list(cache._entries) == ["c", "a", "d"]
+    assert set(cache._locks) <= set(cache._entries)
+    assert cache.get("b", loader("b")) == "b" and loads == list("abcdb")
+
+
+def test_many_distinct_keys_stay_bounded():
+    cache = _cache(max_entries=50)
+    for i in range(1000):
+        cache.get(("api/signals", i), lambda: i)
+    assert len(cache._entries) == 50 and len(cache._locks) <= 50
+
+
+def test_failed_loads_do_not_leave_locks_behind():
+    cache = _cache(max_entries=10)
+
+    def boom():
+        raise RuntimeError("db down")
+
+    for i in range(20):
+        with pytest.raises(RuntimeError):
+            cache.get(i, boom)
+    assert cache._locks == {} and len(cache._entries) == 0
+
+
+def test_invalidate_drops_the_lock_too():
+    cache = _cache()
+    cache.get("a", lambda: 1)
+    cache.invalidate("a")
+    assert "a" not in cache._entries and "a" not in cache._locks
+
+
+def test_entries_are_served_until_the_ttl_then_reloaded():
+    clock, load = FakeClock(), Loader()
+    cache = TTLCache(ttl=30, stale_ttl=0, version=lambda: 0, clock=clock)
+    assert cache.get("k", load) == 1
+    clock.t = 29.9
+    assert cache.get("k", load) == 1 and load.calls == 1
+    clock.t = 30
+    assert cache.get("k", load) == 2 and load.calls == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_stale_entries_are_served_while_one_background_refresh_runs():
+    clock, load = FakeClock(), Loader()
+    cache = TTLCache(ttl=30, stale_ttl=60, version=lambda: 0, clock=clock)
+    cache.get("k", load)
+    load.release.clear()
+    load.done.clear()
+    clock.t = 45  # stale but within stale_ttl
+    assert [cache.get("k", load) for _ in range(5)] == [1] * 5  # no caller waits on the reload
+    load.release.set()
+    assert load.done.wait(5)
+    for _ in range(100):
+        if cache.peek("k") == 2:
+            break
+        threading.Event().wait(0.01)
+    assert cache.peek("k") == 2 and load.calls == 2  # one refresh for five stale hits
+    assert cache.get("k", load) == 2
+
+
+def test_too_stale_or_new_version_reloads_synchronously():
+    clock, load, version = FakeClock(), Loader(), [0]
+    cache = TTLCache(ttl=30, stale_ttl=60, version=lambda: version[0], clock=clock)
+    cache.get("k", load)
+    clock.t = 91
+    assert cache.get("k", load) == 2
+    version[0] = 1  # new scanner results
+    assert cache.get("k", load) == 3
+
+
+def test_etag_is_stable_for_the_same_body():
+    a, b, c = Snapshot(b"rows", "text/html"), Snapshot(b"rows", "text/html"), Snapshot(b"other", "text/html")
+    assert a.etag == b.etag != c.etag
+    assert a.encoded("gzip, br")[1] in ("gzip", "br") and a.encoded("")[0] == b"rows"
+
+
+@pytest.mark.parametrize("header, match", [
+    ("{etag}", True), ("W/{etag}", True), ('"x", {etag}', True), ("*", True), (" W/{etag} ,\"y\"", True),
+    ("", False), ('"x"', False), ("{etag}x", False), ('{etag_body}', False), ('"x{etag_body}"', False),
+])
+def test_if_none_match_is_compared_exactly(header, match):
+    snap = Snapshot(b"rows", "application/json")
+    assert snap.matches(header.format(etag=snap.etag, etag_body=snap.etag.strip('"'))) is match
+
+
+@pytest.fixture
+def client(monkeypatch):
+    write_results([{"coin_id": f"c{i}", "ticker": f"C{i}", "ai_score": float(i)} for i in range(5)])
+    monkeypatch.setattr(app_module, "cache", TTLCache())
+    yield TestClient(app_module.app)
+    os.remove(RESULTS_FILE)
+
+
+def test_conditional_requests_get_a_304(client):
+    first = client.get("/api/signals", headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["content-encoding"] == "gzip"
+    assert client.get("/api/signals").headers["etag"] == etag
+    for header in (etag, f"W/{etag}", f'"stale", {etag}', "*"):
+        res = client.get("/api/signals", headers={"If-None-Match": header})
+        assert res.status_code == 304 and res.content == b"" and res.headers["etag"] == etag
+    assert client.get("/api/signals", headers={"If-None-Match": '"stale"'}).status_code == 200
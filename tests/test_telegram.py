@@ -0,0 +1,136 @@
+# tests/test_telegram.py
+import pytest
+import requests
+
+import telegram_alerts
+from benchmarks.stub_server import start_stub
+from telegram_alerts import TelegramDispatcher
+
+
+def _payload(i):
+    return {"symbol": f"C{i}", "price": 1.5 + i, "change_pct": 2.0, "ai_score": 8.0 + i / 10,
+            "ai_reason": "breakout", "risk": {}, "links": {"tradingview": f"https://tv/C{i}"}}
+
+
+BAD = {"price": 1.0}  # no symbol: neither formatter can render it
+
+
+@pytest.fixture
+def telegram():
+    server, state, url = start_stub()
+    yield state, url
+    server.shutdown()
+    server.server_close()
+
+
+def _dispatcher(url, **kwargs):
+    return TelegramDispatcher(bot="token", chat_id="chan", api=url, global_rate=1000, chat_rate=1000, **kwargs)
+
+
+def test_alerts_are_posted_to_send_message(telegram):
+    state, url = telegram
+    with _dispatcher(url, digest_threshold=100) as d:
+        for i in range(3):
+            assert d.submit(_payload(i))
+        d.flush()
+    assert [m["text"].split("\n")[1] for m in state.messages] == [f"🚨 New Signal: $C{i}" for i in range(3)]
+    assert all(m["chat_id"] == "chan" and m["parse_mode"] == "Markdown" for m in state.messages)
+    assert d.sent == 3 and d.failed == 0
+
+
+def test_a_bad_payload_is_skipped_without_losing_the_rest(telegram):
+    state, url = telegram
+    with _dispatcher(url, digest_threshold=100) as d:
+        d.submit(_payload(0))
+        d.submit(BAD)
+        d.submit(_payload(1))
+        d.flush()
+        assert d._thread.is_alive()
+        d.submit(_payload(2))  # the worker is still running
+        d.flush()
+    assert sorted(m["text"].split("\n")[1] for m in state.messages) == [f"🚨 New Signal: $C{i}" for i in range(3)]
+    assert d.sent == 3 and d.failed == 1
+
+
+def test_bursts_are_coalesced_into_a_digest_without_the_bad_payload(telegram):
+    state, url = telegram
+    with _dispatcher(url, digest_threshold=3) as d:
+        d._deliver([("chan", p) for p in [_payload(0), BAD, _payload(1), _payload(2)]])
+    (digest,) = state.messages
+    assert digest["text"].startswith("🚨 3 new signals") and "$C2" in digest["text"]
+    assert d.sent == 1 and d.failed == 1
+
+
+def test_disabled_without_credentials():
+    d = TelegramDispatcher(bot=None, chat_id=None)
+    assert not d.submit(_payload(0))
+    d.close()
+
+
+class Response:
+    def __init__(self, status, body):
+        self.status_code = status
+        self.ok = status == 200
+        self.text = str(body)
+        self._body = body
+
+    def json(self):
+        if isinstance(self._body, Exception):
+            raise self._body
+        return self._body
+
+
+class Session:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.posts = 0
+
+    def post(self, url, json, timeout):
+        self.posts += 1
+        r = self.responses.pop(0)
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+
+class Limiter:
+    def __init__(self):
+        self.pauses = []
+
+    def acquire(self):
+        pass
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+
+
+@pytest.mark.parametrize("body, wait", [
+    ({"ok": False, "parameters": {"retry_after": 7}}, 7.0),
+    ({"ok": False, "parameters": None}, 1.0),
+    ({"ok": False, "parameters": {"retry_after": "soon"}}, 1.0),
+    ({"ok": False, "parameters": {"retry_after": float("nan")}}, 1.0),
+    (["not", "a", "dict"], 1.0),
+    ("rate limited", 1.0),
+    (ValueError("no json"), 1.0),
+])
+def test_429_bodies_of_any_shape_back_off_and_retry(body, wait):
+    session = Session([Response(429, body), Response(200, {"ok": True})])
+    d = TelegramDispatcher(bot="token", chat_id="chan", api="http://stub", session=session)
+    limiter = Limiter()
+    d._chats["chan"] = limiter
+    d._global = Limiter()
+    d._send("chan", "hi")
+    d.close()
+    assert limiter.pauses == [wait] and session.posts == 2 and d.sent == 1
+
+
+def test_no_sleep_after_the_last_connection_attempt(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(telegram_alerts.time, "sleep", sleeps.append)
+    session = Session([requests.ConnectionError("down")] * 3)
+    d = TelegramDispatcher(bot="token", chat_id="chan", api="http://stub", session=session, max_retries=2)
+    d._chats["chan"] = Limiter()
+    d._global = Limiter()
+    d._send("chan", "hi")
+    d.close()
+    assert session.posts == 3 and sleeps == [1, 2] and d.failed == 1
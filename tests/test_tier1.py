@@ -0,0 +1,57 @@
+# tests/test_tier1.py
+import importlib
+import logging
+
+import numpy as np
+import pytest
+
+import scanner_tier1
+from benchmarks import fixtures
+from scanner_tier1 import compile_rule, filter_markets, passes_tier1, tier1_columns
+
+
+def _market(**kw):
+    m = {"id": "x", "symbol": "x", "current_price": 1.0, "total_volume": 5e7, "market_cap": 1e8,
+         "price_change_percentage_24h": 5.0}
+    m.update(kw)
+    return m
+
+
+def test_non_finite_values_count_as_zero():
+    cols = tier1_columns({"current_price": [float("inf"), float("-inf"), float("nan"), None, "bad", 2.0]})
+    assert list(cols["price"]) == [0.0, 0.0, 0.0, 0.0, 0.0, 2.0]
+    for bad in (float("inf"), "inf"):
+        assert not passes_tier1(_market(total_volume=bad))
+        assert filter_markets([_market(total_volume=bad)])[0] == []
+
+
+def test_passes_tier1_applies_extra_rules():
+    rules = (("turnover", compile_rule("volume / mcap >= 0.6")),)
+    assert passes_tier1(_market()) and filter_markets([_market()])[0]
+    assert not passes_tier1(_market(), rules)
+    assert passes_tier1(_market(total_volume=8e7), rules)
+
+
+def test_passes_tier1_uses_configured_extra_rules_by_default(monkeypatch):
+    monkeypatch.setattr(scanner_tier1, "TIER1_EXTRA_RULES", (("cap", compile_rule("change24 < 3")),))
+    assert not passes_tier1(_market())
+    assert passes_tier1(_market(price_change_percentage_24h=2.5))
+
+
+@pytest.mark.parametrize("rules", [(), (("turnover", compile_rule("volume / mcap >= 0.1 and not change24 > 15")),)])
+def test_single_market_check_agrees_with_the_columnar_filter(rules):
+    markets = fixtures.markets_payload(2000)
+    kept, _ = filter_markets(markets, rules)
+    assert [m["id"] for m in kept] == [m["id"] for m in markets if passes_tier1(m, rules)]
+
+
+def test_malformed_extra_rules_are_logged_and_ignored(monkeypatch, caplog):
+    monkeypatch.setenv("TIER1_EXTRA_RULES", "volume > 1e6; price >; __import__('os'); mcap < 1e9")
+    with caplog.at_level(logging.ERROR):
+        module = importlib.reload(scanner_tier1)
+    try:
+        assert [name for name, _ in module.TIER1_EXTRA_RULES] == ["volume > 1e6", "mcap < 1e9"]
+        assert len([r for r in caplog.records if "Ignoring Tier 1 rule" in r.getMessage()]) == 2
+    finally:
+        monkeypatch.delenv("TIER1_EXTRA_RULES")
+        importlib.reload(scanner_tier1)